@@ -0,0 +1,167 @@
+"""
+Synthetic arXiv corpus and offline encoder for benchmarks.
+
+Papers are generated from the topics of the configuration: each paper belongs
+to one topic, is listed in its categories and mixes topic keywords with
+filler words, so topic queries, keyword bonuses and category filters see
+realistic match rates. Publication dates are spread over a recent window,
+newest first.
+"""
+
+import os
+import random
+import sys
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from encoders import Encoder  # noqa: E402
+
+FILLER_WORDS = (
+    "we propose novel method approach results show significant improvement "
+    "over baselines experiments demonstrate framework model performance "
+    "efficient robust scalable analysis evaluate benchmark dataset training "
+    "inference learning system algorithm theoretical empirical study task "
+    "tasks real world simulation data network architecture optimization "
+    "problem solution state art challenging setting generalization"
+).split()
+
+AUTHOR_NAMES = (
+    "Ada Alan Grace Edsger Barbara John Donald Frances Leslie Radia Ken "
+    "Margaret Niklaus Shafi Tim Yoshua Fei-Fei Andrew Daphne Judea"
+).split()
+
+
+def topic_words(topic: Dict[str, Any]) -> List[str]:
+    """Words of a topic's keywords and query terms."""
+    words = []
+    for keyword in topic.get("keywords", []):
+        words.extend(keyword.lower().split())
+    for token in topic["query"].replace("(", " ").replace(")", " ").split():
+        if token not in ("AND", "OR", "ANDNOT") and ":" not in token:
+            words.append(token.lower())
+    return words or ["topic"]
+
+
+def synthetic_papers(
+    count: int,
+    topics: List[Dict[str, Any]],
+    days: float = 7,
+    seed: int = 0,
+    now: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Generate paper dictionaries shaped like fetched papers.
+
+    Args:
+        count: Number of papers
+        topics: Topic configurations the papers are drawn from
+        days: Window the publication dates are spread over
+        seed: Random seed
+        now: Date of the newest paper (defaults to the current time)
+
+    Returns:
+        Papers sorted from newest to oldest
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    step = timedelta(days=days) / max(count, 1)
+    vocab = [topic_words(topic) for topic in topics]
+    categories = [topic.get("categories") or ["cs.LG"] for topic in topics]
+
+    papers = []
+    for i in range(count):
+        t = rng.randrange(len(topics))
+        words = vocab[t]
+        # arXiv numbers up to 99999 papers per month
+        month = i // 100000
+        paper_base = f"{26 - month // 12:02d}{12 - month % 12:02d}.{i % 100000:05d}"
+        version = 1 + (rng.random() < 0.1)
+        paper_id = f"{paper_base}v{version}"
+        title = " ".join(
+            rng.choice(words) if j % 2 else rng.choice(FILLER_WORDS)
+            for j in range(rng.randint(6, 12))
+        ).capitalize()
+        abstract = " ".join(
+            rng.choice(words) if rng.random() < 0.2 else rng.choice(FILLER_WORDS)
+            for _ in range(rng.randint(120, 200))
+        )
+        paper_categories = list(
+            dict.fromkeys([categories[t][0]] + rng.sample(categories[t], 1))
+        )
+        papers.append(
+            {
+                "id": paper_id,
+                "base_id": paper_base,
+                "version": version,
+                "title": title,
+                "authors": rng.sample(AUTHOR_NAMES, rng.randint(1, 6)),
+                "abstract": abstract.capitalize() + ".",
+                "url": f"http://arxiv.org/abs/{paper_id}",
+                "pdf_url": f"http://arxiv.org/pdf/{paper_id}",
+                "published": (now - i * step).replace(microsecond=0).isoformat(),
+                "categories": paper_categories,
+                "primary_category": paper_categories[0],
+            }
+        )
+    return papers
+
+
+def research_interests(topics: List[Dict[str, Any]]) -> str:
+    """Research interest text made of the topics' keywords."""
+    return " ".join(" ".join(topic.get("keywords", [])) for topic in topics)
+
+
+class HashingEncoder(Encoder):
+    """
+    Deterministic bag-of-words encoder standing in for the real model.
+
+    Words are hashed to signed dimensions, so encoding costs no model
+    download and texts sharing words get similar embeddings.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+        self._buckets: Dict[str, tuple] = {}
+
+    def _bucket(self, word: str) -> tuple:
+        bucket = self._buckets.get(word)
+        if bucket is None:
+            h = zlib.crc32(word.encode("utf-8"))
+            bucket = self._buckets[word] = (
+                h % self.dimension,
+                1.0 if h & 1 << 31 else -1.0,
+            )
+        return bucket
+
+    def encode(
+        self,
+        sentences,
+        convert_to_tensor: bool = False,
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        cells, signs = [], []
+        for row, text in enumerate(texts):
+            offset = row * self.dimension
+            for word in text.lower().split():
+                index, sign = self._bucket(word)
+                cells.append(offset + index)
+                signs.append(sign)
+        embeddings = np.zeros(len(texts) * self.dimension, dtype=np.float32)
+        np.add.at(embeddings, np.array(cells, dtype=np.int64), signs)
+        embeddings = embeddings.reshape(len(texts), self.dimension)
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
@@ -0,0 +1,219 @@
+"""
+Local stand-in for the arXiv query API.
+
+Serves a synthetic corpus as paged Atom feeds: search queries are evaluated
+with the local query matcher of query_planner.py, results are sorted newest
+first, and pages carry an ETag so conditional requests get a 304. A fraction
+of requests can be answered with 503 to exercise retries and throttling.
+
+Usage:
+    python benchmarks/mock_arxiv.py --papers 10000 --port 8080
+
+and set `fetch.api_url: http://127.0.0.1:8080/api/query` in the config.
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape, quoteattr
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from query_planner import parse_query  # noqa: E402
+
+FEED_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<feed xmlns="http://www.w3.org/2005/Atom" '
+    'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+    'xmlns:arxiv="http://arxiv.org/schemas/atom">\n'
+)
+
+
+def atom_entry(paper: Dict[str, Any]) -> str:
+    """Render a paper as an Atom entry of the arXiv API."""
+    published = paper["published"].replace("+00:00", "Z")
+    parts = [
+        "<entry>",
+        f"<id>{escape(paper['url'])}</id>",
+        f"<published>{published}</published>",
+        f"<updated>{published}</updated>",
+        f"<title>{escape(paper['title'])}</title>",
+        f"<summary>{escape(paper['abstract'])}</summary>",
+    ]
+    parts += [f"<author><name>{escape(a)}</name></author>" for a in paper["authors"]]
+    parts += [
+        f'<link href={quoteattr(paper["url"])} rel="alternate" type="text/html"/>',
+        f'<link title="pdf" href={quoteattr(paper["pdf_url"])} rel="related"/>',
+        f'<arxiv:primary_category term="{paper["primary_category"]}"/>',
+    ]
+    parts += [f'<category term="{c}"/>' for c in paper["categories"]]
+    parts.append("</entry>\n")
+    return "".join(parts)
+
+
+def atom_feed(papers: List[Dict[str, Any]], total: int, start: int) -> bytes:
+    """Render a page of results as an Atom feed."""
+    return (
+        FEED_HEADER
+        + f"<opensearch:totalResults>{total}</opensearch:totalResults>\n"
+        + f"<opensearch:startIndex>{start}</opensearch:startIndex>\n"
+        + "".join(atom_entry(paper) for paper in papers)
+        + "</feed>\n"
+    ).encode("utf-8")
+
+
+class MockArxivServer:
+    """Threaded HTTP server answering arXiv API queries from a corpus."""
+
+    def __init__(
+        self,
+        papers: List[Dict[str, Any]],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            papers: Corpus, sorted from newest to oldest
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+            error_rate: Fraction of requests answered with 503
+            seed: Random seed for injected errors
+        """
+        self.papers = papers
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.results: Dict[str, List[Dict[str, Any]]] = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.errors = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server.handle(self)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """Query endpoint of the running server."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/query"
+
+    def matching(self, query: str) -> List[Dict[str, Any]]:
+        """Papers matching a query, computed once per query."""
+        if not query:
+            return self.papers
+        with self.lock:
+            results = self.results.get(query)
+        if results is None:
+            node = parse_query(query)
+            results = [paper for paper in self.papers if node.matches(paper)]
+            with self.lock:
+                self.results[query] = results
+        return results
+
+    def handle(self, request: BaseHTTPRequestHandler):
+        """Answer one API request."""
+        with self.lock:
+            self.requests += 1
+            fail = self.error_rate and self.rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if fail:
+            request.send_response(503)
+            request.send_header("Retry-After", "0")
+            request.send_header("Content-Length", "0")
+            request.end_headers()
+            return
+
+        params = parse_qs(urlparse(request.path).query)
+        query = params.get("search_query", [""])[0]
+        start = int(params.get("start", ["0"])[0])
+        size = int(params.get("max_results", ["10"])[0])
+
+        results = self.matching(query)
+        page = results[start : start + size]
+        etag = '"{}"'.format(
+            hashlib.sha1(
+                f"{query}|{start}|{size}|{len(results)}|{len(self.papers)}".encode()
+            ).hexdigest()
+        )
+        if request.headers.get("If-None-Match") == etag:
+            with self.lock:
+                self.not_modified += 1
+            request.send_response(304)
+            request.send_header("ETag", etag)
+            request.end_headers()
+            return
+
+        body = atom_feed(page, len(results), start)
+        request.send_response(200)
+        request.send_header("Content-Type", "application/atom+xml; charset=utf-8")
+        request.send_header("Content-Length", str(len(body)))
+        request.send_header("ETag", etag)
+        request.end_headers()
+        request.wfile.write(body)
+
+    def start(self) -> "MockArxivServer":
+        """Serve requests on a background thread."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        """Return request counters."""
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+        }
+
+
+def main():
+    from corpus import synthetic_papers
+    from utils import load_config
+
+    parser = argparse.ArgumentParser(description="Local arXiv API stand-in")
+    parser.add_argument("--papers", type=int, default=10000, help="Corpus size")
+    parser.add_argument("--days", type=float, default=7, help="Publication window")
+    parser.add_argument("--config", default="config/topics.yaml", help="Topics")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface")
+    parser.add_argument("--port", type=int, default=8080, help="Port")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503 rate")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    topics = load_config(args.config)["topics"]
+    papers = synthetic_papers(args.papers, topics, args.days, args.seed)
+    server = MockArxivServer(papers, args.host, args.port, args.error_rate, args.seed)
+    print(f"Serving {len(papers)} papers at {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Benchmark the digest pipeline offline, stage by stage.
+
+A synthetic corpus generated from the configured topics is served by a local
+stand-in for the arXiv API (mock_arxiv.py), and papers are encoded with a
+hashing encoder instead of the real model, so no network access or model
+download is needed. Each stage is timed (best of --repeat runs) and then run
+once more under tracemalloc for its peak Python memory. The report is saved
+as JSON; --compare prints the change against an earlier report.
+
+Usage:
+    python benchmarks/pipeline.py --papers 10000
+    python benchmarks/pipeline.py --papers 100000 --repeat 1
+    python benchmarks/pipeline.py --papers 10000 --compare benchmarks/results/<report>.json
+    python benchmarks/pipeline.py --papers 2000 --real-model
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from corpus import HashingEncoder, research_interests, synthetic_papers  # noqa: E402
+from fetch_papers import ArxivFetcher  # noqa: E402
+from mock_arxiv import MockArxivServer  # noqa: E402
+from rank_papers import PaperRanker  # noqa: E402
+from read_history import ReadHistory  # noqa: E402
+from render import RENDERERS, DigestJob, render_digests  # noqa: E402
+from scoring import PaperColumns  # noqa: E402
+from utils import load_config  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def measure(
+    func: Callable[[], Any],
+    items: int,
+    repeat: int,
+    setup: Optional[Callable[[], Any]] = None,
+    memory: bool = True,
+) -> Dict[str, Any]:
+    """
+    Time a stage and measure its peak memory.
+
+    Args:
+        func: Stage to run
+        items: Number of items (papers) the stage processes
+        repeat: Number of timed runs
+        setup: Untimed preparation before each run
+        memory: Run once more under tracemalloc for the peak memory
+
+    Returns:
+        Stage report
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    report = {
+        "seconds": min(times),
+        "mean_seconds": sum(times) / len(times),
+        "items": items,
+        "items_per_second": items / min(times) if min(times) > 0 else None,
+    }
+    if memory:
+        if setup:
+            setup()
+        tracemalloc.start()
+        func()
+        report["peak_mib"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return report
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every stage and build the report."""
+    config = load_config(args.config)
+    topics = config["topics"]
+    keywords = [k for topic in topics for k in topic.get("keywords", [])]
+    workdir = tempfile.mkdtemp(prefix="digest-bench-")
+    try:
+        return run_stages(args, topics, keywords, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_stages(
+    args: argparse.Namespace,
+    topics: List[Dict[str, Any]],
+    keywords: List[str],
+    workdir: str,
+) -> Dict[str, Any]:
+    """Run the stages with temporary files in workdir."""
+    start = time.perf_counter()
+    corpus = synthetic_papers(args.papers, topics, args.days, args.seed)
+    stages = {"corpus": {"seconds": time.perf_counter() - start, "items": len(corpus)}}
+
+    server = MockArxivServer(corpus, error_rate=args.error_rate, seed=args.seed)
+    server.start()
+    try:
+        fetch_options = {
+            "days_back": args.days + 1,
+            "max_results": args.papers,
+            "concurrency": args.concurrency,
+            "requests_per_second": args.requests_per_second,
+            "api_url": server.url,
+        }
+        fetched = {}
+
+        def fetch(**options):
+            fetcher = ArxivFetcher(**fetch_options, **options)
+            fetched.update(fetcher.fetch_multiple_topics(topics))
+
+        # Queries are matched once by the server before timing starts
+        fetch(http_cache_dir=None)
+        papers = list(
+            {p["id"]: p for results in fetched.values() for p in results}.values()
+        )
+        count = sum(len(results) for results in fetched.values())
+        stages["fetch"] = measure(
+            lambda: fetch(http_cache_dir=None), count, args.repeat
+        )
+        cache_dir = os.path.join(workdir, "http")
+        fetch(http_cache_dir=cache_dir)
+        stages["fetch_cached"] = measure(
+            lambda: fetch(http_cache_dir=cache_dir), count, args.repeat
+        )
+        stages["fetch_revalidated"] = measure(
+            lambda: fetch(http_cache_dir=cache_dir, http_cache_ttl=0),
+            count,
+            args.repeat,
+        )
+        server_stats = server.stats()
+    finally:
+        server.stop()
+
+    ranker = PaperRanker(model_name=args.model)
+    if not args.real_model:
+        ranker.model = HashingEncoder()
+    ranker.set_research_interests(research_interests(topics))
+    ranker.compute_similarities(papers[:1])  # Load the model before timing
+
+    stages["similarity"] = measure(
+        lambda: ranker.compute_semantic_similarity(papers), len(papers), args.repeat
+    )
+
+    def keyword_recency():
+        columns = PaperColumns(papers)
+        ranker.count_keyword_matches(papers, keywords, columns)
+        ranker.compute_recency_factors(papers, columns=columns)
+
+    stages["keyword_recency"] = measure(keyword_recency, len(papers), args.repeat)
+
+    history_file = os.path.join(workdir, "read_papers.jsonl")
+    paper_ids = [p["id"] for p in papers]
+
+    def reset_history():
+        if os.path.exists(history_file):
+            os.remove(history_file)
+
+    def write_history():
+        history = ReadHistory(history_file)
+        for i in range(0, len(paper_ids), args.top_n):
+            history.add(paper_ids[i : i + args.top_n])
+
+    stages["read_history_write"] = measure(
+        write_history, len(paper_ids), args.repeat, setup=reset_history
+    )
+
+    def load_history():
+        history = ReadHistory(history_file)
+        for paper in papers:
+            ranker.is_read(history, paper)
+
+    stages["read_history_load"] = measure(load_history, len(paper_ids), args.repeat)
+
+    # Rank against a history holding a tenth of the papers
+    reset_history()
+    ReadHistory(history_file).add(paper_ids[::10])
+    ranked = []
+
+    def rank():
+        ranked[:] = ranker.rank_papers(
+            papers,
+            keywords=keywords,
+            min_threshold=-1.0,
+            top_n=args.render_papers,
+            read_papers_file=history_file,
+        )
+
+    stages["rank"] = measure(rank, len(papers), args.repeat)
+
+    # One digest per simulated profile, in every format
+    jobs = [
+        DigestJob(ranked, os.path.join(workdir, f"profile{i}"), "digest", "latest")
+        for i in range(args.render_profiles)
+    ]
+    stages["render"] = measure(
+        lambda: render_digests(jobs, list(RENDERERS), workers=args.render_workers),
+        len(ranked) * len(jobs),
+        args.repeat,
+    )
+
+    return {
+        "date": datetime.now().isoformat(),
+        "config": vars(args),
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "mock_server": server_stats,
+        "papers_fetched": len(papers),
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        "max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        / (2**20 if sys.platform == "darwin" else 2**10),
+        "stages": stages,
+    }
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    """Print the stage table, with the change against a baseline report."""
+    header = f"{'stage':<20} {'seconds':>9} {'items/s':>11} {'peak MiB':>9}"
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header)
+    for name, stage in report["stages"].items():
+        rate = stage.get("items_per_second")
+        line = (
+            f"{name:<20} {stage['seconds']:>9.3f} "
+            f"{rate if rate is not None else float('nan'):>11.0f} "
+            f"{stage.get('peak_mib', float('nan')):>9.1f}"
+        )
+        base = (baseline or {}).get("stages", {}).get(name)
+        if base and base["seconds"] > 0:
+            line += f" {stage['seconds'] / base['seconds']:>7.2f}x"
+        print(line)
+    print(
+        f"{report['papers_fetched']} papers fetched, "
+        f"max RSS {report['max_rss_mib']:.0f} MiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark")
+    parser.add_argument("--papers", type=int, default=10000, help="Corpus size")
+    parser.add_argument("--days", type=float, default=7, help="Publication window")
+    parser.add_argument("--config", default="config/topics.yaml", help="Topics")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage")
+    parser.add_argument("--concurrency", type=int, default=4, help="Fetch threads")
+    parser.add_argument(
+        "--requests-per-second", type=float, default=1000, help="Fetch rate limit"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503 rate")
+    parser.add_argument("--top-n", type=int, default=10, help="Papers per digest")
+    parser.add_argument(
+        "--render-papers", type=int, default=100, help="Papers in the rendered digest"
+    )
+    parser.add_argument(
+        "--render-profiles", type=int, default=3, help="Digests rendered per run"
+    )
+    parser.add_argument(
+        "--render-workers", type=int, default=4, help="Rendering threads"
+    )
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Model name")
+    parser.add_argument(
+        "--real-model", action="store_true", help="Encode with the real model"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/)")
+    parser.add_argument("--compare", help="Earlier report to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    report = run(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"pipeline-{args.papers}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
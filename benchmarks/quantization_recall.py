@@ -0,0 +1,104 @@
+"""
+Benchmark compact embedding formats against float32.
+
+Reports, for each storage format, the size of the stored embeddings and the
+recall@N of the top-N papers per query compared to float32 scoring.
+
+By default the embeddings are synthetic (clustered unit vectors with the
+dimension of all-MiniLM-L6-v2). With --store, the papers of the local paper
+store are encoded with the real model instead.
+
+Usage:
+    python benchmarks/quantization_recall.py --papers 20000 --queries 50 --top-n 10
+    python benchmarks/quantization_recall.py --store data/papers.db
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from quantization import DTYPES, QuantizedMatrix  # noqa: E402
+
+
+def synthetic_embeddings(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Generate clustered embeddings resembling topical paper embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    assignments = rng.integers(clusters, size=n)
+    return (centers[assignments] + 0.8 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def store_embeddings(db_file: str, model_name: str) -> np.ndarray:
+    """Encode every paper of the local paper store."""
+    from sentence_transformers import SentenceTransformer
+
+    from paper_store import PaperStore
+
+    texts = [f"{p['title']} {p['abstract']}" for p in PaperStore(db_file).iter_papers()]
+    return SentenceTransformer(model_name).encode(texts, convert_to_tensor=False)
+
+
+def recall_at_n(reference: np.ndarray, candidate: np.ndarray, top_n: int) -> float:
+    """Average overlap of the top-N rows per query column."""
+    top_n = min(top_n, len(reference))
+    expected = np.argpartition(-reference, top_n - 1, axis=0)[:top_n]
+    found = np.argpartition(-candidate, top_n - 1, axis=0)[:top_n]
+    overlaps = [
+        len(set(expected[:, j]) & set(found[:, j])) for j in range(reference.shape[1])
+    ]
+    return float(np.mean(overlaps)) / top_n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact embedding benchmark")
+    parser.add_argument("--papers", type=int, default=20000, help="Synthetic papers")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--clusters", type=int, default=50, help="Synthetic topics")
+    parser.add_argument("--queries", type=int, default=50, help="Number of queries")
+    parser.add_argument("--top-n", type=int, default=10, help="N for recall@N")
+    parser.add_argument("--store", help="Use the papers of this paper store")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Model for --store")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    if args.store:
+        embeddings = store_embeddings(args.store, args.model)
+    else:
+        embeddings = synthetic_embeddings(
+            args.papers, args.dim, args.clusters, args.seed
+        )
+
+    # Queries are perturbed papers, like interests close to a topic
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.choice(len(embeddings), args.queries, replace=False)
+    queries = embeddings[picks] + 0.5 * rng.normal(
+        size=(args.queries, embeddings.shape[1])
+    )
+
+    reference = QuantizedMatrix.from_float(embeddings, "float32").cosine(queries)
+    print(
+        f"{len(embeddings)} papers, {args.queries} queries, "
+        f"dim {embeddings.shape[1]}"
+    )
+    print(
+        f"{'dtype':<8} {'bytes':>12} {'ratio':>6} {'score ms':>9} recall@{args.top_n}"
+    )
+    for dtype in DTYPES:
+        stored = QuantizedMatrix.from_float(embeddings, dtype)
+        start = time.perf_counter()
+        scores = stored.cosine(queries)
+        elapsed = (time.perf_counter() - start) * 1000
+        ratio = stored.nbytes / (embeddings.size * 4)
+        recall = recall_at_n(reference, scores, args.top_n)
+        print(
+            f"{dtype:<8} {stored.nbytes:>12} {ratio:>6.2f} {elapsed:>9.1f} {recall:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
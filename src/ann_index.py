@@ -0,0 +1,292 @@
+"""
+Approximate nearest-neighbour index over paper embeddings.
+
+The index is an inverted file (IVF): embeddings are clustered with spherical
+k-means, and a query only scans the lists of its `n_probe` nearest centroids.
+Everything is plain NumPy and persisted as a single .npz file. With the
+default list count (about sqrt of the corpus size), the clusters are retrained
+whenever the index has grown to four times the size they were trained for.
+"""
+
+import argparse
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from quantization import normalize
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class IVFIndex:
+    """Inverted-file index with cosine similarity search."""
+
+    def __init__(self, n_lists: Optional[int] = None, n_probe: int = 8):
+        """
+        Initialize an empty index.
+
+        Args:
+            n_lists: Number of clusters (defaults to about sqrt of the corpus
+                size, retrained as the index grows)
+            n_probe: Number of clusters scanned per query
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.centroids: Optional[np.ndarray] = None
+        self.ids = np.array([], dtype=object)
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+        self.positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _kmeans(self, vectors: np.ndarray, n_lists: int, iterations: int, seed: int):
+        """Cluster vectors with spherical k-means."""
+        rng = np.random.default_rng(seed)
+        # Train on a sample; a few hundred points per list are plenty
+        sample_size = min(len(vectors), 256 * n_lists)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for j in range(n_lists):
+                members = sample[assignments == j]
+                if len(members):
+                    centroids[j] = members.sum(axis=0)
+                else:
+                    # Re-seed empty clusters
+                    centroids[j] = sample[rng.integers(sample_size)]
+            centroids = normalize(centroids)
+
+        self.centroids = centroids
+
+    def _layout(self, ids: np.ndarray, vectors: np.ndarray):
+        """Sort vectors by cluster so each inverted list is contiguous."""
+        assignments = np.argmax(vectors @ self.centroids.T, axis=1)
+        order = np.argsort(assignments, kind="stable")
+        self.ids = ids[order]
+        self.vectors = np.ascontiguousarray(vectors[order])
+        counts = np.bincount(assignments, minlength=len(self.centroids))
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.positions = {pid: i for i, pid in enumerate(self.ids)}
+
+    def build(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        iterations: int = 10,
+        seed: int = 0,
+    ):
+        """
+        Build the index from scratch.
+
+        Args:
+            ids: Paper IDs
+            embeddings: Matrix with one embedding per ID
+            iterations: Number of k-means iterations
+            seed: Random seed for k-means
+        """
+        if not len(ids):
+            raise ValueError("Cannot build an index without embeddings")
+
+        # Keep the last embedding given for each ID
+        unique = {pid: i for i, pid in enumerate(ids)}
+        vectors = normalize(np.asarray(embeddings)[list(unique.values())])
+        ids = np.array(list(unique.keys()), dtype=object)
+
+        n_lists = self.n_lists or int(np.sqrt(len(ids)))
+        n_lists = max(1, min(n_lists, len(ids)))
+        self._kmeans(vectors, n_lists, iterations, seed)
+        self._layout(ids, vectors)
+        logger.info(f"Built ANN index with {len(ids)} papers in {n_lists} lists")
+
+    def add(self, ids: List[str], embeddings: np.ndarray):
+        """
+        Add or replace embeddings using the existing clusters.
+
+        With the default list count, the clusters are retrained once the
+        index holds more than 4 * n_lists**2 papers (twice the sqrt rule).
+
+        Args:
+            ids: Paper IDs
+            embeddings: Matrix with one embedding per ID
+        """
+        if self.centroids is None:
+            self.build(ids, embeddings)
+            return
+        if not len(ids):
+            return
+
+        new_vectors = normalize(embeddings)
+        replaced = {pid for pid in ids if pid in self.positions}
+        keep = np.array([pid not in replaced for pid in self.ids], dtype=bool)
+
+        all_ids = np.concatenate([self.ids[keep], np.array(ids, dtype=object)])
+        all_vectors = np.vstack([self.vectors[keep], new_vectors])
+        unique = {pid: i for i, pid in enumerate(all_ids)}
+        index = list(unique.values())
+        all_ids, all_vectors = all_ids[index], all_vectors[index]
+
+        if self.n_lists is None and len(all_ids) > 4 * len(self.centroids) ** 2:
+            n_lists = int(np.sqrt(len(all_ids)))
+            logger.info(
+                f"Retraining ANN index: {len(all_ids)} papers outgrew "
+                f"{len(self.centroids)} lists, now {n_lists}"
+            )
+            self._kmeans(all_vectors, n_lists, iterations=10, seed=0)
+        self._layout(all_ids, all_vectors)
+
+    def get_vector(self, paper_id: str) -> Optional[np.ndarray]:
+        """
+        Get the stored (normalized) embedding of a paper.
+
+        Args:
+            paper_id: Paper ID
+
+        Returns:
+            Embedding, or None if the paper is not indexed
+        """
+        position = self.positions.get(paper_id)
+        return None if position is None else self.vectors[position]
+
+    def search(
+        self, query: np.ndarray, k: int = 10, exclude: Optional[set] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Find the k nearest papers to a query embedding.
+
+        Args:
+            query: Query embedding
+            k: Number of results
+            exclude: Paper IDs to leave out of the results
+
+        Returns:
+            List of (paper ID, cosine similarity), most similar first
+        """
+        if self.centroids is None or not len(self.ids):
+            return []
+
+        query = normalize(query)
+        n_probe = min(self.n_probe, len(self.centroids))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+
+        candidates = np.concatenate(
+            [np.arange(self.list_offsets[j], self.list_offsets[j + 1]) for j in probe]
+        )
+        if exclude:
+            candidates = np.array(
+                [c for c in candidates if self.ids[c] not in exclude], dtype=np.int64
+            )
+        if not len(candidates):
+            return []
+
+        scores = self.vectors[candidates] @ query
+        top = min(k, len(candidates))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self.ids[candidates[i]], float(scores[i])) for i in best]
+
+    def save(self, path: str):
+        """
+        Persist the index to an .npz file.
+
+        Args:
+            path: Output file path
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            centroids=self.centroids,
+            ids=self.ids.astype(str),
+            vectors=self.vectors,
+            list_offsets=self.list_offsets,
+            n_probe=self.n_probe,
+            auto_lists=self.n_lists is None,
+        )
+        os.replace(tmp_path, path)
+        logger.info(f"Saved ANN index with {len(self.ids)} papers to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """
+        Load an index saved with save().
+
+        Args:
+            path: Index file path
+
+        Returns:
+            Loaded index
+        """
+        data = np.load(path)
+        # Files without the flag were built with the default list count
+        auto_lists = bool(data["auto_lists"]) if "auto_lists" in data.files else True
+        index = cls(
+            n_lists=None if auto_lists else len(data["centroids"]),
+            n_probe=int(data["n_probe"]),
+        )
+        index.centroids = data["centroids"]
+        index.ids = data["ids"].astype(object)
+        index.vectors = data["vectors"]
+        index.list_offsets = data["list_offsets"]
+        index.positions = {pid: i for i, pid in enumerate(index.ids)}
+        logger.info(f"Loaded ANN index with {len(index.ids)} papers from {path}")
+        return index
+
+
+def main():
+    """Build or query the ANN index over the local paper store."""
+    from arxiv_ids import base_id
+    from paper_store import PaperStore
+    from rank_papers import PaperRanker
+    from utils import load_config
+
+    parser = argparse.ArgumentParser(description="Similar-paper search")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="Index every paper in the local store")
+    query_parser = subparsers.add_parser("query", help="Find similar papers")
+    query_parser.add_argument("--text", help="Free-text interest description")
+    query_parser.add_argument("--paper", help="ID of an indexed paper")
+    query_parser.add_argument("-k", type=int, default=10, help="Number of results")
+    parser.add_argument("--db", default="data/papers.db", help="Paper store path")
+    parser.add_argument(
+        "--config", default="config/topics.yaml", help="Configuration file"
+    )
+    parser.add_argument(
+        "--index", default="data/cache/ann_index.npz", help="Index file path"
+    )
+    args = parser.parse_args()
+
+    store = PaperStore(args.db)
+    # Encode exactly like digest runs, so the shared embedding cache matches;
+    # queries never write to it
+    ranker = PaperRanker.from_config(
+        load_config(args.config).get("ranking", {}),
+        ann_index_file=args.index,
+        read_only_cache=args.command == "query",
+    )
+
+    if args.command == "build":
+        ranker.build_ann_index(list(store.iter_papers()))
+        return
+
+    results = ranker.find_similar(text=args.text, paper_id=args.paper, k=args.k)
+    papers = {
+        base_id(p["id"]): p
+        for p in store.get_papers_by_ids([pid for pid, _ in results], by_base_id=True)
+    }
+    for i, (paper_id, score) in enumerate(results, 1):
+        title = papers[paper_id]["title"] if paper_id in papers else ""
+        print(f"{i}. [{score:.3f}] {paper_id} {title}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Minimal client for the arXiv query API.
+
+Requests go through http_cache.HttpClient, so result pages are served from
+the on-disk cache or revalidated with a conditional request on re-runs, and
+the Atom responses are parsed directly into paper dictionaries. The `arxiv`
+package is not used because it sends its own requests, with fixed sleeps and
+whole-query retries. It has no hook for conditional requests, cached pages or
+retrying a single page.
+"""
+
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Tuple
+
+import metrics
+from arxiv_ids import split_arxiv_id
+from http_cache import HttpClient
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+ARXIV_API_URL = "http://export.arxiv.org/api/query"
+
+# arXiv's documented limit for the API: one request every three seconds
+ARXIV_REQUESTS_PER_SECOND = 1 / 3
+
+# Largest page the API serves reliably
+PAGE_SIZE = 100
+
+_NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "arxiv": "http://arxiv.org/schemas/atom",
+    "opensearch": "http://a9.com/-/spec/opensearch/1.1/",
+}
+
+
+class ArxivApiError(Exception):
+    """Error reported by the arXiv API in place of results."""
+
+
+class IncompletePageError(ArxivApiError):
+    """Result page shorter than requested although more results remain."""
+
+
+def _text(element: ET.Element, path: str) -> str:
+    found = element.find(path, _NS)
+    if found is None or found.text is None:
+        return ""
+    return found.text
+
+
+def parse_entry(entry: ET.Element) -> Dict[str, Any]:
+    """
+    Convert an Atom entry into a paper dictionary.
+
+    Args:
+        entry: <entry> element of a query response
+
+    Returns:
+        Paper dictionary with metadata
+    """
+    url = _text(entry, "atom:id").strip()
+    paper_id = url.split("/abs/")[-1]
+    paper_base, version = split_arxiv_id(paper_id)
+
+    pdf_url = None
+    for link in entry.findall("atom:link", _NS):
+        if link.get("title") == "pdf":
+            pdf_url = link.get("href")
+
+    primary = entry.find("arxiv:primary_category", _NS)
+    published = datetime.fromisoformat(
+        _text(entry, "atom:published").strip().replace("Z", "+00:00")
+    )
+
+    return {
+        "id": paper_id,
+        "base_id": paper_base,
+        "version": version,
+        "title": " ".join(_text(entry, "atom:title").split()),
+        "authors": [
+            _text(author, "atom:name").strip()
+            for author in entry.findall("atom:author", _NS)
+        ],
+        "abstract": _text(entry, "atom:summary").strip().replace("\n", " "),
+        "url": url,
+        "pdf_url": pdf_url,
+        "published": published.isoformat(),
+        "categories": [
+            category.get("term") for category in entry.findall("atom:category", _NS)
+        ],
+        "primary_category": primary.get("term") if primary is not None else None,
+    }
+
+
+def parse_feed(body: bytes) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Parse a query response.
+
+    Args:
+        body: Atom XML returned by the API
+
+    Returns:
+        Tuple of (papers on this page, total number of matching results)
+
+    Raises:
+        ArxivApiError: If the API answered with an error entry
+    """
+    root = ET.fromstring(body)
+    entries = root.findall("atom:entry", _NS)
+    if len(entries) == 1 and "api/errors" in _text(entries[0], "atom:id"):
+        raise ArxivApiError(_text(entries[0], "atom:summary").strip())
+
+    total = _text(root, "opensearch:totalResults").strip()
+    return [parse_entry(entry) for entry in entries], int(total or 0)
+
+
+class ArxivClient:
+    """Paginated search against the arXiv query API."""
+
+    def __init__(
+        self,
+        http: HttpClient,
+        api_url: str = ARXIV_API_URL,
+        page_size: int = PAGE_SIZE,
+        max_retries: int = 3,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            http: HTTP client used for all requests
+            api_url: Query endpoint (a local stand-in server in tests)
+            page_size: Number of results requested per page
+            max_retries: Retries of a page that comes back short although
+                more results remain
+        """
+        self.http = http
+        self.api_url = api_url
+        self.page_size = page_size
+        self.max_retries = max_retries
+
+    def fetch_page(self, query: str, start: int, max_results: int):
+        """
+        Fetch one page of results, newest submissions first.
+
+        Args:
+            query: Search query string
+            start: Offset of the first result
+            max_results: Number of results on the page
+
+        Returns:
+            Tuple of (papers, total number of matching results)
+
+        Raises:
+            IncompletePageError: If the page holds fewer than max_results
+                papers although the total says more results remain
+        """
+        params = {
+            "search_query": query,
+            "start": start,
+            "max_results": max_results,
+            "sortBy": "submittedDate",
+            "sortOrder": "descending",
+        }
+
+        def parse(body: bytes):
+            with metrics.timer("feed_parse_seconds"):
+                papers, total = parse_feed(body)
+            # arXiv intermittently serves short or empty pages mid-listing
+            if len(papers) < max_results and start + len(papers) < total:
+                raise IncompletePageError(
+                    f"Page at {start} has {len(papers)} of {max_results} results "
+                    f"({total} in total)"
+                )
+            return papers, total
+
+        # Error feeds and incomplete pages raise before the response is cached
+        result = self.http.get(self.api_url, params=params, parse=parse)
+        metrics.increment("fetch_pages_total")
+        return result
+
+    def search(self, query: str, max_results: int) -> Iterator[Dict[str, Any]]:
+        """
+        Stream search results page by page.
+
+        Args:
+            query: Search query string
+            max_results: Maximum number of results
+
+        Yields:
+            Paper dictionaries, newest first
+
+        Raises:
+            IncompletePageError: If a page is still incomplete after
+                max_retries retries
+        """
+        start = 0
+        while start < max_results:
+            size = min(self.page_size, max_results - start)
+            for attempt in range(self.max_retries + 1):
+                try:
+                    papers, total = self.fetch_page(query, start, size)
+                    break
+                except IncompletePageError as e:
+                    if attempt == self.max_retries:
+                        metrics.increment("fetch_incomplete_pages_total")
+                        raise
+                    metrics.increment("fetch_page_retries_total")
+                    logger.warning(
+                        f"Incomplete page (attempt {attempt + 1}/"
+                        f"{self.max_retries + 1}): {e}"
+                    )
+            yield from papers
+            start += len(papers)
+            # Only the final page may be short
+            if start >= total:
+                break
@@ -0,0 +1,70 @@
+"""
+Version-aware arXiv identifiers.
+
+A paper keeps its base ID across revisions ("2601.05640v1" and
+"2601.05640v2" are the same paper), so deduplication and read tracking use
+the base ID while the full ID still names the fetched version.
+"""
+
+import hashlib
+import re
+from typing import Optional, Tuple
+
+_VERSION_RE = re.compile(r"^(?P<base>.+?)v(?P<version>\d+)$")
+
+
+def split_arxiv_id(paper_id: str) -> Tuple[str, Optional[int]]:
+    """
+    Split an arXiv ID into its base ID and version.
+
+    Args:
+        paper_id: arXiv ID, e.g. "2601.05640v2" or "math/0501001v1"
+
+    Returns:
+        Tuple of (base ID, version), with version None if the ID has none
+    """
+    match = _VERSION_RE.match(paper_id)
+    if match is None:
+        return paper_id, None
+    return match.group("base"), int(match.group("version"))
+
+
+def base_id(paper_id: str) -> str:
+    """
+    Get the version-independent part of an arXiv ID.
+
+    Args:
+        paper_id: arXiv ID with or without version
+
+    Returns:
+        Base ID
+    """
+    return split_arxiv_id(paper_id)[0]
+
+
+def abstract_hash(abstract: str) -> str:
+    """
+    Hash an abstract, ignoring case and whitespace changes.
+
+    Args:
+        abstract: Abstract text
+
+    Returns:
+        Short hex digest
+    """
+    normalized = " ".join(abstract.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def newer_version(paper: dict, other: dict) -> bool:
+    """
+    Check whether a paper is a later version than another copy of it.
+
+    Args:
+        paper: Paper dictionary
+        other: Paper dictionary with the same base ID
+
+    Returns:
+        True if paper has a higher version number
+    """
+    return (split_arxiv_id(paper["id"])[1] or 0) > (split_arxiv_id(other["id"])[1] or 0)
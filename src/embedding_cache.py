@@ -0,0 +1,385 @@
+"""
+Persistent on-disk cache of paper embeddings.
+
+Embeddings are stored normalized to unit length in a memory-mapped matrix
+(float32, or a compact float16/int8 form, see quantization.py) with a JSON
+index mapping cache keys to matrix rows. Keys combine the base arXiv ID and a
+hash of the encoded text, so a new version with unchanged text reuses its
+embedding; each model gets its own cache directory.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from quantization import DTYPES, QuantizedMatrix
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    """
+    Compute a short stable hash of a text.
+
+    Args:
+        text: Text to hash
+
+    Returns:
+        Hex digest identifying the text
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class EmbeddingCache:
+    """Memory-mapped embedding store with LRU eviction."""
+
+    # Bumped when the stored embeddings change meaning (2: unit length)
+    VERSION = 2
+    INDEX_FILE = "index.json"
+    MATRIX_FILES = {
+        "float32": "embeddings.f32",
+        "float16": "embeddings.f16",
+        "int8": "embeddings.i8",
+    }
+    SCALES_FILE = "scales.f32"
+
+    def __init__(
+        self,
+        cache_dir: str = "data/cache/embeddings",
+        model_name: str = "all-MiniLM-L6-v2",
+        max_entries: int = 50000,
+        dtype: str = "float32",
+        read_only: bool = False,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Root directory for cached embeddings
+            model_name: Name of the model the embeddings come from
+            max_entries: Maximum number of embeddings kept on disk
+            dtype: Storage format: "float32", "float16" or "int8"
+            read_only: Only read the cache: new embeddings are not stored, and
+                an incompatible cache is ignored instead of cleared
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown embedding dtype: {dtype}")
+        model_slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.cache_dir = os.path.join(cache_dir, model_slug)
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.dtype = dtype
+        self.read_only = read_only
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.dim: Optional[int] = None
+        self.capacity = 0
+        self.entries: Dict[str, List[float]] = {}  # key -> [row, last_used]
+        self.free_rows: List[int] = []
+        # Rows evicted since the last save: the index on disk may still map
+        # keys to them, so they are only reused once the new index is saved
+        self.released_rows: List[int] = []
+        self.matrix: Optional[np.memmap] = None
+        self.scales: Optional[np.memmap] = None
+
+        self._load()
+
+    @staticmethod
+    def make_key(paper_id: str, text: str) -> str:
+        """
+        Build the cache key for a paper.
+
+        Args:
+            paper_id: Base arXiv ID (without version)
+            text: Text that is encoded for the paper
+
+        Returns:
+            Cache key string
+        """
+        return f"{paper_id}:{text_hash(text)}"
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, self.INDEX_FILE)
+
+    def _matrix_path(self, dtype: str = None) -> str:
+        return os.path.join(self.cache_dir, self.MATRIX_FILES[dtype or self.dtype])
+
+    def _scales_path(self) -> str:
+        return os.path.join(self.cache_dir, self.SCALES_FILE)
+
+    def _map(self):
+        """Memory-map the matrix (and int8 scales) at the current capacity."""
+        mode = "r" if self.read_only else "r+"
+        self.matrix = np.memmap(
+            self._matrix_path(),
+            dtype=DTYPES[self.dtype],
+            mode=mode,
+            shape=(self.capacity, self.dim),
+        )
+        if self.dtype == "int8":
+            self.scales = np.memmap(
+                self._scales_path(), dtype=np.float32, mode=mode, shape=(self.capacity,)
+            )
+
+    def _load(self):
+        """Load the index and map the embedding matrix."""
+        index_path = self._index_path()
+        if not os.path.exists(index_path):
+            return
+
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+            stored_dtype = index.get("dtype", "float32")
+            if index.get("version", 1) != self.VERSION:
+                problem = "Embedding cache format changed"
+            elif stored_dtype != self.dtype:
+                problem = (
+                    f"Embedding cache holds {stored_dtype} embeddings, not {self.dtype}"
+                )
+            else:
+                problem = None
+            if problem and self.read_only:
+                logger.warning(f"{problem}; not using it")
+                return
+            if problem:
+                logger.warning(f"{problem}; clearing cache")
+                self.clear()
+                return
+            self.dim = index["dim"]
+            self.capacity = index["capacity"]
+            self.entries = index["entries"]
+            self.free_rows = index.get("free_rows", [])
+            self._map()
+            logger.info(
+                f"Loaded embedding cache with {len(self.entries)} entries "
+                f"from {self.cache_dir}"
+            )
+        except Exception as e:
+            logger.warning(f"Error loading embedding cache, starting empty: {e}")
+            self.dim = None
+            self.capacity = 0
+            self.entries = {}
+            self.free_rows = []
+            self.released_rows = []
+            self.matrix = None
+            self.scales = None
+
+    def _grow(self, needed: int):
+        """Grow the backing matrix so that at least `needed` rows exist."""
+        new_capacity = min(max(needed, 2 * self.capacity, 1024), self.max_entries)
+        new_capacity = max(new_capacity, needed)
+        if new_capacity <= self.capacity:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if self.matrix is not None:
+            self.flush()
+            self.matrix = self.scales = None
+        with open(self._matrix_path(), "ab") as f:
+            f.truncate(new_capacity * self.dim * np.dtype(DTYPES[self.dtype]).itemsize)
+        if self.dtype == "int8":
+            with open(self._scales_path(), "ab") as f:
+                f.truncate(new_capacity * np.dtype(np.float32).itemsize)
+
+        self.free_rows.extend(range(self.capacity, new_capacity))
+        self.capacity = new_capacity
+        self._map()
+
+    def flush(self):
+        """Write memory-mapped changes to disk."""
+        if self.matrix is not None:
+            self.matrix.flush()
+        if self.scales is not None:
+            self.scales.flush()
+
+    def _evict(self, count: int, protected: set):
+        """Evict the `count` least recently used entries not in `protected`."""
+        candidates = sorted(
+            (k for k in self.entries if k not in protected),
+            key=lambda k: self.entries[k][1],
+        )
+        for key in candidates[:count]:
+            row, _ = self.entries.pop(key)
+            self.released_rows.append(int(row))
+            self.evictions += 1
+
+    def _lookup(self, keys: List[str]) -> List[Optional[int]]:
+        """Find the matrix row of each key, updating counters and LRU times."""
+        now = time.time()
+        rows = []
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is None or self.matrix is None:
+                self.misses += 1
+                rows.append(None)
+                continue
+            self.hits += 1
+            entry[1] = now
+            rows.append(int(entry[0]))
+        return rows
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up embeddings for a list of keys.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            List with a float32 embedding for each hit and None for each miss
+        """
+        stored = (
+            QuantizedMatrix(self.matrix, self.scales)
+            if self.matrix is not None
+            else None
+        )
+        return [
+            None if row is None else stored.to_float(row) for row in self._lookup(keys)
+        ]
+
+    def get_many_quantized(
+        self, keys: List[str]
+    ) -> Tuple[Optional[QuantizedMatrix], List[int]]:
+        """
+        Look up embeddings in their stored form.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Matrix with a row per key (zero for misses, None if the cache is
+            empty) and the positions of the missing keys
+        """
+        rows = self._lookup(keys)
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if self.matrix is None:
+            return None, missing
+
+        result = QuantizedMatrix.empty(len(keys), self.dim, self.dtype)
+        hits = [i for i, row in enumerate(rows) if row is not None]
+        if hits:
+            result.assign(
+                hits,
+                QuantizedMatrix(self.matrix, self.scales).rows([rows[i] for i in hits]),
+            )
+        return result, missing
+
+    def put_many(self, keys: List[str], embeddings: Union[np.ndarray, QuantizedMatrix]):
+        """
+        Store embeddings, evicting old entries if the cache is full.
+
+        Evicted rows are not overwritten before the next save(), so the
+        matrix can briefly hold more than max_entries rows.
+
+        Args:
+            keys: Cache keys
+            embeddings: Matrix with one embedding per key, as float embeddings
+                (normalized on storage) or already in the cache's format
+        """
+        if not keys or self.read_only:
+            return
+
+        if not isinstance(embeddings, QuantizedMatrix):
+            embeddings = QuantizedMatrix.from_float(embeddings, self.dtype)
+        dim = embeddings.codes.shape[1]
+        if self.dim is None:
+            self.dim = dim
+        elif dim != self.dim:
+            logger.warning(
+                f"Embedding dimension changed ({self.dim} -> {dim}), clearing cache"
+            )
+            self.clear()
+            self.dim = dim
+
+        # Only the newest max_entries embeddings can be kept
+        if len(keys) > self.max_entries:
+            keys = keys[-self.max_entries :]
+            embeddings = embeddings.rows(slice(-self.max_entries, None))
+
+        new_keys = [k for k in dict.fromkeys(keys) if k not in self.entries]
+        overflow = len(self.entries) + len(new_keys) - self.max_entries
+        if overflow > 0:
+            self._evict(overflow, protected=set(keys))
+
+        needed = len(new_keys) - len(self.free_rows)
+        if needed > 0:
+            self._grow(self.capacity + needed)
+
+        now = time.time()
+        rows = []
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = [self.free_rows.pop(), now]
+                self.entries[key] = entry
+            entry[1] = now
+            rows.append(int(entry[0]))
+        # Repeated keys keep their last embedding, as with sequential writes
+        last = list({row: i for i, row in enumerate(rows)}.items())
+        QuantizedMatrix(self.matrix, self.scales).assign(
+            [row for row, _ in last], embeddings.rows([i for _, i in last])
+        )
+
+    def save(self):
+        """Flush the matrix and atomically write the index."""
+        if self.matrix is None or self.read_only:
+            return
+
+        self.flush()
+        index = {
+            "version": self.VERSION,
+            "model": self.model_name,
+            "dtype": self.dtype,
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "entries": self.entries,
+            "free_rows": self.free_rows + self.released_rows,
+        }
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self._index_path())
+        self.free_rows.extend(self.released_rows)
+        self.released_rows = []
+
+        logger.info(
+            f"Embedding cache: {self.hits} hits, {self.misses} misses, "
+            f"{self.evictions} evictions, {len(self.entries)} entries"
+        )
+
+    def clear(self):
+        """Remove all cached embeddings."""
+        self.matrix = None
+        self.scales = None
+        self.entries = {}
+        self.free_rows = []
+        self.released_rows = []
+        self.capacity = 0
+        self.dim = None
+        paths = [self._index_path(), self._scales_path()]
+        paths += [self._matrix_path(dtype) for dtype in self.MATRIX_FILES]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+        }
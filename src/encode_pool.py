@@ -0,0 +1,143 @@
+"""
+Multi-process encoding for large candidate sets.
+
+Each worker process loads the encoder backend once and writes the
+embeddings of its chunk of texts straight into a shared-memory matrix, so no
+embeddings are pickled back to the parent.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Chunks per worker; several smaller chunks balance uneven text lengths
+CHUNKS_PER_WORKER = 4
+
+# Model of the current worker process
+_worker_model = None
+
+
+def _init_worker(encoder_options: Dict[str, Any]):
+    """Load the encoder in a worker process."""
+    global _worker_model
+    from encoders import create_encoder
+
+    _worker_model = create_encoder(**encoder_options)
+
+
+def _dimension() -> int:
+    """Return the embedding dimension of the worker's model."""
+    return _worker_model.get_sentence_embedding_dimension()
+
+
+def _encode_chunk(
+    shm_name: str,
+    shape: Tuple[int, int],
+    start: int,
+    texts: List[str],
+    kwargs: dict,
+) -> int:
+    """Encode texts into rows start.. of the shared output matrix."""
+    embeddings = _worker_model.encode(texts, convert_to_tensor=False, **kwargs)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        output = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        output[start : start + len(texts)] = embeddings
+        del output
+    finally:
+        shm.close()
+    return len(texts)
+
+
+class EncodePool:
+    """Pool of worker processes with a SentenceTransformer-like encode()."""
+
+    def __init__(self, encoder_options: Dict[str, Any], workers: Optional[int] = None):
+        """
+        Start the worker processes (each loads the model in the background).
+
+        Args:
+            encoder_options: Keyword arguments of encoders.create_encoder();
+                its 'threads' are per worker (defaults to an even share of
+                the CPUs)
+            workers: Number of worker processes (defaults to the CPU count)
+        """
+        cpus = os.cpu_count() or 1
+        self.workers = workers or cpus
+        threads = encoder_options.get("threads") or max(1, cpus // self.workers)
+        encoder_options = {**encoder_options, "threads": threads}
+        self.dim: Optional[int] = None
+
+        logger.info(
+            f"Starting {self.workers} encoding workers with {threads} threads each"
+        )
+        # Spawned workers avoid sharing torch state forked from the parent
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(encoder_options,),
+        )
+
+    def encode(
+        self,
+        sentences: List[str],
+        convert_to_tensor: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        """
+        Encode texts across the worker processes.
+
+        Args:
+            sentences: List of texts
+            convert_to_tensor: Unsupported; embeddings are always NumPy arrays
+            **kwargs: Extra keyword arguments for SentenceTransformer.encode
+
+        Returns:
+            Matrix of embeddings in input order
+        """
+        if self.dim is None:
+            self.dim = self.executor.submit(_dimension).result()
+
+        texts = list(sentences)
+        shape = (len(texts), self.dim)
+        if not texts:
+            return np.zeros(shape, dtype=np.float32)
+
+        chunk_size = math.ceil(len(texts) / (self.workers * CHUNKS_PER_WORKER))
+        size = max(1, len(texts) * self.dim * np.dtype(np.float32).itemsize)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            futures = [
+                self.executor.submit(
+                    _encode_chunk,
+                    shm.name,
+                    shape,
+                    start,
+                    texts[start : start + chunk_size],
+                    kwargs,
+                )
+                for start in range(0, len(texts), chunk_size)
+            ]
+            for future in futures:
+                future.result()
+            embeddings = np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+        return embeddings
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        self.executor.shutdown()
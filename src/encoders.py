@@ -0,0 +1,426 @@
+"""
+Text encoder backends for the ranker.
+
+Every backend has a SentenceTransformer-like encode(sentences, batch_size,
+normalize_embeddings) returning NumPy arrays:
+
+- SentenceTransformerEncoder: sentence-transformers on PyTorch
+- OnnxEncoder: an exported model on ONNX Runtime, optionally int8-quantized
+- RemoteEncoder (model_server.py): a warm model in a long-lived server
+
+The ONNX backend needs `onnxruntime` and `tokenizers` only; exporting a model
+additionally needs sentence-transformers and `onnx`:
+
+    python src/encoders.py export --model all-MiniLM-L6-v2 --quantize
+    python src/encoders.py compare --onnx-dir data/models/all-MiniLM-L6-v2-onnx
+"""
+
+import argparse
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from quantization import normalize
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("sentence-transformers", "onnx")
+
+ONNX_CONFIG_FILE = "encoder_config.json"
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_int8.onnx"
+
+# Minimum cosine similarity between ONNX and PyTorch embeddings of the same
+# text accepted by `compare`
+ONNX_TOLERANCE = {"float32": 0.9999, "int8": 0.99}
+
+
+class Encoder(ABC):
+    """Interface of the encoder backends."""
+
+    @abstractmethod
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        convert_to_tensor: bool = False,
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        """
+        Encode texts.
+
+        Args:
+            sentences: A text or list of texts
+            convert_to_tensor: Unsupported; embeddings are always NumPy arrays
+            batch_size: Number of texts per inference batch
+            normalize_embeddings: Scale embeddings to unit length
+            **kwargs: Backend-specific options
+
+        Returns:
+            Embedding (for a single text) or matrix of embeddings
+        """
+
+    @abstractmethod
+    def get_sentence_embedding_dimension(self) -> int:
+        """Return the embedding dimension."""
+
+
+class SentenceTransformerEncoder(Encoder):
+    """sentence-transformers model running on PyTorch."""
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        threads: Optional[int] = None,
+        max_seq_length: Optional[int] = None,
+    ):
+        """
+        Load the model.
+
+        Args:
+            model_name: Name of the sentence-transformers model
+            threads: CPU threads used by torch (library default if None)
+            max_seq_length: Truncate texts to this many tokens (model
+                default if None)
+        """
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            import torch
+
+            torch.set_num_threads(threads)
+
+        logger.info(f"Loading sentence transformer model: {model_name}")
+        self.model = SentenceTransformer(model_name)
+        if max_seq_length:
+            self.model.max_seq_length = max_seq_length
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        convert_to_tensor: bool = False,
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        return self.model.encode(
+            sentences,
+            convert_to_tensor=False,
+            batch_size=batch_size,
+            normalize_embeddings=normalize_embeddings,
+            **kwargs,
+        )
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+
+class OnnxEncoder(Encoder):
+    """Exported transformer on ONNX Runtime with mean pooling."""
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantized: bool = False,
+        threads: Optional[int] = None,
+        max_seq_length: Optional[int] = None,
+    ):
+        """
+        Load an exported model.
+
+        Args:
+            model_dir: Directory written by export_onnx()
+            quantized: Use the int8-quantized model
+            threads: Intra-op CPU threads (library default if None)
+            max_seq_length: Truncate texts to this many tokens (exported
+                model default if None)
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE), "r") as f:
+            self.config = json.load(f)
+
+        model_file = ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        logger.info(f"Loading ONNX model: {os.path.join(model_dir, model_file)}")
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(
+            max_length=max_seq_length or self.config["max_seq_length"]
+        )
+        self.tokenizer.enable_padding(pad_id=self.config.get("pad_token_id", 0))
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        convert_to_tensor: bool = False,
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start : start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array(
+                [e.attention_mask for e in encodings], dtype=np.int64
+            )
+            inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                inputs["token_type_ids"] = np.array(
+                    [e.type_ids for e in encodings], dtype=np.int64
+                )
+            token_embeddings = self.session.run(None, inputs)[0]
+
+            # Mean pooling over the non-padding tokens
+            mask = attention_mask[..., None].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            batches.append(summed / np.clip(mask.sum(axis=1), 1e-9, None))
+
+        dim = self.get_sentence_embedding_dimension()
+        embeddings = (
+            np.vstack(batches).astype(np.float32)
+            if batches
+            else np.zeros((0, dim), dtype=np.float32)
+        )
+        if normalize_embeddings or self.config.get("normalize", False):
+            embeddings = normalize(embeddings)
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimension"]
+
+
+def create_encoder(
+    backend: str = "sentence-transformers",
+    model_name: str = "all-MiniLM-L6-v2",
+    onnx_dir: Optional[str] = None,
+    onnx_quantized: bool = False,
+    threads: Optional[int] = None,
+    max_seq_length: Optional[int] = None,
+) -> Encoder:
+    """
+    Create an encoder backend.
+
+    Args:
+        backend: "sentence-transformers" or "onnx"
+        model_name: Name of the sentence-transformers model
+        onnx_dir: Directory of the exported ONNX model (defaults to
+            data/models/<model_name>-onnx)
+        onnx_quantized: Use the int8-quantized ONNX model
+        threads: CPU threads for inference (library default if None)
+        max_seq_length: Truncate texts to this many tokens (model default if None)
+
+    Returns:
+        Encoder instance
+    """
+    if backend == "sentence-transformers":
+        return SentenceTransformerEncoder(model_name, threads, max_seq_length)
+    if backend == "onnx":
+        return OnnxEncoder(
+            onnx_dir or default_onnx_dir(model_name),
+            quantized=onnx_quantized,
+            threads=threads,
+            max_seq_length=max_seq_length,
+        )
+    raise ValueError(f"Unknown encoder backend: {backend} (expected one of {BACKENDS})")
+
+
+def embedding_options(
+    backend: str = "sentence-transformers",
+    model_name: str = "all-MiniLM-L6-v2",
+    onnx_quantized: bool = False,
+    max_seq_length: Optional[int] = None,
+    **unused,
+) -> Dict[str, Any]:
+    """
+    Select the create_encoder() options that change the embeddings.
+
+    Thread counts and model paths do not, so an encoder created with other
+    values for them can share an embedding cache.
+
+    Args:
+        backend: "sentence-transformers" or "onnx"
+        model_name: Name of the sentence-transformers model
+        onnx_quantized: Use the int8-quantized ONNX model
+        max_seq_length: Truncate texts to this many tokens (model default if None)
+        **unused: Other create_encoder() options
+
+    Returns:
+        Options identifying the embeddings an encoder produces
+    """
+    return {
+        "backend": backend,
+        "model_name": model_name,
+        "onnx_quantized": backend == "onnx" and bool(onnx_quantized),
+        "max_seq_length": max_seq_length,
+    }
+
+
+def default_onnx_dir(model_name: str) -> str:
+    """Default export directory of a model."""
+    return os.path.join("data", "models", f"{os.path.basename(model_name)}-onnx")
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = False):
+    """
+    Export a sentence-transformers model for the ONNX backend.
+
+    Args:
+        model_name: Name of the sentence-transformers model
+        output_dir: Directory for the model, tokenizer and config
+        quantize: Also write a dynamically int8-quantized model
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    module_names = [type(module).__name__ for module in model]
+    pooling = model[1] if len(model) > 1 else None
+    if getattr(pooling, "pooling_mode_mean_tokens", False) is not True:
+        raise ValueError(f"{model_name} does not use mean pooling: {module_names}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    model.tokenizer.save_pretrained(output_dir)
+
+    transformer = model[0].auto_model.eval()
+    sample = model.tokenizer(["an example sentence"], return_tensors="pt")
+    input_names = [
+        name
+        for name in ("input_ids", "attention_mask", "token_type_ids")
+        if name in sample
+    ]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    logger.info(f"Exported {model_name} to {model_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(output_dir, ONNX_QUANTIZED_MODEL_FILE)
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        logger.info(f"Wrote int8-quantized model to {quantized_path}")
+
+    config = {
+        "model": model_name,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "pad_token_id": model.tokenizer.pad_token_id or 0,
+        "normalize": "Normalize" in module_names,
+    }
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILE), "w") as f:
+        json.dump(config, f, indent=2)
+
+
+def compare_backends(
+    model_name: str, onnx_dir: str, texts: List[str], quantized: bool = False
+) -> float:
+    """
+    Compare ONNX embeddings with the PyTorch ones.
+
+    Args:
+        model_name: Name of the sentence-transformers model
+        onnx_dir: Directory of the exported model
+        texts: Texts to encode with both backends
+        quantized: Compare the int8-quantized model
+
+    Returns:
+        Minimum cosine similarity between the two embeddings of a text
+    """
+    reference = SentenceTransformerEncoder(model_name).encode(
+        texts, normalize_embeddings=True
+    )
+    onnx = OnnxEncoder(onnx_dir, quantized=quantized).encode(
+        texts, normalize_embeddings=True
+    )
+    return float(np.min(np.sum(reference * onnx, axis=1)))
+
+
+def main():
+    """Export an ONNX model or check it against PyTorch."""
+    parser = argparse.ArgumentParser(description="Encoder backends")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export a model to ONNX")
+    export_parser.add_argument("--output", help="Output directory")
+    export_parser.add_argument(
+        "--quantize", action="store_true", help="Also write an int8 model"
+    )
+    compare_parser = subparsers.add_parser(
+        "compare", help="Check ONNX embeddings against PyTorch"
+    )
+    compare_parser.add_argument("--onnx-dir", help="Exported model directory")
+    compare_parser.add_argument(
+        "--quantized", action="store_true", help="Check the int8 model"
+    )
+    compare_parser.add_argument(
+        "--db", default="data/papers.db", help="Paper store with texts to compare"
+    )
+    compare_parser.add_argument(
+        "--limit", type=int, default=500, help="Number of papers to compare"
+    )
+    parser.add_argument(
+        "--model", default="all-MiniLM-L6-v2", help="Sentence-transformers model"
+    )
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx(
+            args.model, args.output or default_onnx_dir(args.model), args.quantize
+        )
+        return
+
+    from paper_store import PaperStore
+
+    texts = [
+        f"{p['title']} {p['abstract']}"
+        for p in PaperStore(args.db).iter_papers(limit=args.limit)
+    ]
+    if not texts:
+        raise SystemExit(f"No papers in {args.db} to compare")
+
+    similarity = compare_backends(
+        args.model,
+        args.onnx_dir or default_onnx_dir(args.model),
+        texts,
+        quantized=args.quantized,
+    )
+    tolerance = ONNX_TOLERANCE["int8" if args.quantized else "float32"]
+    print(f"Minimum cosine similarity over {len(texts)} papers: {similarity:.6f}")
+    if similarity < tolerance:
+        raise SystemExit(f"Below the tolerance of {tolerance}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,35 +3,106 @@ Fetch papers from arXiv API based on configured topics.
 """
 
 import logging
-import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-import arxiv
+import metrics
+from arxiv_api import ARXIV_API_URL, ARXIV_REQUESTS_PER_SECOND, ArxivClient
+from fetch_state import HighWaterMarks
+from http_cache import HttpCache, HttpClient
+from query_planner import assign_papers, plan_queries
+from rate_limiter import TokenBucket
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+# Default cap on a category listing: ten result pages, so a busy category
+# such as cs.LG costs a bounded number of requests
+LISTING_MAX_RESULTS = 1000
+
 
 class ArxivFetcher:
     """Fetch papers from arXiv API."""
 
-    def __init__(self, days_back: int = 7, max_results: int = 100):
+    def __init__(
+        self,
+        days_back: int = 7,
+        max_results: int = 100,
+        concurrency: int = 1,
+        requests_per_second: float = ARXIV_REQUESTS_PER_SECOND,
+        consolidate_queries: bool = False,
+        listing_max_results: int = LISTING_MAX_RESULTS,
+        incremental: bool = False,
+        state_file: str = "data/fetch_state.json",
+        api_url: str = ARXIV_API_URL,
+        http_cache_dir: Optional[str] = "data/cache/http",
+        http_cache_ttl: float = 3600,
+        http_cache_max_age: Optional[float] = 30 * 86400,
+        http_cache_max_bytes: Optional[int] = 256 * 2**20,
+        max_retries: int = 3,
+    ):
         """
         Initialize the fetcher.
 
         Args:
             days_back: Number of days to look back for papers
             max_results: Maximum number of results to fetch per query
+            concurrency: Number of topic queries to run in parallel
+            requests_per_second: Request budget shared by all fetch threads
+                (defaults to arXiv's limit of one request every 3 seconds)
+            consolidate_queries: Fetch shared category listings once and match
+                topic queries locally instead of querying each topic
+            listing_max_results: Maximum number of results of a category
+                listing; listings stop at the look-back cutoff (or high-water
+                mark) or at this cap, whichever comes first
+            incremental: Stop fetching at the newest paper seen by the previous run
+            state_file: Path to the persisted high-water marks for incremental mode
+            api_url: arXiv query endpoint
+            http_cache_dir: Directory of the HTTP response cache (None disables it)
+            http_cache_ttl: Seconds a cached response is used without
+                revalidating it with the server
+            http_cache_max_age: Seconds after which an unused cached response
+                is deleted (None keeps responses of any age)
+            http_cache_max_bytes: Size the HTTP cache is trimmed to at startup,
+                oldest responses first (None for no limit)
+            max_retries: Retries of a failed result page before the query
+                returns partial results
         """
         self.days_back = days_back
         self.max_results = max_results
-        self.rate_limit_delay = 3  # arXiv allows 3 requests per second
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = TokenBucket(rate=requests_per_second)
+        self.consolidate_queries = consolidate_queries
+        self.listing_max_results = listing_max_results
+        self.incremental = incremental
+        self.marks = HighWaterMarks(state_file) if incremental else None
+        http_cache = None
+        if http_cache_dir:
+            http_cache = HttpCache(
+                http_cache_dir, http_cache_ttl, http_cache_max_age, http_cache_max_bytes
+            )
+            # Before any fetch thread writes to the cache
+            http_cache.prune()
+        self.http = HttpClient(
+            cache=http_cache,
+            rate_limiter=self.rate_limiter,
+            pool_size=self.concurrency,
+            max_retries=max_retries,
+        )
+        self.client = ArxivClient(self.http, api_url, max_retries=max_retries)
 
     def fetch_papers(
-        self, query: str, categories: List[str] = None
+        self,
+        query: str,
+        categories: List[str] = None,
+        max_results: Optional[int] = None,
+        mark_key: Optional[str] = None,
+        warn_on_limit: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         Fetch papers from arXiv based on query.
@@ -39,89 +110,121 @@ class ArxivFetcher:
         Args:
             query: Search query string
             categories: List of arXiv categories to filter by
+            max_results: Override for the maximum number of results
+            mark_key: Key of the high-water mark in incremental mode
+                (defaults to the query)
+            warn_on_limit: Log a warning if max_results is reached before
+                the cutoff
 
         Returns:
             List of paper dictionaries with metadata
         """
+        return list(
+            self.iter_papers(query, categories, max_results, mark_key, warn_on_limit)
+        )
+
+    def iter_papers(
+        self,
+        query: str,
+        categories: List[str] = None,
+        max_results: Optional[int] = None,
+        mark_key: Optional[str] = None,
+        warn_on_limit: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream papers from arXiv as result pages arrive.
+
+        Results arrive newest first, so fetching stops at the first paper
+        older than the look-back window or, in incremental mode, at the
+        high-water mark left by the previous run.
+
+        Args:
+            query: Search query string
+            categories: List of arXiv categories to filter by
+            max_results: Override for the maximum number of results
+            mark_key: Key of the high-water mark in incremental mode
+                (defaults to the query)
+            warn_on_limit: Log a warning if max_results is reached before
+                the cutoff
+
+        Yields:
+            Paper dictionaries with metadata
+        """
         logger.info(f"Fetching papers for query: {query}")
+        if max_results is None:
+            max_results = self.max_results
 
         # Calculate date filter (make it timezone-aware)
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=self.days_back)
 
-        papers = []
-        retry_count = 0
-        max_retries = 3
-
-        while retry_count < max_retries:
-            try:
-                # Create search object
-                search = arxiv.Search(
-                    query=query,
-                    max_results=self.max_results,
-                    sort_by=arxiv.SortCriterion.SubmittedDate,
-                    sort_order=arxiv.SortOrder.Descending,
-                )
-
-                # Fetch results
-                for result in search.results():
-                    # Filter by date
-                    if result.published < cutoff_date:
-                        continue
-
-                    # Filter by categories if specified
-                    # Handle both string and object category formats
-                    if categories:
-                        paper_categories = []
-                        for cat in result.categories:
-                            if isinstance(cat, str):
-                                paper_categories.append(cat)
-                            else:
-                                paper_categories.append(cat.term)
-                        if not any(cat in categories for cat in paper_categories):
-                            continue
-
-                    # Extract paper metadata
-                    # Handle both string and object category formats
-                    result_categories = []
-                    for cat in result.categories:
-                        if isinstance(cat, str):
-                            result_categories.append(cat)
-                        else:
-                            result_categories.append(cat.term)
-
-                    paper = {
-                        "id": result.entry_id.split("/")[-1],
-                        "title": result.title,
-                        "authors": [author.name for author in result.authors],
-                        "abstract": result.summary.replace("\n", " "),
-                        "url": result.entry_id,
-                        "pdf_url": result.pdf_url,
-                        "published": result.published.isoformat(),
-                        "categories": result_categories,
-                        "primary_category": result.primary_category,
-                    }
-
-                    papers.append(paper)
-
-                logger.info(f"Fetched {len(papers)} papers")
-                break
-
-            except Exception as e:
-                retry_count += 1
-                logger.warning(
-                    f"Error fetching papers (attempt {retry_count}/{max_retries}): {e}"
-                )
-                if retry_count < max_retries:
-                    wait_time = 2**retry_count  # Exponential backoff
-                    logger.info(f"Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error("Max retries reached. Returning partial results.")
-
-        # Rate limiting
-        time.sleep(1 / self.rate_limit_delay)
-
-        return papers
+        # In incremental mode, never go further back than the previous run
+        mark_key = mark_key or query
+        mark_ids = set()
+        if self.incremental:
+            mark = self.marks.get(mark_key)
+            if mark is not None:
+                mark_date, mark_ids = mark
+                if mark_date > cutoff_date:
+                    logger.info(f"Resuming from high-water mark {mark_date}")
+                    cutoff_date = mark_date
+
+        # Papers can reappear on a later page if new submissions shift results
+        yielded = set()
+        seen = {}
+        scanned = 0
+        # Set once paging reaches the cutoff or the last result
+        complete = False
+
+        try:
+            # Pages are fetched lazily and wait for the shared request budget
+            # unless served from the HTTP cache; a failed page is retried on
+            # its own by the HTTP client
+            for paper in self.client.search(query, max_results):
+                # Stop paginating once results are older than the cutoff
+                if datetime.fromisoformat(paper["published"]) < cutoff_date:
+                    complete = True
+                    break
+                scanned += 1
+
+                paper_id = paper["id"]
+                if paper_id in mark_ids or paper_id in yielded:
+                    continue
+                seen[paper_id] = {"id": paper_id, "published": paper["published"]}
+
+                # Filter by categories if specified
+                if categories and not any(
+                    cat in categories for cat in paper["categories"]
+                ):
+                    metrics.increment("papers_dropped_total", reason="category")
+                    continue
+
+                yielded.add(paper_id)
+                yield paper
+            else:
+                # The API ran out of results (a page still incomplete after
+                # retries raises instead), unless max_results cut the search short
+                if scanned < max_results:
+                    complete = True
+                elif warn_on_limit:
+                    logger.warning(
+                        f"Reached the limit of {max_results} results for {query} "
+                        f"before {cutoff_date:%Y-%m-%d %H:%M}; older papers "
+                        "were not fetched"
+                    )
+                    metrics.increment("fetch_truncated_queries_total")
+
+        except Exception as e:
+            logger.error(f"Error fetching papers, returning partial results: {e}")
+            metrics.increment("fetch_failed_queries_total")
+            return
+        finally:
+            metrics.increment("fetch_papers_total", len(yielded))
+
+        logger.info(f"Fetched {len(yielded)} papers")
+        # Advancing the mark past a gap, left by a failed page or by stopping at
+        # max_results, would skip its papers in every later run
+        if self.incremental and complete:
+            self.marks.update(mark_key, list(seen.values()))
 
     def fetch_multiple_topics(
         self, topics: List[Dict[str, Any]]
@@ -135,16 +238,159 @@ class ArxivFetcher:
         Returns:
             Dictionary mapping topic names to lists of papers
         """
-        results = {}
+        if self.consolidate_queries:
+            results = self._fetch_consolidated(topics)
+        else:
+            fetched = self._run_parallel(self._fetch_topic, topics)
 
-        for topic in topics:
-            topic_name = topic["name"]
-            query = topic["query"]
-            categories = topic.get("categories", None)
+            # Keep results in configuration order
+            results = {}
+            for topic, papers in zip(topics, fetched):
+                results[topic["name"]] = papers
+
+        if self.incremental:
+            self.marks.save()
+
+        return results
+
+    def iter_multiple_topics(
+        self, topics: List[Dict[str, Any]]
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream papers for multiple topics as they are fetched.
 
-            logger.info(f"Fetching papers for topic: {topic_name}")
-            papers = self.fetch_papers(query, categories)
-            results[topic_name] = papers
+        With concurrency > 1, topic queries run on a thread pool and feed a
+        bounded queue, so at most a page or so of papers is buffered.
+
+        Args:
+            topics: List of topic configurations
+
+        Yields:
+            Tuples of (topic name, paper)
+        """
+        if self.consolidate_queries:
+            # Listings must be complete before papers can be assigned to topics
+            for topic_name, papers in self.fetch_multiple_topics(topics).items():
+                for paper in papers:
+                    yield topic_name, paper
+            return
+
+        if self.concurrency == 1 or len(topics) == 1:
+            for topic in topics:
+                logger.info(f"Fetching papers for topic: {topic['name']}")
+                for paper in self._iter_topic(topic):
+                    yield topic["name"], paper
+        else:
+            yield from self._iter_topics_parallel(topics)
+
+        if self.incremental:
+            self.marks.save()
+
+    def _iter_topic(self, topic: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Stream papers for a single topic configuration."""
+        return self.iter_papers(
+            topic["query"], topic.get("categories", None), mark_key=topic["name"]
+        )
+
+    def _iter_topics_parallel(
+        self, topics: List[Dict[str, Any]]
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Run topic queries on a thread pool and yield papers as they arrive."""
+        done = object()
+        results: queue.Queue = queue.Queue(maxsize=self.max_results)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def worker(topic: Dict[str, Any]):
+            try:
+                logger.info(f"Fetching papers for topic: {topic['name']}")
+                for paper in self._iter_topic(topic):
+                    if not put((topic["name"], paper)):
+                        return
+            finally:
+                put(done)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for topic in topics:
+                executor.submit(worker, topic)
+            try:
+                remaining = len(topics)
+                while remaining:
+                    item = results.get()
+                    if item is done:
+                        remaining -= 1
+                    else:
+                        yield item
+            finally:
+                # Unblock workers if the consumer stops early
+                stop.set()
+
+    def _run_parallel(self, func, items: List[Any]) -> List[Any]:
+        """Apply func to items, in parallel if concurrency allows it."""
+        if self.concurrency > 1 and len(items) > 1:
+            logger.info(
+                f"Running {len(items)} queries with concurrency {self.concurrency}"
+            )
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                return list(executor.map(func, items))
+        return [func(item) for item in items]
+
+    def _fetch_topic(self, topic: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Fetch papers for a single topic configuration."""
+        logger.info(f"Fetching papers for topic: {topic['name']}")
+        return self.fetch_papers(
+            topic["query"], topic.get("categories", None), mark_key=topic["name"]
+        )
+
+    def _fetch_consolidated(
+        self, topics: List[Dict[str, Any]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Fetch each shared category listing once and assign papers locally.
+
+        Args:
+            topics: List of topic configurations
+
+        Returns:
+            Dictionary mapping topic names to lists of papers
+        """
+        plan = plan_queries(topics)
+        logger.info(
+            f"Consolidated {len(topics)} topic queries into {plan.num_requests} requests"
+        )
+
+        def fetch_listing(category: str) -> List[Dict[str, Any]]:
+            logger.info(f"Fetching listing for category: {category}")
+            return self.fetch_papers(
+                f"cat:{category}",
+                max_results=self.listing_max_results,
+                warn_on_limit=True,
+            )
+
+        categories = list(plan.listings)
+        listings = dict(zip(categories, self._run_parallel(fetch_listing, categories)))
+        assigned = assign_papers(plan, topics, listings, self.max_results)
+
+        direct = dict(
+            zip(
+                [topic["name"] for topic in plan.direct_topics],
+                self._run_parallel(self._fetch_topic, plan.direct_topics),
+            )
+        )
+
+        # Keep results in configuration order
+        results = {}
+        for topic in topics:
+            name = topic["name"]
+            results[name] = assigned[name] if name in assigned else direct[name]
 
         return results
 
@@ -0,0 +1,94 @@
+"""
+Persisted per-query high-water marks for incremental fetching.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class HighWaterMarks:
+    """Latest published timestamp and IDs seen for each topic or listing."""
+
+    def __init__(self, state_file: str = "data/fetch_state.json"):
+        """
+        Initialize the marks, loading any persisted state.
+
+        Args:
+            state_file: Path to the JSON state file
+        """
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.marks: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(state_file):
+            try:
+                with open(state_file, "r") as f:
+                    self.marks = json.load(f).get("marks", {})
+            except Exception as e:
+                logger.warning(f"Error loading fetch state, starting fresh: {e}")
+
+    def get(self, key: str) -> Optional[Tuple[datetime, Set[str]]]:
+        """
+        Get the high-water mark for a key.
+
+        Args:
+            key: Topic name or listing query
+
+        Returns:
+            Tuple of (latest published timestamp, IDs published at that
+            timestamp), or None if nothing has been fetched for the key yet
+        """
+        with self.lock:
+            mark = self.marks.get(key)
+        if mark is None:
+            return None
+        return datetime.fromisoformat(mark["published"]), set(mark["ids"])
+
+    def update(self, key: str, papers: List[Dict[str, Any]]):
+        """
+        Advance the mark for a key past the given papers.
+
+        Args:
+            key: Topic name or listing query
+            papers: Papers seen by the latest fetch (any order)
+        """
+        if not papers:
+            return
+
+        newest = max(datetime.fromisoformat(p["published"]) for p in papers)
+        newest_ids = {
+            p["id"] for p in papers if datetime.fromisoformat(p["published"]) == newest
+        }
+
+        with self.lock:
+            mark = self.marks.get(key)
+            if mark is not None:
+                previous = datetime.fromisoformat(mark["published"])
+                if previous > newest:
+                    return
+                if previous == newest:
+                    newest_ids |= set(mark["ids"])
+            self.marks[key] = {
+                "published": newest.isoformat(),
+                "ids": sorted(newest_ids),
+            }
+
+    def save(self):
+        """Atomically write the marks to disk."""
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        with self.lock:
+            data = {"marks": self.marks}
+        tmp_file = self.state_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, self.state_file)
+        logger.info(f"Saved fetch state for {len(data['marks'])} queries")
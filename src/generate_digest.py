@@ -3,19 +3,29 @@ Generate paper digest from arXiv papers.
 Main orchestrator that ties together fetching, ranking, and formatting.
 """
 
+import argparse
 import json
 import logging
 import os
 import sys
-from datetime import datetime
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import yaml
 
-from fetch_papers import ArxivFetcher
+import metrics
+from arxiv_api import ARXIV_API_URL, ARXIV_REQUESTS_PER_SECOND
+from arxiv_ids import abstract_hash, base_id, newer_version
+from fetch_papers import LISTING_MAX_RESULTS, ArxivFetcher
+from paper_store import PaperStore
+from profiling import MODES as PROFILE_MODES
+from profiling import StageProfiler
 from rank_papers import PaperRanker
-from utils import create_html_digest, format_authors, save_read_papers
+from render import FORMAT_NAMES, DigestJob, check_formats, render_digests
+from utils import save_read_papers, slugify
 
 # Get project root directory (parent of src/)
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -30,12 +40,29 @@ logger = logging.getLogger(__name__)
 class DigestGenerator:
     """Generate paper digest."""
 
-    def __init__(self, config_file: str = "config/topics.yaml"):
+    def __init__(
+        self,
+        config_file: str = "config/topics.yaml",
+        offline: bool = False,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        model_server: Optional[str] = None,
+        stream: Optional[bool] = None,
+        profile: Optional[str] = None,
+    ):
         """
         Initialize the digest generator.
 
         Args:
             config_file: Path to configuration file (relative to project root)
+            offline: Rank papers from the local paper store instead of arXiv
+            since: Start of a historical window to re-rank (implies offline)
+            until: End of a historical window to re-rank (implies offline)
+            model_server: Unix socket of a running model server
+            stream: Stream papers from fetch to ranking in micro-batches
+                (defaults to ranking.streaming in the config)
+            profile: Profile each stage into output/profile: "cpu" (cProfile),
+                "memory" (tracemalloc) or "all" (disabled if None)
         """
         # Convert to absolute path if relative
         if not Path(config_file).is_absolute():
@@ -44,12 +71,86 @@ class DigestGenerator:
             self.config_file = config_file
 
         self.config = self.load_config()
-        self.fetcher = ArxivFetcher(days_back=7, max_results=100)
-        self.ranker = PaperRanker()
+
+        metrics_config = self.config.get("metrics", {})
+        self.metrics_enabled = metrics_config.get("enabled", True)
+        self.report_dir = PROJECT_ROOT / metrics_config.get(
+            "report_dir", "output/reports"
+        )
+        self.prometheus_file = metrics_config.get("prometheus_file")
+        if self.prometheus_file:
+            self.prometheus_file = str(PROJECT_ROOT / self.prometheus_file)
+
+        output_config = self.config.get("output", {})
+        self.formats = output_config.get("formats", ["md", "html"])
+        check_formats(self.formats)
+        self.render_workers = output_config.get("render_workers", 4)
+
+        fetch_config = self.config.get("fetch", {})
+        self.fetcher = ArxivFetcher(
+            days_back=fetch_config.get("days_back", 7),
+            max_results=fetch_config.get("max_results", 100),
+            concurrency=fetch_config.get("concurrency", 1),
+            requests_per_second=fetch_config.get(
+                "requests_per_second", ARXIV_REQUESTS_PER_SECOND
+            ),
+            consolidate_queries=fetch_config.get("consolidate_queries", False),
+            listing_max_results=fetch_config.get(
+                "listing_max_results", LISTING_MAX_RESULTS
+            ),
+            incremental=fetch_config.get("incremental", False),
+            state_file=str(PROJECT_ROOT / "data" / "fetch_state.json"),
+            api_url=fetch_config.get("api_url", ARXIV_API_URL),
+            http_cache_dir=(
+                str(PROJECT_ROOT / "data" / "cache" / "http")
+                if fetch_config.get("http_cache", True)
+                else None
+            ),
+            http_cache_ttl=fetch_config.get("http_cache_ttl", 3600),
+            http_cache_max_age=fetch_config.get("http_cache_max_age_days", 30) * 86400,
+            http_cache_max_bytes=fetch_config.get("http_cache_max_mb", 256) * 2**20,
+            max_retries=fetch_config.get("max_retries", 3),
+        )
+
+        # Historical windows are re-ranked from the local store only
+        self.since = since
+        self.until = until
+        self.historical = since is not None or until is not None
+        self.offline = offline or self.historical
+
+        store_config = self.config.get("store", {})
+        self.store = None
+        if store_config.get("enabled", True) or self.offline:
+            self.store = PaperStore(
+                str(PROJECT_ROOT / store_config.get("path", "data/papers.db"))
+            )
+
+        ranking_config = self.config.get("ranking", {})
+        self.ranker = PaperRanker.from_config(
+            ranking_config,
+            data_dir=str(PROJECT_ROOT / "data"),
+            **({"model_server": model_server} if model_server else {}),
+        )
+
+        self.stream = (
+            stream if stream is not None else ranking_config.get("streaming", False)
+        )
+
+        self.profiler = None
+        if profile:
+            self.profiler = StageProfiler(
+                str(PROJECT_ROOT / "output" / "profile"), mode=profile
+            )
 
         # Set research interests from config
+        self.profiles = {
+            profile["name"]: profile["research_interests"]
+            for profile in self.config.get("profiles", [])
+        }
         research_interests = self.config.get("research_interests", "")
-        if research_interests:
+        if self.profiles:
+            self.ranker.set_profiles(self.profiles)
+        elif research_interests:
             self.ranker.set_research_interests(research_interests)
         else:
             logger.warning("No research interests defined in config")
@@ -72,21 +173,136 @@ class DigestGenerator:
             logger.warning("No topics configured")
             return []
 
-        all_papers = []
-        topic_results = self.fetcher.fetch_multiple_topics(topics)
+        if self.offline:
+            topic_results = self.load_stored_papers(topics)
+        else:
+            topic_results = self.fetcher.fetch_multiple_topics(topics)
+            if self.store is not None:
+                self.store.upsert_topic_results(topic_results)
 
-        # Combine papers from all topics and deduplicate
-        seen_ids = set()
+        # Combine papers from all topics and deduplicate versions of a paper,
+        # keeping the latest one
+        unique: Dict[str, Dict[str, Any]] = {}
         for topic_name, papers in topic_results.items():
             for paper in papers:
-                if paper["id"] not in seen_ids:
-                    paper["matched_topic"] = topic_name
-                    all_papers.append(paper)
-                    seen_ids.add(paper["id"])
+                paper_base = base_id(paper["id"])
+                existing = unique.get(paper_base)
+                if existing is None or newer_version(paper, existing):
+                    paper["matched_topic"] = (existing or {}).get(
+                        "matched_topic", topic_name
+                    )
+                    unique[paper_base] = paper
+        all_papers = list(unique.values())
+        metrics.increment(
+            "papers_dropped_total",
+            sum(len(papers) for papers in topic_results.values()) - len(all_papers),
+            reason="duplicate",
+        )
 
         logger.info(f"Fetched {len(all_papers)} unique papers across all topics")
         return all_papers
 
+    def stream_all_papers(self) -> Iterator[Dict[str, Any]]:
+        """
+        Stream unique papers for all configured topics.
+
+        Papers come from arXiv (or the local store when offline) and are
+        written to the store in chunks as they pass through.
+
+        Yields:
+            Paper dictionaries with 'matched_topic' set
+        """
+        topics = self.config.get("topics", [])
+        if not topics:
+            logger.warning("No topics configured")
+            return
+
+        if self.offline:
+            since, until = self.window()
+            source = (
+                (topic["name"], paper)
+                for topic in topics
+                for paper in self.store.iter_papers(
+                    topics=[topic["name"]], since=since, until=until
+                )
+            )
+        else:
+            source = self.fetcher.iter_multiple_topics(topics)
+
+        seen_ids = set()
+        pending: Dict[str, List[Dict[str, Any]]] = {}
+        pending_count = 0
+        for topic_name, paper in source:
+            if self.store is not None and not self.offline:
+                pending.setdefault(topic_name, []).append(paper)
+                pending_count += 1
+                if pending_count >= 500:
+                    self.store.upsert_topic_results(pending)
+                    pending, pending_count = {}, 0
+
+            # arXiv only returns the latest version, so the first copy of a
+            # paper is kept
+            paper_base = base_id(paper["id"])
+            if paper_base in seen_ids:
+                metrics.increment("papers_dropped_total", reason="duplicate")
+                continue
+            seen_ids.add(paper_base)
+            paper["matched_topic"] = topic_name
+            yield paper
+
+        if pending:
+            self.store.upsert_topic_results(pending)
+        logger.info(f"Streamed {len(seen_ids)} unique papers across all topics")
+
+    def window(self) -> Tuple[datetime, datetime]:
+        """Return the (start, end) of the papers considered by this run."""
+        end = self.until or datetime.now(timezone.utc)
+        since = self.since or end - timedelta(days=self.fetcher.days_back)
+        return since, end
+
+    def stream_rank_papers(self) -> List[Dict[str, Any]]:
+        """Fetch and rank papers as a stream using configured parameters."""
+        ranking_config = self.config.get("ranking", {})
+
+        all_keywords = []
+        for topic in self.config.get("topics", []):
+            all_keywords.extend(topic.get("keywords", []))
+
+        return self.ranker.rank_paper_stream(
+            self.stream_all_papers(),
+            recency_window=self.window(),
+            keywords=all_keywords,
+            min_threshold=ranking_config.get("min_relevance_threshold", 0.3),
+            top_n=ranking_config.get("top_n_papers", 10),
+            keyword_bonus=ranking_config.get("keyword_bonus", 0.05),
+            recency_weight=ranking_config.get("recency_weight", 0.1),
+            filter_read=not self.historical,
+            read_papers_file=self.read_papers_file(),
+            batch_size=ranking_config.get("stream_batch_size", 256),
+            update_index=self.ranker.ann_index_file is not None and not self.offline,
+        )
+
+    def load_stored_papers(
+        self, topics: List[Dict[str, Any]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Load papers for all configured topics from the local store.
+
+        Args:
+            topics: List of topic configurations
+
+        Returns:
+            Dictionary mapping topic names to lists of papers
+        """
+        since, end = self.window()
+        logger.info(f"Loading stored papers from {since.date()} to {end.date()}")
+        return {
+            topic["name"]: self.store.get_papers(
+                topics=[topic["name"]], since=since, until=self.until
+            )
+            for topic in topics
+        }
+
     def rank_all_papers(self, papers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Rank papers using configured parameters."""
         ranking_config = self.config.get("ranking", {})
@@ -96,9 +312,6 @@ class DigestGenerator:
         for topic in self.config.get("topics", []):
             all_keywords.extend(topic.get("keywords", []))
 
-        # Use absolute path for read_papers file
-        read_papers_file = str(PROJECT_ROOT / "data" / "read_papers.json")
-
         ranked_papers = self.ranker.rank_papers(
             papers,
             keywords=all_keywords,
@@ -106,151 +319,274 @@ class DigestGenerator:
             top_n=ranking_config.get("top_n_papers", 10),
             keyword_bonus=ranking_config.get("keyword_bonus", 0.05),
             recency_weight=ranking_config.get("recency_weight", 0.1),
-            filter_read=True,
-            read_papers_file=read_papers_file,
+            filter_read=not self.historical,
+            read_papers_file=self.read_papers_file(),
         )
 
         return ranked_papers
 
-    def generate_markdown_digest(
-        self, papers: List[Dict[str, Any]], output_file: str = None
-    ) -> str:
-        """
-        Generate Markdown formatted digest.
+    def rank_profiles(
+        self, papers: List[Dict[str, Any]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Rank papers for every configured profile in one pass."""
+        ranking_config = self.config.get("ranking", {})
 
-        Args:
-            papers: List of ranked papers
-            output_file: Optional path to save digest
+        all_keywords = []
+        for topic in self.config.get("topics", []):
+            all_keywords.extend(topic.get("keywords", []))
 
-        Returns:
-            Markdown formatted string
-        """
-        logger.info("Generating Markdown digest")
-
-        date_str = datetime.now().strftime("%Y-%m-%d")
-
-        lines = [
-            f"# arXiv Paper Digest - {date_str}",
-            "",
-            f"*Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*",
-            "",
-            f"Found {len(papers)} relevant papers.",
-            "",
-            "---",
-            "",
-        ]
-
-        for i, paper in enumerate(papers, 1):
-            # Title with link
-            lines.append(f"## {i}. [{paper['title']}]({paper['url']})")
-            lines.append("")
-
-            # Authors
-            authors_str = format_authors(paper["authors"], max_authors=5)
-            lines.append(f"**Authors:** {authors_str}")
-            lines.append("")
-
-            # Metadata
-            pub_date = datetime.fromisoformat(paper["published"]).strftime("%Y-%m-%d")
-            lines.append(f"**Published:** {pub_date}")
-            lines.append("")
-
-            # Categories
-            categories = ", ".join(paper["categories"][:3])
-            lines.append(f"**Categories:** {categories}")
-            lines.append("")
-
-            # Relevance score
-            lines.append(f"**Relevance Score:** {paper['similarity_score']:.3f}")
-            if paper.get("keyword_matches", 0) > 0:
-                lines.append(f" (Keyword matches: {paper['keyword_matches']})")
-            lines.append("")
-
-            # Matched topic
-            if "matched_topic" in paper:
-                lines.append(f"**Topic:** {paper['matched_topic']}")
-                lines.append("")
-
-            # Abstract
-            abstract = paper["abstract"][:300]
-            if len(paper["abstract"]) > 300:
-                abstract += "..."
-            lines.append(f"**Abstract:** {abstract}")
-            lines.append("")
-
-            # Links
-            lines.append(f"[PDF]({paper['pdf_url']}) | [arXiv]({paper['url']})")
-            lines.append("")
-            lines.append("---")
-            lines.append("")
-
-        digest = "\n".join(lines)
-
-        # Save to file if specified
-        if output_file:
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-            with open(output_file, "w") as f:
-                f.write(digest)
-            logger.info(f"Saved digest to {output_file}")
-
-        return digest
+        read_papers_files = None
+        if not self.historical:
+            read_papers_files = {
+                name: self.read_papers_file(name) for name in self.profiles
+            }
+
+        return self.ranker.rank_papers_for_profiles(
+            papers,
+            keywords=all_keywords,
+            min_threshold=ranking_config.get("min_relevance_threshold", 0.3),
+            top_n=ranking_config.get("top_n_papers", 10),
+            keyword_bonus=ranking_config.get("keyword_bonus", 0.05),
+            recency_weight=ranking_config.get("recency_weight", 0.1),
+            read_papers_files=read_papers_files,
+        )
+
+    def profile_data_dir(self, profile_name: str) -> Path:
+        """Directory holding a profile's read history."""
+        return PROJECT_ROOT / "data" / "profiles" / slugify(profile_name)
+
+    def read_papers_file(self, profile_name: Optional[str] = None) -> str:
+        """Absolute path of the read history log of a profile (or the default)."""
+        data_dir = PROJECT_ROOT / "data"
+        if profile_name is not None:
+            data_dir = self.profile_data_dir(profile_name)
+        return str(data_dir / "read_papers.jsonl")
 
     def generate(self):
-        """Generate the complete digest."""
+        """Generate the complete digest and write the run report."""
+        metrics.registry.reset()
+        succeeded = False
+        try:
+            with metrics.timer("run_seconds"):
+                self._generate()
+            succeeded = True
+        finally:
+            if self.metrics_enabled:
+                self.write_run_report(succeeded)
+            if self.profiler is not None:
+                self.profiler.write()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a pipeline stage, profiling it in profile mode."""
+        with metrics.timer("stage_seconds", stage=name):
+            if self.profiler is None:
+                yield
+            else:
+                with self.profiler.stage(name):
+                    yield
+
+    def _generate(self):
+        """Run the stages of digest generation."""
         logger.info("=" * 60)
         logger.info("Starting digest generation")
         logger.info("=" * 60)
 
+        if self.stream and not self.profiles:
+            # Fetch and rank in one pass; nothing but the top papers is retained
+            with self.stage("fetch_rank"):
+                ranked_papers = self.stream_rank_papers()
+            self.write_digests(
+                [(ranked_papers, PROJECT_ROOT / "output", self.read_papers_file())]
+            )
+            return
+        if self.stream:
+            logger.warning("Streaming is not supported with profiles, fetching fully")
+
         # Fetch papers
-        papers = self.fetch_all_papers()
+        with self.stage("fetch"):
+            papers = self.fetch_all_papers()
+        metrics.set_gauge("papers_fetched", len(papers))
 
         if not papers:
             logger.warning("No papers found. Exiting.")
             return
 
         # Rank papers
-        ranked_papers = self.rank_all_papers(papers)
-
-        if not ranked_papers:
-            logger.warning("No papers passed ranking threshold. Exiting.")
-            return
+        with self.stage("rank"):
+            if self.profiles:
+                ranked_by_profile = self.rank_profiles(papers)
+            else:
+                ranked_by_profile = {None: self.rank_all_papers(papers)}
 
-        # Generate outputs
-        date_str = datetime.now().strftime("%Y-%m-%d")
+        # Keep the similar-paper index up to date (embeddings are cached)
+        if self.ranker.ann_index_file and not self.offline:
+            with self.stage("index"):
+                self.ranker.index_papers(papers)
 
         # Use absolute paths for output files
         output_dir = PROJECT_ROOT / "output"
-        data_dir = PROJECT_ROOT / "data"
 
-        # Markdown digest
-        md_file = str(output_dir / f"digest_{date_str}.md")
-        self.generate_markdown_digest(ranked_papers, md_file)
+        digests = []
+        for profile_name, ranked_papers in ranked_by_profile.items():
+            if profile_name is None:
+                digests.append((ranked_papers, output_dir, self.read_papers_file()))
+            else:
+                logger.info(f"Writing digest for profile: {profile_name}")
+                digests.append(
+                    (
+                        ranked_papers,
+                        output_dir / "profiles" / slugify(profile_name),
+                        self.read_papers_file(profile_name),
+                    )
+                )
+        self.write_digests(digests)
+
+    def write_digests(self, digests: List[Tuple[List[Dict[str, Any]], Path, str]]):
+        """
+        Write the digest files of one or more digests and mark the papers as read.
 
-        # Also create a "latest" version
-        latest_file = str(output_dir / "digest_latest.md")
-        self.generate_markdown_digest(ranked_papers, latest_file)
+        All digests are rendered in every configured format in one batch on a
+        worker pool, sharing the formatted fragments of papers they have in
+        common.
 
-        # HTML digest
-        html_file = str(output_dir / f"digest_{date_str}.html")
-        create_html_digest(ranked_papers, html_file)
+        Args:
+            digests: (ranked papers, output directory, read history to update)
+                of each digest, e.g. one per profile
+        """
+        digests = [digest for digest in digests if digest[0]]
+        if not digests:
+            logger.warning("No papers passed ranking threshold. Exiting.")
+            return
+
+        # Generate outputs (historical windows are named after their end date)
+        date_str = (self.until or datetime.now()).strftime("%Y-%m-%d")
+
+        jobs = []
+        for ranked_papers, output_dir, _ in digests:
+            metrics.increment("papers_selected_total", len(ranked_papers))
+            jobs.append(
+                DigestJob(
+                    ranked_papers,
+                    str(output_dir),
+                    f"digest_{date_str}",
+                    latest_name=None if self.historical else "digest_latest",
+                )
+            )
+        with self.stage("render"):
+            # Each format is rendered once; the "latest" files link to it
+            paths = render_digests(jobs, self.formats, workers=self.render_workers)
 
         # Update read papers
-        save_read_papers(
-            [p["id"] for p in ranked_papers],
-            data_file=str(data_dir / "read_papers.json"),
-        )
+        if not self.historical:
+            with self.stage("history"):
+                for ranked_papers, _, read_papers_file in digests:
+                    save_read_papers(
+                        [p["id"] for p in ranked_papers],
+                        data_file=read_papers_file,
+                        abstract_hashes={
+                            p["id"]: abstract_hash(p["abstract"]) for p in ranked_papers
+                        },
+                    )
 
         logger.info("=" * 60)
         logger.info(f"Digest generation complete!")
-        logger.info(f"Markdown: {md_file}")
-        logger.info(f"HTML: {html_file}")
+        for digest_paths in paths:
+            for fmt, path in digest_paths.items():
+                logger.info(f"{FORMAT_NAMES.get(fmt, fmt)}: {path}")
         logger.info("=" * 60)
 
+    def write_run_report(self, succeeded: bool):
+        """
+        Export the metrics of the run.
+
+        Writes a JSON report to the report directory and, if configured, the
+        metrics in Prometheus text format.
+
+        Args:
+            succeeded: Whether the run completed without an error
+        """
+        metrics.set_gauge("run_success", int(succeeded))
+        metrics.set_gauge("last_run_timestamp_seconds", time.time())
+        if self.ranker.embedding_cache is not None:
+            for name, value in self.ranker.embedding_cache.stats().items():
+                metrics.set_gauge(f"embedding_cache_{name}", value)
+
+        # Named after the start of the run, so runs on the same day each
+        # keep their report
+        started = datetime.fromtimestamp(metrics.registry.started)
+        try:
+            metrics.registry.write_json(
+                str(self.report_dir / f"run_{started:%Y-%m-%dT%H%M%S}.json"),
+                succeeded=succeeded,
+                mode={
+                    "offline": self.offline,
+                    "historical": self.historical,
+                    "stream": bool(self.stream),
+                    "profiles": len(self.profiles),
+                },
+            )
+            if self.prometheus_file:
+                metrics.registry.write_prometheus(self.prometheus_file)
+        except OSError as e:
+            logger.warning(f"Error writing run report: {e}")
+
+
+def parse_date(value: str) -> datetime:
+    """Parse a YYYY-MM-DD command line date as a UTC timestamp."""
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
 
 def main():
     """Main entry point."""
-    generator = DigestGenerator()
-    generator.generate()
+    parser = argparse.ArgumentParser(description="Generate an arXiv paper digest")
+    parser.add_argument(
+        "--config", default="config/topics.yaml", help="Path to configuration file"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Rank papers from the local paper store without contacting arXiv",
+    )
+    parser.add_argument(
+        "--since", type=parse_date, help="Start of a historical window (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "--until", type=parse_date, help="End of a historical window (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=None,
+        help="Stream papers from fetch to ranking with bounded memory",
+    )
+    parser.add_argument(
+        "--model-server",
+        help="Unix socket of a model server started with src/model_server.py",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="all",
+        choices=PROFILE_MODES,
+        help="Profile each stage with cProfile and/or tracemalloc into "
+        "output/profile (default: all)",
+    )
+    args = parser.parse_args()
+
+    generator = DigestGenerator(
+        args.config,
+        offline=args.offline,
+        since=args.since,
+        until=args.until,
+        model_server=args.model_server,
+        stream=args.stream,
+        profile=args.profile,
+    )
+    try:
+        generator.generate()
+    finally:
+        generator.ranker.close()
 
 
 if __name__ == "__main__":
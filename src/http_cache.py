@@ -0,0 +1,361 @@
+"""
+HTTP client with a pooled session and an on-disk response cache.
+
+Responses are reused without a request while younger than the TTL. Older
+responses are revalidated with If-None-Match / If-Modified-Since when the
+server sent an ETag or Last-Modified header, so an unchanged result costs a
+304 instead of a full download. Entries unused for longer than max_age, and
+the oldest ones beyond max_bytes, are pruned.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from rate_limiter import TokenBucket
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Responses that are retried; the throttling ones also slow down the limiter
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+
+def retry_after(response: requests.Response) -> Optional[float]:
+    """
+    Read the Retry-After header of a response.
+
+    Args:
+        response: HTTP response
+
+    Returns:
+        Seconds to wait, or None if the header is missing or invalid
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpCache:
+    """On-disk store of response bodies and their validators."""
+
+    def __init__(
+        self,
+        cache_dir: str = "data/cache/http",
+        ttl: float = 3600,
+        max_age: Optional[float] = 30 * 86400,
+        max_bytes: Optional[int] = 256 * 2**20,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory for cached responses
+            ttl: Seconds a response is reused without contacting the server
+            max_age: Seconds after its last download or revalidation that
+                prune() deletes a response (None keeps responses of any age)
+            max_bytes: Size of the cache that prune() trims it to, oldest
+                responses first (None for no limit)
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Build the cache key of a request.
+
+        Args:
+            url: Request URL
+            params: Query parameters
+
+        Returns:
+            Hex digest identifying the request
+        """
+        canonical = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a cached response.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Metadata dict with the body under 'body', or None if not cached
+        """
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                meta["body"] = f.read()
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """Check whether a cached response is younger than the TTL."""
+        return time.time() - entry["stored_at"] < self.ttl
+
+    def put(self, key: str, body: bytes, headers: Dict[str, str]):
+        """
+        Store a response body with its validators.
+
+        Args:
+            key: Cache key
+            body: Response body
+            headers: Response headers
+        """
+        meta_path, body_path = self._paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {
+            "stored_at": time.time(),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        # Body first, so metadata never points to a missing body
+        self._write_atomic(body_path, body)
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def touch(self, key: str):
+        """Mark a cached response as revalidated now."""
+        entry = self.get(key)
+        if entry is None:
+            return
+        meta_path, _ = self._paths(key)
+        entry.pop("body")
+        entry["stored_at"] = time.time()
+        self._write_atomic(meta_path, json.dumps(entry).encode("utf-8"))
+
+    def prune(self) -> int:
+        """
+        Delete responses older than max_age, then the oldest ones until the
+        cache fits in max_bytes.
+
+        Must not run while other threads or processes write to the cache.
+
+        Returns:
+            Number of responses deleted
+        """
+        # Files of each response, with the time it was last stored or touched
+        entries: Dict[str, Dict[str, Any]] = {}
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entry = entries.setdefault(
+                    name.split(".")[0], {"paths": [], "size": 0, "time": 0.0}
+                )
+                entry["paths"].append(path)
+                entry["size"] += stat.st_size
+                if name.endswith(".json") or not entry["time"]:
+                    entry["time"] = stat.st_mtime
+
+        now = time.time()
+        total = sum(entry["size"] for entry in entries.values())
+        removed = 0
+        for entry in sorted(entries.values(), key=lambda entry: entry["time"]):
+            expired = self.max_age is not None and now - entry["time"] > self.max_age
+            oversized = self.max_bytes is not None and total > self.max_bytes
+            if not (expired or oversized):
+                break
+            for path in entry["paths"]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= entry["size"]
+            removed += 1
+
+        if removed:
+            logger.info(f"Pruned {removed} responses from the HTTP cache")
+            metrics.increment("http_cache_pruned_total", removed)
+        return removed
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+class HttpClient:
+    """Pooled requests.Session with optional response caching."""
+
+    def __init__(
+        self,
+        cache: Optional[HttpCache] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        timeout: float = 30,
+        pool_size: int = 4,
+        max_retries: int = 3,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            cache: Response cache (disabled if None)
+            rate_limiter: Limiter acquired before each request that goes over
+                the network and told about throttling responses
+            timeout: Request timeout in seconds
+            pool_size: Maximum number of pooled connections per host
+            max_retries: Retries of a request after connection errors,
+                throttling or server errors
+        """
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+        self.retries = 0
+
+    def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        parse: Optional[Callable[[bytes], Any]] = None,
+    ) -> Any:
+        """
+        GET a URL, answering from the cache when possible.
+
+        Args:
+            url: Request URL
+            params: Query parameters
+            parse: Function applied to the body; a downloaded body is only
+                cached if it parses, so error documents served with a 200
+                are never replayed from the cache
+
+        Returns:
+            Response body, or the result of parse if given
+
+        Raises:
+            requests.RequestException: If the request still fails after
+                max_retries retries, or for other error responses
+        """
+        parse = parse or (lambda body: body)
+        key = entry = None
+        headers = {}
+        if self.cache is not None:
+            key = HttpCache.key(url, params)
+            entry = self.cache.get(key)
+            if entry is not None:
+                if self.cache.is_fresh(entry):
+                    self.hits += 1
+                    metrics.increment("http_requests_total", result="cached")
+                    return parse(entry["body"])
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self._request(url, params, headers)
+        if response.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            metrics.increment("http_requests_total", result="not_modified")
+            self.cache.touch(key)
+            return parse(entry["body"])
+
+        response.raise_for_status()
+        self.downloads += 1
+        metrics.increment("http_requests_total", result="downloaded")
+        metrics.increment("http_response_bytes_total", len(response.content))
+        result = parse(response.content)
+        if self.cache is not None:
+            self.cache.put(key, response.content, response.headers)
+        return result
+
+    def _request(
+        self, url: str, params: Optional[Dict[str, Any]], headers: Dict[str, str]
+    ) -> requests.Response:
+        """Send a request, retrying only this request on transient failures."""
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            delay = 2 ** (attempt + 1)  # Exponential backoff
+            try:
+                with metrics.timer("http_request_seconds"):
+                    response = self.session.get(
+                        url, params=params, headers=headers, timeout=self.timeout
+                    )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                reason = type(e).__name__
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.succeed()
+                    return response
+                error = requests.HTTPError(
+                    f"{response.status_code} response from {url}", response=response
+                )
+                reason = str(response.status_code)
+                server_delay = retry_after(response)
+                if server_delay is not None:
+                    delay = server_delay
+                if (
+                    response.status_code in THROTTLE_STATUSES
+                    and self.rate_limiter is not None
+                    and attempt < self.max_retries
+                ):
+                    # The limiter pauses every thread sharing it
+                    self.rate_limiter.throttle(delay)
+                    delay = 0
+
+            if attempt == self.max_retries:
+                metrics.increment("http_failures_total", reason=reason)
+                raise error
+            self.retries += 1
+            metrics.increment("http_retries_total", reason=reason)
+            logger.warning(
+                f"Request failed (attempt {attempt + 1}/{self.max_retries + 1}): "
+                f"{error}"
+            )
+            time.sleep(delay)
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache hit, revalidation, download and retry counters."""
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "downloads": self.downloads,
+            "retries": self.retries,
+        }
@@ -0,0 +1,279 @@
+"""
+Run metrics: timers, counters, gauges and histograms.
+
+Components record into the process-wide `registry` through the module-level
+helpers, e.g.
+
+    with metrics.timer("stage_seconds", stage="fetch"):
+        ...
+    metrics.increment("papers_dropped_total", reason="read")
+
+and the digest generator exports it after each run as a JSON report and,
+optionally, in the Prometheus text format (for the node_exporter textfile
+collector).
+"""
+
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Sequence, Tuple
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the default histogram buckets
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+)
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_key(key: Key) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+def _prometheus_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _prometheus_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Histogram:
+    """Distribution of observed values over fixed buckets."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            buckets: Upper bounds of the buckets (an overflow bucket is added)
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float):
+        """Record a value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary with per-bucket (non-cumulative) counts."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "mean": self.sum / self.count if self.count else None,
+            "buckets": {
+                str(bound): count
+                for bound, count in zip(self.buckets + (math.inf,), self.counts)
+                if count
+            },
+        }
+
+
+class Metrics:
+    """Thread-safe registry of the metrics of a run."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[Key, float] = {}
+        self.gauges: Dict[Key, float] = {}
+        self.histograms: Dict[Key, Histogram] = {}
+        self.started = time.time()
+
+    def reset(self):
+        """Clear all metrics, e.g. at the start of a run."""
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """
+        Add to a counter.
+
+        Args:
+            name: Metric name
+            value: Amount to add
+            **labels: Label values distinguishing series of the metric
+        """
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge to a value."""
+        key = _key(name, labels)
+        with self.lock:
+            self.gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a value in a histogram."""
+        key = _key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Record the duration of the block (in seconds) in a histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot of all metrics, keyed by 'name{label=value,...}'."""
+        with self.lock:
+            return {
+                "counters": {
+                    _format_key(k): v for k, v in sorted(self.counters.items())
+                },
+                "gauges": {_format_key(k): v for k, v in sorted(self.gauges.items())},
+                "histograms": {
+                    _format_key(k): h.to_dict()
+                    for k, h in sorted(self.histograms.items())
+                },
+            }
+
+    def to_prometheus(self, prefix: str = "digest_") -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Args:
+            prefix: Prefix added to every metric name
+
+        Returns:
+            Exposition text
+        """
+        lines = []
+
+        def family(items, kind):
+            by_name: Dict[str, list] = {}
+            for (name, labels), value in sorted(items):
+                by_name.setdefault(name, []).append((labels, value))
+            for name, series in by_name.items():
+                lines.append(f"# TYPE {prefix}{name} {kind}")
+                yield prefix + name, series
+
+        with self.lock:
+            for kind, items in (
+                ("counter", self.counters.items()),
+                ("gauge", self.gauges.items()),
+            ):
+                for name, series in family(items, kind):
+                    for labels, value in series:
+                        lines.append(
+                            f"{name}{_prometheus_labels(labels)} "
+                            f"{_prometheus_value(value)}"
+                        )
+
+            for name, series in family(self.histograms.items(), "histogram"):
+                for labels, histogram in series:
+                    cumulative = 0
+                    bounds = histogram.buckets + (math.inf,)
+                    for bound, count in zip(bounds, histogram.counts):
+                        cumulative += count
+                        bucket_labels = labels + (("le", _prometheus_value(bound)),)
+                        lines.append(
+                            f"{name}_bucket{_prometheus_labels(bucket_labels)} "
+                            f"{cumulative}"
+                        )
+                    label_text = _prometheus_labels(labels)
+                    lines.append(
+                        f"{name}_sum{label_text} {_prometheus_value(histogram.sum)}"
+                    )
+                    lines.append(f"{name}_count{label_text} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str, **extra):
+        """
+        Write a JSON run report.
+
+        Args:
+            path: Report file
+            **extra: Additional top-level fields of the report
+        """
+        report = {
+            "started": self.started,
+            "duration_seconds": time.time() - self.started,
+            **extra,
+            **self.to_dict(),
+        }
+        _write_atomic(path, json.dumps(report, indent=2, default=str))
+        logger.info(f"Run report written to {path}")
+
+    def write_prometheus(self, path: str, prefix: str = "digest_"):
+        """Write all metrics to a Prometheus text file."""
+        _write_atomic(path, self.to_prometheus(prefix))
+        logger.info(f"Prometheus metrics written to {path}")
+
+
+def _write_atomic(path: str, text: str):
+    """Write a file so that readers never see it half-written."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# Metrics of the current run, shared by all components
+registry = Metrics()
+
+increment = registry.increment
+set_gauge = registry.set
+observe = registry.observe
+timer = registry.timer
@@ -0,0 +1,282 @@
+"""
+Long-lived local encoding server.
+
+Loading the embedding model dominates the runtime of small runs.
+This server loads it once and answers encode requests over a Unix socket, so
+repeated CLI invocations can reuse the warm model.
+
+Wire format: each message is a 4-byte big-endian length followed by a JSON
+header; encode responses are followed by the raw float32 embedding bytes.
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = "data/cache/model_server.sock"
+
+
+def _send_message(sock: socket.socket, header: Dict[str, Any], payload: bytes = b""):
+    """Send a length-prefixed JSON header followed by a binary payload."""
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(struct.pack(">I", len(data)) + data + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Read exactly `size` bytes from a socket."""
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_message(sock: socket.socket) -> Dict[str, Any]:
+    """Read a length-prefixed JSON header."""
+    (size,) = struct.unpack(">I", _recv_exact(sock, 4))
+    return json.loads(_recv_exact(sock, size))
+
+
+class RemoteEncoder:
+    """Client for the model server with a SentenceTransformer-like encode()."""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 300):
+        """
+        Initialize the client.
+
+        Args:
+            socket_path: Path of the server's Unix socket
+            timeout: Socket timeout in seconds for a single request
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _request(self, header: Dict[str, Any]) -> Tuple[Dict[str, Any], socket.socket]:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        _send_message(sock, header)
+        response = _recv_message(sock)
+        if response.get("error"):
+            sock.close()
+            raise RuntimeError(f"Model server error: {response['error']}")
+        return response, sock
+
+    def encoder_options(self) -> Optional[Dict[str, Any]]:
+        """
+        Ask the server how its encoder was created.
+
+        Returns:
+            The server's encoders.embedding_options(), or None if no server
+            is reachable
+        """
+        if not os.path.exists(self.socket_path):
+            return None
+        try:
+            response, sock = self._request({"command": "ping"})
+            sock.close()
+            return response["encoder"]
+        except (OSError, ValueError, KeyError, RuntimeError):
+            return None
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        convert_to_tensor: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        """
+        Encode texts on the server.
+
+        Args:
+            sentences: A text or list of texts
+            convert_to_tensor: Unsupported; embeddings are always NumPy arrays
+            **kwargs: Extra keyword arguments for SentenceTransformer.encode
+
+        Returns:
+            Embedding (for a single text) or matrix of embeddings
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        response, sock = self._request(
+            {"command": "encode", "texts": texts, "kwargs": kwargs}
+        )
+        try:
+            rows, dim = response["shape"]
+            payload = _recv_exact(sock, rows * dim * 4)
+        finally:
+            sock.close()
+
+        embeddings = np.frombuffer(payload, dtype=np.float32).reshape(rows, dim)
+        return embeddings[0] if single else embeddings
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        server.last_request = time.monotonic()
+        try:
+            request = _recv_message(self.request)
+            if request.get("command") == "ping":
+                _send_message(self.request, {"encoder": server.encoder_options})
+                return
+
+            with server.encode_lock:
+                embeddings = server.model.encode(
+                    request["texts"], convert_to_tensor=False, **request["kwargs"]
+                )
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+            _send_message(
+                self.request, {"shape": list(embeddings.shape)}, embeddings.tobytes()
+            )
+        except Exception as e:
+            logger.warning(f"Error handling encode request: {e}")
+            try:
+                _send_message(self.request, {"error": str(e)})
+            except OSError:
+                pass
+        finally:
+            server.last_request = time.monotonic()
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server holding a warm sentence-transformers model."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        model_name: str = "all-MiniLM-L6-v2",
+        threads: Optional[int] = None,
+        max_seq_length: Optional[int] = None,
+        backend: str = "sentence-transformers",
+        onnx_dir: Optional[str] = None,
+        onnx_quantized: bool = False,
+    ):
+        """
+        Load the model and bind the socket.
+
+        Args:
+            socket_path: Path of the Unix socket to listen on
+            model_name: Name of the sentence-transformers model to serve
+            threads: CPU threads used for inference (library default if None)
+            max_seq_length: Truncate texts to this many tokens (model
+                default if None)
+            backend: Encoder backend, see encoders.py
+            onnx_dir: Directory of the exported ONNX model
+            onnx_quantized: Use the int8-quantized ONNX model
+        """
+        from encoders import create_encoder, embedding_options
+
+        options = {
+            "backend": backend,
+            "model_name": model_name,
+            "onnx_dir": onnx_dir,
+            "onnx_quantized": onnx_quantized,
+            "threads": threads,
+            "max_seq_length": max_seq_length,
+        }
+        # Clients only use the server if it produces the embeddings they expect
+        self.encoder_options = embedding_options(**options)
+        self.model = create_encoder(**options)
+        self.encode_lock = threading.Lock()
+        self.last_request = time.monotonic()
+
+        os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _Handler)
+        logger.info(f"Model server listening on {socket_path}")
+
+    def serve(self, idle_timeout: float = 0):
+        """
+        Serve requests until interrupted or idle for too long.
+
+        Args:
+            idle_timeout: Shut down after this many idle seconds (0 = never)
+        """
+        if idle_timeout > 0:
+
+            def watchdog():
+                while True:
+                    time.sleep(min(idle_timeout, 10))
+                    if time.monotonic() - self.last_request > idle_timeout:
+                        logger.info("Model server idle, shutting down")
+                        self.shutdown()
+                        return
+
+            threading.Thread(target=watchdog, daemon=True).start()
+
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            if os.path.exists(self.server_address):
+                os.remove(self.server_address)
+
+
+def main():
+    """Run the model server."""
+    parser = argparse.ArgumentParser(description="Serve a warm embedding model")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path")
+    parser.add_argument(
+        "--model", default="all-MiniLM-L6-v2", help="Sentence-transformers model"
+    )
+    parser.add_argument("--threads", type=int, help="CPU threads for encoding")
+    parser.add_argument(
+        "--backend",
+        default="sentence-transformers",
+        choices=["sentence-transformers", "onnx"],
+        help="Encoder backend",
+    )
+    parser.add_argument("--onnx-dir", help="Exported ONNX model directory")
+    parser.add_argument(
+        "--onnx-quantized", action="store_true", help="Use the int8 ONNX model"
+    )
+    parser.add_argument(
+        "--max-seq-length", type=int, help="Truncate texts to this many tokens"
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=0,
+        help="Exit after this many seconds without requests (0 = never)",
+    )
+    args = parser.parse_args()
+
+    server = ModelServer(
+        args.socket,
+        model_name=args.model,
+        threads=args.threads,
+        max_seq_length=args.max_seq_length,
+        backend=args.backend,
+        onnx_dir=args.onnx_dir,
+        onnx_quantized=args.onnx_quantized,
+    )
+    try:
+        server.serve(idle_timeout=args.idle_timeout)
+    except KeyboardInterrupt:
+        logger.info("Model server stopped")
+
+
+if __name__ == "__main__":
+    main()
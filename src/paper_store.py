@@ -0,0 +1,369 @@
+"""
+SQLite-backed local store of fetched papers.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from arxiv_ids import split_arxiv_id
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id TEXT PRIMARY KEY,
+    base_id TEXT,
+    version INTEGER,
+    title TEXT NOT NULL,
+    abstract TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    url TEXT,
+    pdf_url TEXT,
+    published TEXT NOT NULL,
+    primary_category TEXT,
+    fetched_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_papers_published ON papers (published);
+
+CREATE TABLE IF NOT EXISTS paper_categories (
+    paper_id TEXT NOT NULL REFERENCES papers (id),
+    category TEXT NOT NULL,
+    PRIMARY KEY (paper_id, category)
+);
+CREATE INDEX IF NOT EXISTS idx_paper_categories_category
+    ON paper_categories (category);
+
+CREATE TABLE IF NOT EXISTS paper_topics (
+    paper_id TEXT NOT NULL REFERENCES papers (id),
+    topic TEXT NOT NULL,
+    PRIMARY KEY (paper_id, topic)
+);
+CREATE INDEX IF NOT EXISTS idx_paper_topics_topic ON paper_topics (topic);
+"""
+
+PAPER_COLUMNS = (
+    "id, base_id, version, title, abstract, authors, url, pdf_url, published, "
+    "primary_category"
+)
+
+# Value of PRAGMA user_version once all migrations have run
+SCHEMA_VERSION = 1
+
+
+class PaperStore:
+    """Local paper database with indexed lookups by ID, date, category and topic."""
+
+    def __init__(self, db_file: str = "data/papers.db"):
+        """
+        Open (and create if needed) the paper database.
+
+        Args:
+            db_file: Path to the SQLite database file
+        """
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Upgrade databases created by older versions of the store."""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        with self.lock, self.conn:
+            if version < 1:
+                # 1: version-aware identity (base ID and version per paper)
+                columns = {
+                    row["name"]
+                    for row in self.conn.execute("PRAGMA table_info(papers)")
+                }
+                if "base_id" not in columns:
+                    self.conn.execute("ALTER TABLE papers ADD COLUMN base_id TEXT")
+                    self.conn.execute("ALTER TABLE papers ADD COLUMN version INTEGER")
+                ids = [row[0] for row in self.conn.execute("SELECT id FROM papers")]
+                self.conn.executemany(
+                    "UPDATE papers SET base_id = ?, version = ? WHERE id = ?",
+                    [(*split_arxiv_id(pid), pid) for pid in ids],
+                )
+                self.conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_papers_base_id ON papers (base_id)"
+                )
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        logger.info(f"Migrated {self.db_file} to schema version {SCHEMA_VERSION}")
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def upsert_papers(self, papers: List[Dict[str, Any]], topic: Optional[str] = None):
+        """
+        Insert or update papers in bulk.
+
+        Args:
+            papers: List of paper dictionaries from the fetcher
+            topic: Topic the papers were fetched for (defaults to each
+                paper's 'matched_topic', if any)
+        """
+        if not papers:
+            return
+
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        paper_rows = [
+            (
+                p["id"],
+                *split_arxiv_id(p["id"]),
+                p["title"],
+                p["abstract"],
+                json.dumps(p["authors"]),
+                p.get("url"),
+                p.get("pdf_url"),
+                p["published"],
+                p.get("primary_category"),
+                fetched_at,
+            )
+            for p in papers
+        ]
+        category_rows = [(p["id"], c) for p in papers for c in p.get("categories", [])]
+        topic_rows = []
+        for p in papers:
+            paper_topic = topic or p.get("matched_topic")
+            if paper_topic:
+                topic_rows.append((p["id"], paper_topic))
+
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"""
+                INSERT INTO papers ({PAPER_COLUMNS}, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    base_id = excluded.base_id,
+                    version = excluded.version,
+                    title = excluded.title,
+                    abstract = excluded.abstract,
+                    authors = excluded.authors,
+                    url = excluded.url,
+                    pdf_url = excluded.pdf_url,
+                    published = excluded.published,
+                    primary_category = excluded.primary_category,
+                    fetched_at = excluded.fetched_at
+                """,
+                paper_rows,
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO paper_categories VALUES (?, ?)", category_rows
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO paper_topics VALUES (?, ?)", topic_rows
+            )
+
+    def upsert_topic_results(self, topic_results: Dict[str, List[Dict[str, Any]]]):
+        """
+        Store the output of ArxivFetcher.fetch_multiple_topics.
+
+        Args:
+            topic_results: Dictionary mapping topic names to lists of papers
+        """
+        total = 0
+        for topic_name, papers in topic_results.items():
+            self.upsert_papers(papers, topic=topic_name)
+            total += len(papers)
+        logger.info(f"Stored {total} papers in {self.db_file}")
+
+    def _load_relations(
+        self, table: str, column: str, paper_ids: List[str]
+    ) -> Dict[str, List[str]]:
+        """Load categories or topics for a list of paper IDs."""
+        relations: Dict[str, List[str]] = {pid: [] for pid in paper_ids}
+        # Stay well below SQLite's bound parameter limit
+        for start in range(0, len(paper_ids), 500):
+            chunk = paper_ids[start : start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT paper_id, {column} FROM {table} "
+                f"WHERE paper_id IN ({placeholders}) ORDER BY rowid",
+                chunk,
+            )
+            for paper_id, value in rows:
+                relations[paper_id].append(value)
+        return relations
+
+    def _rows_to_papers(self, rows: List[sqlite3.Row]) -> List[Dict[str, Any]]:
+        """Convert database rows to paper dictionaries."""
+        paper_ids = [row["id"] for row in rows]
+        categories = self._load_relations("paper_categories", "category", paper_ids)
+        topics = self._load_relations("paper_topics", "topic", paper_ids)
+
+        papers = []
+        for row in rows:
+            papers.append(
+                {
+                    "id": row["id"],
+                    "base_id": row["base_id"],
+                    "version": row["version"],
+                    "title": row["title"],
+                    "authors": json.loads(row["authors"]),
+                    "abstract": row["abstract"],
+                    "url": row["url"],
+                    "pdf_url": row["pdf_url"],
+                    "published": row["published"],
+                    "categories": categories[row["id"]],
+                    "primary_category": row["primary_category"],
+                    "topics": topics[row["id"]],
+                }
+            )
+        return papers
+
+    def get_paper(self, paper_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a single paper by ID.
+
+        Args:
+            paper_id: arXiv ID
+
+        Returns:
+            Paper dictionary, or None if the paper is not stored
+        """
+        papers = self.get_papers_by_ids([paper_id])
+        return papers[0] if papers else None
+
+    def get_papers_by_ids(
+        self, paper_ids: List[str], by_base_id: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Look up papers by ID, preserving the order of the given IDs.
+
+        Args:
+            paper_ids: arXiv IDs
+            by_base_id: Treat the IDs as base IDs and return the latest stored
+                version of each
+
+        Returns:
+            List of stored papers (unknown IDs are skipped)
+        """
+        column = "base_id" if by_base_id else "id"
+        rows = {}
+        with self.lock:
+            for start in range(0, len(paper_ids), 500):
+                chunk = paper_ids[start : start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                for row in self.conn.execute(
+                    f"SELECT {PAPER_COLUMNS} FROM papers "
+                    f"WHERE {column} IN ({placeholders})",
+                    chunk,
+                ):
+                    previous = rows.get(row[column])
+                    if previous is None or (row["version"] or 0) > (
+                        previous["version"] or 0
+                    ):
+                        rows[row[column]] = row
+            ordered = [rows[pid] for pid in paper_ids if pid in rows]
+            return self._rows_to_papers(ordered)
+
+    def iter_papers(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        categories: Optional[List[str]] = None,
+        topics: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        batch_size: int = 1000,
+        latest_only: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over stored papers matching the filters, newest first.
+
+        Args:
+            since: Only papers published at or after this time
+            until: Only papers published before this time
+            categories: Only papers in at least one of these categories
+            topics: Only papers fetched for at least one of these topics
+            limit: Maximum number of papers
+            batch_size: Number of rows loaded per database round trip
+            latest_only: Skip papers superseded by a stored newer version
+
+        Yields:
+            Paper dictionaries
+        """
+        clauses = []
+        params: List[Any] = []
+        if since is not None:
+            clauses.append("published >= ?")
+            params.append(since.isoformat())
+        if until is not None:
+            clauses.append("published < ?")
+            params.append(until.isoformat())
+        if categories:
+            clauses.append(
+                "id IN (SELECT paper_id FROM paper_categories WHERE category IN "
+                f"({', '.join('?' * len(categories))}))"
+            )
+            params.extend(categories)
+        if topics:
+            clauses.append(
+                "id IN (SELECT paper_id FROM paper_topics WHERE topic IN "
+                f"({', '.join('?' * len(topics))}))"
+            )
+            params.extend(topics)
+        if latest_only:
+            clauses.append(
+                "(version IS NULL OR version = (SELECT MAX(newer.version) "
+                "FROM papers AS newer WHERE newer.base_id = papers.base_id))"
+            )
+
+        remaining = limit
+        last_key = None
+        while remaining is None or remaining > 0:
+            # Keyset pagination on (published DESC, id) keeps each batch cheap
+            page_clauses = list(clauses)
+            page_params = list(params)
+            if last_key is not None:
+                page_clauses.append("(published < ? OR (published = ? AND id > ?))")
+                page_params.extend([last_key[0], last_key[0], last_key[1]])
+
+            count = batch_size if remaining is None else min(batch_size, remaining)
+            sql = f"SELECT {PAPER_COLUMNS} FROM papers"
+            if page_clauses:
+                sql += " WHERE " + " AND ".join(page_clauses)
+            sql += " ORDER BY published DESC, id LIMIT ?"
+            page_params.append(count)
+
+            with self.lock:
+                rows = self.conn.execute(sql, page_params).fetchall()
+                papers = self._rows_to_papers(rows)
+            if not papers:
+                return
+
+            yield from papers
+            last_key = (rows[-1]["published"], rows[-1]["id"])
+            if remaining is not None:
+                remaining -= len(papers)
+            if len(papers) < count:
+                return
+
+    def get_papers(self, **filters: Any) -> List[Dict[str, Any]]:
+        """
+        Load stored papers matching the filters of iter_papers.
+
+        Returns:
+            List of paper dictionaries, newest first
+        """
+        return list(self.iter_papers(**filters))
+
+    def count(self) -> int:
+        """Return the number of stored papers."""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
@@ -0,0 +1,169 @@
+"""
+Optional per-stage CPU and memory profiling of a digest run.
+
+Each stage wrapped in StageProfiler.stage() is run under cProfile and/or
+tracemalloc. write() then saves, per stage, a .pstats file (for pstats or
+snakeviz) and a report of the peak traced memory and the allocation sites
+that grew most during the stage, plus a summary of the hottest functions.
+
+cProfile only sees the thread that runs the stage; fetch threads started with
+fetch.concurrency > 1 show up as time spent waiting for them.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+MODES = ("all", "cpu", "memory")
+
+# Frames kept per traced allocation
+TRACEBACK_FRAMES = 10
+
+
+class StageProfiler:
+    """Collects cProfile and tracemalloc data per pipeline stage."""
+
+    def __init__(self, output_dir: str, mode: str = "all", top: int = 20):
+        """
+        Initialize the profiler.
+
+        Args:
+            output_dir: Directory for the profile reports
+            mode: "cpu" (cProfile), "memory" (tracemalloc) or "all"
+            top: Number of functions and allocation sites per report
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode: {mode} (expected one of {MODES})")
+        self.output_dir = output_dir
+        self.cpu = mode in ("all", "cpu")
+        self.memory = mode in ("all", "memory")
+        self.top = top
+        self.order: List[str] = []
+        self.seconds: Dict[str, float] = {}
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.peaks: Dict[str, int] = {}
+        self.growth: Dict[str, List[tracemalloc.StatisticDiff]] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Profile the block as a stage.
+
+        A stage run several times (e.g. rendering per profile) accumulates
+        its CPU profile; its memory report keeps the run with the highest peak.
+
+        Args:
+            name: Stage name, used in the report file names
+        """
+        if name not in self.order:
+            self.order.append(name)
+
+        before = None
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEBACK_FRAMES)
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+
+        profile = None
+        if self.cpu:
+            profile = self.profiles.setdefault(name, cProfile.Profile())
+            profile.enable()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+
+            if before is not None:
+                peak = tracemalloc.get_traced_memory()[1]
+                if peak >= self.peaks.get(name, 0):
+                    after = tracemalloc.take_snapshot()
+                    self.peaks[name] = peak
+                    self.growth[name] = after.compare_to(before, "lineno")[: self.top]
+
+    def hot_functions(self, name: str, sort: str = "tottime") -> str:
+        """
+        Format the hottest functions of a stage.
+
+        Args:
+            name: Stage name
+            sort: pstats sort key ("tottime" for own time, "cumulative")
+
+        Returns:
+            pstats listing of the top functions
+        """
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiles[name], stream=stream)
+        stats.strip_dirs().sort_stats(sort).print_stats(self.top)
+        return stream.getvalue()
+
+    def memory_report(self, name: str) -> str:
+        """Format the peak memory and top allocation growth of a stage."""
+        lines = [
+            f"Stage: {name}",
+            f"Peak traced memory: {self.peaks[name] / 2**20:.1f} MiB",
+            f"Top {self.top} allocation sites by growth during the stage:",
+        ]
+        for stat in self.growth[name]:
+            frame = stat.traceback[0]
+            lines.append(
+                f"  {stat.size_diff / 2**10:+10.1f} KiB "
+                f"{stat.count_diff:+8d} blocks  {frame.filename}:{frame.lineno}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> str:
+        """
+        Write the per-stage reports and a summary.
+
+        Returns:
+            Path of the summary file
+        """
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        summary = ["Stage profile summary", ""]
+        for name in self.order:
+            line = f"{name}: {self.seconds[name]:.3f}s"
+            if name in self.peaks:
+                line += f", peak {self.peaks[name] / 2**20:.1f} MiB"
+            summary.append(line)
+
+        for name in self.order:
+            if name in self.profiles:
+                self.profiles[name].dump_stats(
+                    os.path.join(self.output_dir, f"{name}.pstats")
+                )
+                summary += ["", f"=== {name}: hottest functions (own time) ==="]
+                summary.append(self.hot_functions(name))
+            if name in self.growth:
+                with open(
+                    os.path.join(self.output_dir, f"{name}_memory.txt"), "w"
+                ) as f:
+                    f.write(self.memory_report(name))
+
+        summary_file = os.path.join(self.output_dir, "summary.txt")
+        with open(summary_file, "w") as f:
+            f.write("\n".join(summary) + "\n")
+
+        for line in summary[2 : 2 + len(self.order)]:
+            logger.info(f"Profile {line}")
+        logger.info(f"Profile reports written to {self.output_dir}")
+        return summary_file
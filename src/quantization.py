@@ -0,0 +1,193 @@
+"""
+Compact storage formats for embeddings.
+
+All formats store unit-length vectors, so cosine similarity is a plain dot
+product. float16 halves the size of float32, and int8 stores each vector as
+8-bit codes with one float32 scale per vector (about a quarter of the size).
+"""
+
+from typing import Optional
+
+import numpy as np
+
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Rows converted to float32 at a time when scoring compact embeddings
+SCORE_BLOCK_ROWS = 4096
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale vectors to unit length.
+
+    Args:
+        vectors: Vector or matrix with one vector per row
+
+    Returns:
+        float32 unit vectors (zero vectors stay zero)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+class QuantizedMatrix:
+    """Matrix of embeddings in float32, float16 or int8 form."""
+
+    def __init__(self, codes: np.ndarray, scales: Optional[np.ndarray] = None):
+        """
+        Wrap stored embeddings.
+
+        Args:
+            codes: Matrix of stored values (float32, float16 or int8)
+            scales: Per-row scales, required for int8 codes
+        """
+        self.codes = codes
+        self.scales = scales
+        self.dtype = np.dtype(codes.dtype).name
+        if self.dtype == "int8" and scales is None:
+            raise ValueError("int8 embeddings need per-row scales")
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the stored representation in bytes."""
+        size = self.codes.nbytes
+        if self.scales is not None:
+            size += self.scales.nbytes
+        return size
+
+    @classmethod
+    def empty(cls, rows: int, dim: int, dtype: str = "float32") -> "QuantizedMatrix":
+        """
+        Create a zero matrix to be filled with assign().
+
+        Args:
+            rows: Number of rows
+            dim: Embedding dimension
+            dtype: Storage format ("float32", "float16" or "int8")
+
+        Returns:
+            Zero matrix in the given format
+        """
+        codes = np.zeros((rows, dim), dtype=DTYPES[dtype])
+        scales = np.zeros(rows, dtype=np.float32) if dtype == "int8" else None
+        return cls(codes, scales)
+
+    @classmethod
+    def from_float(
+        cls, embeddings: np.ndarray, dtype: str = "float32", normalized: bool = False
+    ) -> "QuantizedMatrix":
+        """
+        Convert float embeddings to a storage format.
+
+        Args:
+            embeddings: Matrix with one embedding per row
+            dtype: Storage format ("float32", "float16" or "int8")
+            normalized: Whether the embeddings already have unit length
+
+        Returns:
+            Embeddings in the given format
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown embedding dtype: {dtype}")
+
+        if normalized:
+            vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+        else:
+            vectors = normalize(embeddings)
+        if dtype == "float32":
+            return cls(vectors)
+        if dtype == "float16":
+            return cls(vectors.astype(np.float16))
+
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return cls(codes, scales.astype(np.float32))
+
+    def rows(self, index) -> "QuantizedMatrix":
+        """Select rows by index or mask."""
+        scales = None if self.scales is None else self.scales[index]
+        return QuantizedMatrix(self.codes[index], scales)
+
+    def assign(self, index, other: "QuantizedMatrix"):
+        """
+        Overwrite rows with rows of another matrix in the same format.
+
+        Args:
+            index: Row indices to overwrite
+            other: Matrix with one row per index
+        """
+        if other.dtype != self.dtype:
+            raise ValueError(f"Cannot assign {other.dtype} rows to {self.dtype}")
+        self.codes[index] = other.codes
+        if self.scales is not None:
+            self.scales[index] = other.scales
+
+    def to_float(self, index=slice(None)) -> np.ndarray:
+        """
+        Convert (some) rows back to float32.
+
+        Args:
+            index: Rows to convert (all by default)
+
+        Returns:
+            float32 matrix
+        """
+        vectors = np.array(self.codes[index], dtype=np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[index][..., None]
+        return vectors
+
+    def cosine(
+        self, queries: np.ndarray, buffer: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Cosine similarity of every row to one or more query embeddings.
+
+        float32 rows are scored with a single matrix product. Compact rows
+        are converted block by block into a reusable float32 buffer, so
+        memory stays close to the compact size.
+
+        Args:
+            queries: Query embedding, or matrix with one query per row
+            buffer: float32 scratch matrix of shape (block rows, dim) to
+                reuse across calls (allocated if None)
+
+        Returns:
+            Similarity per row (matrix of rows x queries for several queries)
+        """
+        queries = normalize(queries)
+        if self.dtype == "float32":
+            return self.codes @ queries.T
+
+        if buffer is None or buffer.shape[1] != self.codes.shape[1]:
+            buffer = score_buffer(self.codes.shape[1])
+        block_rows = len(buffer)
+        scores = np.empty((len(self.codes),) + queries.shape[:-1], dtype=np.float32)
+        for start in range(0, len(self.codes), block_rows):
+            end = min(start + block_rows, len(self.codes))
+            block = buffer[: end - start]
+            block[...] = self.codes[start:end]
+            if self.scales is not None:
+                block *= self.scales[start:end, None]
+            np.dot(block, queries.T, out=scores[start:end])
+        return scores
+
+
+def score_buffer(dim: int, rows: int = SCORE_BLOCK_ROWS) -> np.ndarray:
+    """
+    Allocate a scratch buffer for QuantizedMatrix.cosine().
+
+    Args:
+        dim: Embedding dimension
+        rows: Number of rows converted at a time
+
+    Returns:
+        Contiguous float32 matrix
+    """
+    return np.empty((rows, dim), dtype=np.float32)
@@ -0,0 +1,363 @@
+"""
+Consolidate topic queries into per-category arXiv listings.
+
+Topic queries such as ``cat:cs.RO AND (manipulation OR grasping)`` are parsed
+into a small boolean expression tree. Topics are grouped by the categories
+their query requires, each category listing is fetched once, and papers are
+assigned to topics by evaluating every topic query locally.
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Token types: parentheses, quoted strings (optionally field-prefixed) and words
+TOKEN_PATTERN = re.compile(r'\(|\)|(?:\w+:)?"[^"]*"|[^\s()]+')
+OPERATORS = {"AND", "OR", "ANDNOT"}
+FIELDS = {"ti", "abs", "au", "cat", "all", "co", "jr", "rn", "id"}
+# Fields a fetched paper has the data for; comments, journal and report
+# numbers are not part of the paper dictionaries
+LOCAL_FIELDS = {"ti", "abs", "au", "cat", "all"}
+
+
+class QueryParseError(ValueError):
+    """Raised when a topic query cannot be parsed."""
+
+
+class QueryNode:
+    """Node of a parsed arXiv query."""
+
+    def __init__(
+        self,
+        op: str,
+        children: List["QueryNode"] = None,
+        field: str = None,
+        text: str = None,
+    ):
+        """
+        Initialize a node.
+
+        Args:
+            op: One of 'and', 'or', 'andnot' or 'term'
+            children: Child nodes for boolean operators
+            field: Search field for terms (e.g. 'cat', 'ti', 'all')
+            text: Search text for terms
+        """
+        self.op = op
+        self.children = children or []
+        self.field = field
+        self.text = text
+        self.pattern = None
+        if op == "term" and field != "cat":
+            words = [re.escape(w) for w in text.lower().split()]
+            # Word-prefix match approximates arXiv's stemming ("grasp" ~ "grasping")
+            self.pattern = re.compile(r"\b" + r"\W+".join(words))
+
+    def matches(self, paper: Dict[str, Any]) -> bool:
+        """
+        Evaluate the query against a paper.
+
+        Args:
+            paper: Paper dictionary
+
+        Returns:
+            True if the paper satisfies the query
+        """
+        if self.op == "and":
+            return all(child.matches(paper) for child in self.children)
+        if self.op == "or":
+            return any(child.matches(paper) for child in self.children)
+        if self.op == "andnot":
+            return self.children[0].matches(paper) and not self.children[1].matches(
+                paper
+            )
+
+        if self.field == "cat":
+            return any(_category_matches(self.text, c) for c in paper["categories"])
+        return self.pattern.search(_field_text(paper, self.field)) is not None
+
+    def fields(self) -> Set[str]:
+        """Return the search fields used anywhere in the query."""
+        if self.op == "term":
+            return {self.field}
+        return set().union(*(child.fields() for child in self.children))
+
+    def required_categories(self) -> Optional[Set[str]]:
+        """
+        Find categories one of which every matching paper must belong to.
+
+        Returns:
+            Set of category names, or None if the query is not restricted
+            to a fixed set of categories
+        """
+        if self.op == "term":
+            if self.field == "cat" and "*" not in self.text:
+                return {self.text}
+            return None
+        if self.op == "or":
+            categories = set()
+            for child in self.children:
+                child_categories = child.required_categories()
+                if child_categories is None:
+                    return None
+                categories |= child_categories
+            return categories
+        if self.op == "andnot":
+            return self.children[0].required_categories()
+
+        # AND: any conjunct restricts the result; use the narrowest one
+        best = None
+        for child in self.children:
+            child_categories = child.required_categories()
+            if child_categories is not None and (
+                best is None or len(child_categories) < len(best)
+            ):
+                best = child_categories
+        return best
+
+
+def _category_matches(pattern: str, category: str) -> bool:
+    """Match a category against a cat: term, supporting trailing wildcards."""
+    if pattern.endswith("*"):
+        return category.startswith(pattern[:-1])
+    return category == pattern
+
+
+def _field_text(paper: Dict[str, Any], field: str) -> str:
+    """Return the lowercased paper text searched by a query field."""
+    if field == "ti":
+        return paper["title"].lower()
+    if field == "abs":
+        return paper["abstract"].lower()
+    if field == "au":
+        return " ".join(paper["authors"]).lower()
+    # all: the fields a fetched paper has
+    return " ".join(
+        [paper["title"], paper["abstract"], " ".join(paper["authors"])]
+    ).lower()
+
+
+class _Parser:
+    """Recursive-descent parser for arXiv query strings."""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.tokens = TOKEN_PATTERN.findall(query)
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise QueryParseError(f"Unexpected end of query: {self.query}")
+        self.pos += 1
+        return token
+
+    def parse(self) -> QueryNode:
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QueryParseError(f"Unexpected token '{self.peek()}' in: {self.query}")
+        return node
+
+    def parse_or(self) -> QueryNode:
+        children = [self.parse_and()]
+        while self.peek() == "OR":
+            self.next()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else QueryNode("or", children)
+
+    def parse_and(self) -> QueryNode:
+        node = self.parse_adjacent()
+        while self.peek() in ("AND", "ANDNOT"):
+            op = self.next()
+            right = self.parse_adjacent()
+            if op == "AND":
+                if node.op == "and":
+                    node.children.append(right)
+                else:
+                    node = QueryNode("and", [node, right])
+            else:
+                node = QueryNode("andnot", [node, right])
+        return node
+
+    def parse_adjacent(self) -> QueryNode:
+        # Adjacent terms without an operator must all match
+        children = [self.parse_atom()]
+        while self.peek() is not None and self.peek() not in OPERATORS | {")"}:
+            children.append(self.parse_atom())
+        if len(children) == 1:
+            return children[0]
+
+        # Merge runs of bare words in the same field into a phrase
+        merged = [children[0]]
+        for child in children[1:]:
+            last = merged[-1]
+            if (
+                last.op == "term"
+                and child.op == "term"
+                and last.field == child.field
+                and last.field != "cat"
+            ):
+                merged[-1] = QueryNode(
+                    "term", field=last.field, text=f"{last.text} {child.text}"
+                )
+            else:
+                merged.append(child)
+        return merged[0] if len(merged) == 1 else QueryNode("and", merged)
+
+    def parse_atom(self) -> QueryNode:
+        token = self.next()
+        if token == "(":
+            node = self.parse_or()
+            if self.next() != ")":
+                raise QueryParseError(f"Unbalanced parentheses in: {self.query}")
+            return node
+        if token in OPERATORS or token == ")":
+            raise QueryParseError(f"Unexpected token '{token}' in: {self.query}")
+
+        field = "all"
+        if ":" in token:
+            prefix, rest = token.split(":", 1)
+            if prefix in FIELDS:
+                field, token = prefix, rest
+        text = token.strip('"')
+        if not text:
+            raise QueryParseError(f"Empty term in: {self.query}")
+        return QueryNode("term", field=field, text=text)
+
+
+def parse_query(query: str) -> QueryNode:
+    """
+    Parse an arXiv search query.
+
+    Args:
+        query: Query string using arXiv search syntax
+
+    Returns:
+        Root node of the parsed query
+    """
+    return _Parser(query).parse()
+
+
+class QueryPlan:
+    """Grouping of topics by the category listings that cover them."""
+
+    def __init__(self):
+        self.listings: Dict[str, List[str]] = {}  # category -> topic names
+        self.topic_categories: Dict[str, Set[str]] = {}
+        self.topic_queries: Dict[str, QueryNode] = {}
+        self.direct_topics: List[Dict[str, Any]] = []
+
+    @property
+    def num_requests(self) -> int:
+        """Number of arXiv queries needed to execute the plan."""
+        return len(self.listings) + len(self.direct_topics)
+
+
+def plan_queries(topics: List[Dict[str, Any]]) -> QueryPlan:
+    """
+    Group topics by the categories their queries require.
+
+    Topics whose query cannot be parsed, searches fields that cannot be
+    matched locally, or is not restricted to fixed categories are kept as
+    direct queries.
+
+    Args:
+        topics: List of topic configurations with 'name' and 'query'
+
+    Returns:
+        Query plan
+    """
+    plan = QueryPlan()
+
+    for topic in topics:
+        try:
+            node = parse_query(topic["query"])
+        except QueryParseError as e:
+            logger.warning(f"Cannot plan topic '{topic['name']}': {e}")
+            plan.direct_topics.append(topic)
+            continue
+
+        unsupported = node.fields() - LOCAL_FIELDS
+        if unsupported:
+            logger.info(
+                f"Querying topic '{topic['name']}' directly: fields "
+                f"{', '.join(sorted(unsupported))} cannot be matched locally"
+            )
+            plan.direct_topics.append(topic)
+            continue
+
+        categories = node.required_categories()
+        if not categories:
+            plan.direct_topics.append(topic)
+            continue
+
+        plan.topic_queries[topic["name"]] = node
+        plan.topic_categories[topic["name"]] = categories
+        for category in sorted(categories):
+            plan.listings.setdefault(category, []).append(topic["name"])
+
+    logger.info(
+        f"Planned {len(topics)} topics as {len(plan.listings)} category listings "
+        f"and {len(plan.direct_topics)} direct queries"
+    )
+    return plan
+
+
+def assign_papers(
+    plan: QueryPlan,
+    topics: List[Dict[str, Any]],
+    listings: Dict[str, List[Dict[str, Any]]],
+    max_results: int,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Assign papers from category listings to planned topics.
+
+    Args:
+        plan: Query plan
+        topics: Topic configurations
+        listings: Papers fetched for each category listing
+        max_results: Maximum number of papers per topic
+
+    Returns:
+        Dictionary mapping planned topic names to lists of papers
+    """
+    results = {}
+    for topic in topics:
+        name = topic["name"]
+        if name not in plan.topic_queries:
+            continue
+
+        node = plan.topic_queries[name]
+        categories = topic.get("categories", None)
+
+        # Union of the topic's listings, newest first
+        candidates: Dict[str, Dict[str, Any]] = {}
+        for category in plan.topic_categories[name]:
+            for paper in listings.get(category, []):
+                candidates.setdefault(paper["id"], paper)
+        ordered: List[Tuple[str, Dict[str, Any]]] = sorted(
+            candidates.items(), key=lambda item: item[1]["published"], reverse=True
+        )
+
+        papers = []
+        for _, paper in ordered:
+            if categories and not any(c in categories for c in paper["categories"]):
+                continue
+            if not node.matches(paper):
+                continue
+            papers.append(dict(paper))
+            if len(papers) >= max_results:
+                break
+
+        logger.info(f"Assigned {len(papers)} papers to topic: {name}")
+        results[name] = papers
+
+    return results
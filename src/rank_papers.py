@@ -2,14 +2,23 @@
 Rank papers by relevance using semantic similarity and other factors.
 """
 
-import json
+import heapq
 import logging
 import os
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+import metrics
+from ann_index import IVFIndex
+from arxiv_ids import abstract_hash, base_id, split_arxiv_id
+from embedding_cache import EmbeddingCache
+from encoders import create_encoder, embedding_options
+from model_server import RemoteEncoder
+from quantization import QuantizedMatrix, normalize, score_buffer
+from read_history import ReadHistory
+from scoring import KeywordMatcher, PaperColumns, recency_factors, select_top_n
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -20,26 +29,375 @@ logger = logging.getLogger(__name__)
 class PaperRanker:
     """Rank papers by relevance to research interests."""
 
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        cache_dir: Optional[str] = None,
+        cache_max_entries: int = 50000,
+        ann_index_file: Optional[str] = None,
+        model_server: Optional[str] = None,
+        embedding_dtype: str = "float32",
+        normalize_on_encode: bool = True,
+        encode_batch_size: int = 32,
+        encode_threads: Optional[int] = None,
+        max_seq_length: Optional[int] = None,
+        sort_by_length: bool = True,
+        encode_workers: int = 0,
+        encode_pool_min_texts: int = 2000,
+        encoder_backend: str = "sentence-transformers",
+        onnx_dir: Optional[str] = None,
+        onnx_quantized: bool = False,
+        resurface_changed: bool = False,
+        read_only_cache: bool = False,
+    ):
         """
         Initialize the ranker.
 
+        The model is loaded lazily, the first time something needs encoding.
+
         Args:
             model_name: Name of the sentence-transformers model to use
+            cache_dir: Directory for the persistent embedding cache (disabled if None)
+            cache_max_entries: Maximum number of cached paper embeddings
+            ann_index_file: Path of the nearest-neighbour index over
+                historical papers (disabled if None)
+            model_server: Unix socket of a running model server to use
+                instead of loading the model in this process (if reachable)
+            embedding_dtype: Storage and scoring format of paper embeddings:
+                "float32", or the compact "float16" or "int8"
+            normalize_on_encode: Let the model normalize embeddings while
+                encoding (otherwise they are normalized afterwards)
+            encode_batch_size: Number of texts encoded per model batch
+            encode_threads: CPU threads used by torch (library default if None)
+            max_seq_length: Truncate texts to this many tokens (model
+                default if None)
+            sort_by_length: Encode texts in order of length so batches hold
+                texts of similar length and need little padding
+            encode_workers: Number of worker processes for encoding large
+                sets of texts (0 disables the pool, None uses all CPUs)
+            encode_pool_min_texts: Minimum number of texts to encode with
+                the worker pool instead of in-process
+            encoder_backend: "sentence-transformers" or "onnx" (see encoders.py)
+            onnx_dir: Directory of the exported ONNX model (defaults to
+                data/models/<model_name>-onnx)
+            onnx_quantized: Use the int8-quantized ONNX model
+            resurface_changed: Treat a read paper as unread again when its
+                abstract changed in a new version
+            read_only_cache: Never modify the embedding cache on disk (for
+                tools that only query it)
+        """
+        self.model_name = model_name
+        self.embedding_dtype = embedding_dtype
+        self.normalize_on_encode = normalize_on_encode
+        self.encode_batch_size = encode_batch_size
+        self.encode_threads = encode_threads
+        self.max_seq_length = max_seq_length
+        self.sort_by_length = sort_by_length
+        self.encode_workers = encode_workers
+        self.encode_pool_min_texts = encode_pool_min_texts
+        self._encode_pool = None
+        self.encoder_backend = encoder_backend
+        self.onnx_dir = onnx_dir
+        self.onnx_quantized = onnx_quantized
+        self.resurface_changed = resurface_changed
+        self.model_server = model_server
+        self._model = None
+
+        # Interests are encoded on first use
+        self.interests: Optional[str] = None
+        self._interest_embedding = None
+
+        # Multi-profile mode: one interest embedding per row
+        self.profile_names: List[str] = []
+        self.profile_interests: List[str] = []
+        self._profile_embeddings = None
+
+        self._keyword_matcher: Optional[KeywordMatcher] = None
+        # Scratch space for scoring compact embeddings, reused across calls
+        self._score_buffer: Optional[np.ndarray] = None
+
+        self.embedding_cache = None
+        if cache_dir:
+            # Truncation changes the embeddings, so it gets its own cache
+            cache_model = model_name
+            if max_seq_length:
+                cache_model = f"{model_name}@{max_seq_length}"
+            # int8 inference drifts beyond the tolerance shared with float32
+            if encoder_backend == "onnx" and onnx_quantized:
+                cache_model = f"{cache_model}@onnx-int8"
+            self.embedding_cache = EmbeddingCache(
+                cache_dir,
+                model_name=cache_model,
+                max_entries=cache_max_entries,
+                dtype=embedding_dtype,
+                read_only=read_only_cache,
+            )
+
+        self.ann_index_file = ann_index_file
+        self.ann_index = None
+        if ann_index_file and os.path.exists(ann_index_file):
+            self.ann_index = IVFIndex.load(ann_index_file)
+            self._rekey_ann_index()
+
+    @classmethod
+    def from_config(
+        cls, ranking_config: Dict[str, Any], data_dir: str = "data", **overrides
+    ) -> "PaperRanker":
+        """
+        Create a ranker from the `ranking` section of the configuration.
+
+        Args:
+            ranking_config: The `ranking` section of config/topics.yaml
+            data_dir: Directory holding the embedding cache and ANN index
+            **overrides: Constructor arguments taking precedence over the config
+
+        Returns:
+            Configured ranker
         """
-        logger.info(f"Loading sentence transformer model: {model_name}")
-        self.model = SentenceTransformer(model_name)
-        self.interest_embedding = None
+        cache_dir = None
+        if ranking_config.get("embedding_cache", True):
+            cache_dir = os.path.join(data_dir, "cache", "embeddings")
+        ann_index_file = None
+        if ranking_config.get("ann_index", False):
+            ann_index_file = os.path.join(data_dir, "cache", "ann_index.npz")
+        options = {
+            "cache_dir": cache_dir,
+            "cache_max_entries": ranking_config.get(
+                "embedding_cache_max_entries", 50000
+            ),
+            "embedding_dtype": ranking_config.get("embedding_dtype", "float32"),
+            "normalize_on_encode": ranking_config.get("normalize_on_encode", True),
+            "encode_batch_size": ranking_config.get("encode_batch_size", 32),
+            "encode_threads": ranking_config.get("encode_threads"),
+            "max_seq_length": ranking_config.get("max_seq_length"),
+            "sort_by_length": ranking_config.get("sort_by_length", True),
+            "encode_workers": ranking_config.get("encode_workers", 0),
+            "encode_pool_min_texts": ranking_config.get("encode_pool_min_texts", 2000),
+            "encoder_backend": ranking_config.get(
+                "encoder_backend", "sentence-transformers"
+            ),
+            "onnx_dir": ranking_config.get("onnx_dir"),
+            "onnx_quantized": ranking_config.get("onnx_quantized", False),
+            "resurface_changed": ranking_config.get(
+                "resurface_changed_abstracts", False
+            ),
+            "ann_index_file": ann_index_file,
+            "model_server": ranking_config.get("model_server"),
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    @property
+    def model(self):
+        """The encoding model, loaded (or connected to) on first access."""
+        if self._model is None:
+            if self.model_server:
+                remote = RemoteEncoder(self.model_server)
+                served = remote.encoder_options()
+                # Embeddings from a differently configured encoder would be
+                # cached under this ranker's settings
+                expected = embedding_options(**self.encoder_options())
+                if served == expected:
+                    logger.info(f"Using model server at {self.model_server}")
+                    self._model = remote
+                    return self._model
+                if served is not None:
+                    logger.warning(
+                        f"Model server encoder {served} does not match {expected}, "
+                        "loading model locally"
+                    )
+                else:
+                    logger.info("Model server not reachable, loading model locally")
+
+            self._model = create_encoder(**self.encoder_options())
+        return self._model
+
+    @model.setter
+    def model(self, encoder):
+        """Use the given encoder (e.g. a stand-in for offline benchmarks)."""
+        self._model = encoder
+
+    def encoder_options(self) -> Dict[str, Any]:
+        """Keyword arguments of encoders.create_encoder() for this ranker."""
+        return {
+            "backend": self.encoder_backend,
+            "model_name": self.model_name,
+            "onnx_dir": self.onnx_dir,
+            "onnx_quantized": self.onnx_quantized,
+            "threads": self.encode_threads,
+            "max_seq_length": self.max_seq_length,
+        }
+
+    def encoder_for(self, count: int):
+        """
+        Choose the encoder for a number of texts.
+
+        Args:
+            count: Number of texts to encode
+
+        Returns:
+            The worker pool for large sets (if enabled), otherwise the model
+        """
+        if self.encode_workers == 0 or count < self.encode_pool_min_texts:
+            return self.model
+
+        if self._encode_pool is None:
+            from encode_pool import EncodePool
+
+            self._encode_pool = EncodePool(
+                self.encoder_options(), workers=self.encode_workers
+            )
+        logger.info(f"Encoding {count} texts with the worker pool")
+        return self._encode_pool
+
+    def close(self):
+        """Stop the encoding worker pool, if one was started."""
+        if self._encode_pool is not None:
+            self._encode_pool.shutdown()
+            self._encode_pool = None
 
     def set_research_interests(self, interests: str):
         """
-        Set and encode research interests.
+        Set research interests (encoded when first needed).
 
         Args:
             interests: Description of research interests
         """
-        logger.info("Encoding research interests")
-        self.interest_embedding = self.model.encode(interests, convert_to_tensor=False)
+        self.interests = interests
+        self._interest_embedding = None
+
+    @property
+    def interest_embedding(self) -> Optional[np.ndarray]:
+        """Embedding of the research interests, or None if they are not set."""
+        if self._interest_embedding is None and self.interests:
+            logger.info("Encoding research interests")
+            self._interest_embedding = self.encode_texts(self.interests)
+        return self._interest_embedding
+
+    def set_profiles(self, profiles: Dict[str, str]):
+        """
+        Set the research interests of several profiles (encoded when first needed).
+
+        Args:
+            profiles: Mapping of profile name to research interests description
+        """
+        self.profile_names = list(profiles)
+        self.profile_interests = list(profiles.values())
+        self._profile_embeddings = None
+
+    @property
+    def profile_embeddings(self) -> Optional[np.ndarray]:
+        """Matrix of profile interest embeddings, or None if no profiles are set."""
+        if self._profile_embeddings is None and self.profile_interests:
+            logger.info(
+                f"Encoding research interests for {len(self.profile_names)} profiles"
+            )
+            self._profile_embeddings = self.encode_texts(self.profile_interests)
+        return self._profile_embeddings
+
+    def encode_texts(self, texts):
+        """
+        Encode a text or list of texts into unit-length embeddings.
+
+        Args:
+            texts: A text or list of texts
+
+        Returns:
+            Embedding (for a single text) or matrix of embeddings
+        """
+        metrics.increment(
+            "encoded_texts_total", 1 if isinstance(texts, str) else len(texts)
+        )
+        with metrics.timer("encode_seconds"):
+            return self._encode_texts(texts)
+
+    def _encode_texts(self, texts):
+        """Encode texts in order of length (see encode_texts)."""
+        order = None
+        if self.sort_by_length and not isinstance(texts, str) and len(texts) > 1:
+            # Longest first, so each batch is padded to a similar length
+            order = np.argsort([-len(text) for text in texts], kind="stable")
+            texts = [texts[i] for i in order]
+
+        encoder = self.model if isinstance(texts, str) else self.encoder_for(len(texts))
+        kwargs = {"convert_to_tensor": False, "batch_size": self.encode_batch_size}
+        if self.normalize_on_encode:
+            embeddings = np.asarray(
+                encoder.encode(texts, normalize_embeddings=True, **kwargs),
+                dtype=np.float32,
+            )
+        else:
+            embeddings = normalize(encoder.encode(texts, **kwargs))
+
+        if order is not None:
+            unsorted = np.empty_like(embeddings)
+            unsorted[order] = embeddings
+            embeddings = unsorted
+        return embeddings
+
+    def encode_papers(
+        self, papers: List[Dict[str, Any]], save_cache: bool = True
+    ) -> np.ndarray:
+        """
+        Encode papers, reusing cached embeddings where available.
+
+        Args:
+            papers: List of paper dictionaries
+            save_cache: Whether to persist new cache entries immediately
+
+        Returns:
+            Matrix with one embedding per paper
+        """
+        return self.encode_papers_quantized(papers, save_cache).to_float()
+
+    def encode_papers_quantized(
+        self, papers: List[Dict[str, Any]], save_cache: bool = True
+    ) -> QuantizedMatrix:
+        """
+        Encode papers into the configured storage format, reusing the cache.
+
+        Args:
+            papers: List of paper dictionaries
+            save_cache: Whether to persist new cache entries immediately
+
+        Returns:
+            Embeddings with one row per paper
+        """
+        # Create text representations of papers (title + abstract)
+        paper_texts = [f"{p['title']} {p['abstract']}" for p in papers]
+
+        if self.embedding_cache is None:
+            return QuantizedMatrix.from_float(
+                self.encode_texts(paper_texts), self.embedding_dtype, normalized=True
+            )
+
+        keys = [
+            EmbeddingCache.make_key(base_id(p["id"]), text)
+            for p, text in zip(papers, paper_texts)
+        ]
+        stored, missing = self.embedding_cache.get_many_quantized(keys)
+        logger.info(
+            f"Embedding cache: {len(papers) - len(missing)} hits, "
+            f"{len(missing)} papers to encode"
+        )
+        if not missing:
+            return stored
+
+        new_embeddings = QuantizedMatrix.from_float(
+            self.encode_texts([paper_texts[i] for i in missing]),
+            self.embedding_dtype,
+            normalized=True,
+        )
+        self.embedding_cache.put_many([keys[i] for i in missing], new_embeddings)
+        if save_cache:
+            self.embedding_cache.save()
+
+        if stored is None:
+            stored = QuantizedMatrix.empty(
+                len(papers), new_embeddings.codes.shape[1], self.embedding_dtype
+            )
+        stored.assign(missing, new_embeddings)
+        return stored
 
     def compute_semantic_similarity(
         self, papers: List[Dict[str, Any]]
@@ -53,6 +411,22 @@ class PaperRanker:
         Returns:
             Papers with added 'similarity_score' field
         """
+        # Add similarity scores to papers
+        for paper, similarity in zip(papers, self.compute_similarities(papers)):
+            paper["similarity_score"] = float(similarity)
+
+        return papers
+
+    def compute_similarities(self, papers: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Compute the cosine similarity of papers to the research interests.
+
+        Args:
+            papers: List of paper dictionaries
+
+        Returns:
+            Similarity per paper
+        """
         if self.interest_embedding is None:
             raise ValueError(
                 "Research interests not set. Call set_research_interests() first."
@@ -60,26 +434,138 @@ class PaperRanker:
 
         logger.info(f"Computing semantic similarity for {len(papers)} papers")
 
-        # Create text representations of papers (title + abstract)
-        paper_texts = [f"{p['title']} {p['abstract']}" for p in papers]
+        return self.score_embeddings(
+            self.encode_papers_quantized(papers), self.interest_embedding
+        )
+
+    def score_embeddings(
+        self, embeddings: QuantizedMatrix, queries: np.ndarray
+    ) -> np.ndarray:
+        """
+        Cosine similarity of stored paper embeddings to interest embeddings.
 
-        # Encode papers
-        paper_embeddings = self.model.encode(paper_texts, convert_to_tensor=False)
+        Embeddings are unit length, so this is a single matrix product (on
+        the compact form if the embeddings are quantized).
 
-        # Compute cosine similarity
-        similarities = np.dot(paper_embeddings, self.interest_embedding) / (
-            np.linalg.norm(paper_embeddings, axis=1)
-            * np.linalg.norm(self.interest_embedding)
+        Args:
+            embeddings: Paper embeddings from encode_papers_quantized()
+            queries: Interest embedding, or matrix of profile embeddings
+
+        Returns:
+            Similarity per paper (matrix of papers x profiles for several)
+        """
+        if embeddings.dtype != "float32" and (
+            self._score_buffer is None
+            or self._score_buffer.shape[1] != embeddings.codes.shape[1]
+        ):
+            self._score_buffer = score_buffer(embeddings.codes.shape[1])
+        return embeddings.cosine(queries, buffer=self._score_buffer)
+
+    def build_ann_index(self, papers: List[Dict[str, Any]], n_lists: int = None):
+        """
+        Build the nearest-neighbour index from scratch.
+
+        Args:
+            papers: All papers to index (e.g. every paper in the paper store)
+            n_lists: Number of index clusters (defaults to about sqrt(len(papers)))
+        """
+        if not papers:
+            logger.warning("No papers to index")
+            return
+
+        logger.info(f"Building ANN index over {len(papers)} papers")
+        self.ann_index = IVFIndex(n_lists=n_lists)
+        self.ann_index.build(
+            [base_id(p["id"]) for p in papers], self.encode_papers(papers)
         )
+        if self.ann_index_file:
+            self.ann_index.save(self.ann_index_file)
 
-        # Add similarity scores to papers
-        for paper, similarity in zip(papers, similarities):
-            paper["similarity_score"] = float(similarity)
+    def index_papers(self, papers: List[Dict[str, Any]]):
+        """
+        Add papers to the nearest-neighbour index.
 
-        return papers
+        Args:
+            papers: Papers to add (already indexed papers are replaced)
+        """
+        if not papers:
+            return
+
+        if self.ann_index is None:
+            self.build_ann_index(papers)
+            return
+
+        self.add_to_index([p["id"] for p in papers], self.encode_papers(papers))
+
+    def add_to_index(self, ids: List[str], embeddings: np.ndarray):
+        """
+        Add already encoded papers to the nearest-neighbour index.
+
+        The index is keyed by base arXiv ID, so a new version replaces the
+        entry of the previous one.
+
+        Args:
+            ids: Paper IDs
+            embeddings: Matrix with one embedding per ID
+        """
+        if not len(ids):
+            return
+        if self.ann_index is None:
+            logger.info(f"Building ANN index over {len(ids)} papers")
+            self.ann_index = IVFIndex()
+        self.ann_index.add([base_id(pid) for pid in ids], embeddings)
+        if self.ann_index_file:
+            self.ann_index.save(self.ann_index_file)
+
+    def _rekey_ann_index(self):
+        """Re-key an index saved with versioned IDs by base ID (newest wins)."""
+        ids = list(self.ann_index.ids)
+        if all(split_arxiv_id(pid)[1] is None for pid in ids):
+            return
+        logger.info("Re-keying ANN index by base arXiv ID")
+        # build() keeps the last embedding of each ID, i.e. the newest version
+        order = sorted(range(len(ids)), key=lambda i: split_arxiv_id(ids[i])[1] or 0)
+        self.ann_index.build(
+            [base_id(ids[i]) for i in order], self.ann_index.vectors[order]
+        )
+        if self.ann_index_file:
+            self.ann_index.save(self.ann_index_file)
+
+    def find_similar(
+        self, text: str = None, paper_id: str = None, k: int = 10
+    ) -> List[Tuple[str, float]]:
+        """
+        Find the indexed papers closest to an interest text or a paper.
+
+        Args:
+            text: Free-text description to search for
+            paper_id: ID of an indexed paper to find neighbours of (with or
+                without version)
+            k: Number of results
+
+        Returns:
+            List of (base paper ID, cosine similarity), most similar first
+        """
+        if self.ann_index is None:
+            raise ValueError("No ANN index. Call build_ann_index() first.")
+
+        if paper_id is not None:
+            query = self.ann_index.get_vector(base_id(paper_id))
+            if query is None:
+                raise ValueError(f"Paper {paper_id} is not in the ANN index")
+            return self.ann_index.search(query, k=k, exclude={base_id(paper_id)})
+
+        if text is None:
+            raise ValueError("Either text or paper_id is required")
+        query = self.encode_texts(text)
+        return self.ann_index.search(query, k=k)
 
     def apply_keyword_bonus(
-        self, papers: List[Dict[str, Any]], keywords: List[str], bonus: float = 0.05
+        self,
+        papers: List[Dict[str, Any]],
+        keywords: List[str],
+        bonus: float = 0.05,
+        columns: Optional[PaperColumns] = None,
     ) -> List[Dict[str, Any]]:
         """
         Add bonus score for papers matching important keywords.
@@ -88,25 +574,55 @@ class PaperRanker:
             papers: List of paper dictionaries
             keywords: List of important keywords
             bonus: Bonus score per keyword match
+            columns: Precomputed scoring columns of the papers
 
         Returns:
             Papers with updated scores
         """
         logger.info(f"Applying keyword bonus for {len(keywords)} keywords")
 
-        for paper in papers:
-            title_lower = paper["title"].lower()
-            matches = sum(1 for keyword in keywords if keyword.lower() in title_lower)
-            if matches > 0:
-                paper["keyword_matches"] = matches
-                paper["similarity_score"] += bonus * matches
-            else:
-                paper["keyword_matches"] = 0
+        matches = self.count_keyword_matches(papers, keywords, columns)
+        for paper, count in zip(papers, matches.tolist()):
+            paper["keyword_matches"] = count
+            if count > 0:
+                paper["similarity_score"] += bonus * count
 
         return papers
 
+    def count_keyword_matches(
+        self,
+        papers: List[Dict[str, Any]],
+        keywords: List[str],
+        columns: Optional[PaperColumns] = None,
+    ) -> np.ndarray:
+        """
+        Count the keywords contained in each paper's title.
+
+        Args:
+            papers: List of paper dictionaries
+            keywords: List of important keywords
+            columns: Precomputed scoring columns of the papers
+
+        Returns:
+            Number of matching keywords per paper
+        """
+        # The compiled matcher is reused while the keywords stay the same
+        if self._keyword_matcher is None or self._keyword_matcher.keywords != tuple(
+            keywords
+        ):
+            self._keyword_matcher = KeywordMatcher(keywords)
+
+        if columns is not None:
+            titles = columns.titles
+        else:
+            titles = [paper["title"].lower() for paper in papers]
+        return self._keyword_matcher.count_many(titles)
+
     def apply_recency_weight(
-        self, papers: List[Dict[str, Any]], weight: float = 0.1
+        self,
+        papers: List[Dict[str, Any]],
+        weight: float = 0.1,
+        columns: Optional[PaperColumns] = None,
     ) -> List[Dict[str, Any]]:
         """
         Add weight for more recent papers.
@@ -114,6 +630,7 @@ class PaperRanker:
         Args:
             papers: List of paper dictionaries
             weight: Maximum weight for newest papers
+            columns: Precomputed scoring columns of the papers
 
         Returns:
             Papers with updated scores
@@ -123,54 +640,79 @@ class PaperRanker:
 
         logger.info("Applying recency weight")
 
-        # Get publication dates
-        dates = [datetime.fromisoformat(p["published"]) for p in papers]
-        min_date = min(dates)
-        max_date = max(dates)
-        date_range = (max_date - min_date).total_seconds()
+        recency_scores = self.compute_recency_factors(papers, columns=columns) * weight
+        for paper, recency_score in zip(papers, recency_scores.tolist()):
+            paper["recency_score"] = recency_score
+            paper["similarity_score"] += recency_score
 
-        # Avoid division by zero
-        if date_range == 0:
-            date_range = 1
+        return papers
 
-        # Apply recency weight
-        for paper in papers:
-            paper_date = datetime.fromisoformat(paper["published"])
-            recency_factor = (paper_date - min_date).total_seconds() / date_range
-            paper["recency_score"] = recency_factor * weight
-            paper["similarity_score"] += paper["recency_score"]
+    def compute_recency_factors(
+        self,
+        papers: List[Dict[str, Any]],
+        window: Optional[Tuple[datetime, datetime]] = None,
+        columns: Optional[PaperColumns] = None,
+    ) -> np.ndarray:
+        """
+        Scale publication dates to [0, 1], from oldest to newest paper.
 
-        return papers
+        Args:
+            papers: Non-empty list of paper dictionaries
+            window: Fixed (oldest, newest) bounds to scale against instead of
+                the dates of the given papers; dates outside are clipped
+            columns: Precomputed scoring columns of the papers
+
+        Returns:
+            Recency factor per paper
+        """
+        if columns is None:
+            columns = PaperColumns(papers)
+        return recency_factors(columns.timestamps, window)
+
+    def is_read(self, read_history: ReadHistory, paper: Dict[str, Any]) -> bool:
+        """
+        Check whether any version of a paper is in a read history.
+
+        Args:
+            read_history: History to check
+            paper: Paper dictionary
+
+        Returns:
+            True if the paper was read (and, with resurface_changed, its
+            abstract is unchanged)
+        """
+        if self.resurface_changed:
+            return read_history.is_read(paper["id"], abstract_hash(paper["abstract"]))
+        return paper["id"] in read_history
 
     def filter_read_papers(
         self,
         papers: List[Dict[str, Any]],
-        read_papers_file: str = "data/read_papers.json",
+        read_papers_file: str = "data/read_papers.jsonl",
     ) -> List[Dict[str, Any]]:
         """
         Filter out papers that have already been read.
 
         Args:
             papers: List of paper dictionaries
-            read_papers_file: Path to file tracking read papers
+            read_papers_file: Path to log tracking read papers
 
         Returns:
             Filtered list of papers
         """
-        if not os.path.exists(read_papers_file):
-            logger.info("No read papers file found, returning all papers")
-            return papers
-
         try:
-            with open(read_papers_file, "r") as f:
-                read_data = json.load(f)
-                read_ids = set(read_data.get("paper_ids", []))
+            read_history = ReadHistory.open(read_papers_file)
         except Exception as e:
-            logger.warning(f"Error reading read_papers file: {e}")
+            logger.warning(f"Error reading read papers history: {e}")
+            return papers
+
+        if not len(read_history):
+            logger.info("No read papers history found, returning all papers")
             return papers
 
-        filtered_papers = [p for p in papers if p["id"] not in read_ids]
+        filtered_papers = [p for p in papers if not self.is_read(read_history, p)]
         removed_count = len(papers) - len(filtered_papers)
+        metrics.increment("papers_dropped_total", removed_count, reason="read")
 
         logger.info(f"Filtered out {removed_count} previously read papers")
         return filtered_papers
@@ -184,7 +726,7 @@ class PaperRanker:
         keyword_bonus: float = 0.05,
         recency_weight: float = 0.1,
         filter_read: bool = True,
-        read_papers_file: str = "data/read_papers.json",
+        read_papers_file: str = "data/read_papers.jsonl",
     ) -> List[Dict[str, Any]]:
         """
         Rank papers by relevance.
@@ -214,29 +756,282 @@ class PaperRanker:
             logger.warning("No new papers after filtering")
             return []
 
-        # Compute semantic similarity
-        papers = self.compute_semantic_similarity(papers)
+        # Score every paper as arrays; only the top papers become results
+        scores = self.compute_similarities(papers).astype(np.float64)
 
-        # Apply keyword bonus
-        if keywords:
-            papers = self.apply_keyword_bonus(papers, keywords, keyword_bonus)
+        with metrics.timer("score_seconds"):
+            columns = PaperColumns(papers)
 
-        # Apply recency weight
-        papers = self.apply_recency_weight(papers, recency_weight)
+            # Apply keyword bonus
+            keyword_matches = None
+            if keywords:
+                logger.info(f"Applying keyword bonus for {len(keywords)} keywords")
+                keyword_matches = self.count_keyword_matches(papers, keywords, columns)
+                scores += keyword_bonus * keyword_matches
 
-        # Filter by threshold
-        papers = [p for p in papers if p["similarity_score"] >= min_threshold]
-        logger.info(f"{len(papers)} papers above threshold {min_threshold}")
+            # Apply recency weight
+            logger.info("Applying recency weight")
+            recency_scores = (
+                self.compute_recency_factors(papers, columns=columns) * recency_weight
+            )
+            scores += recency_scores
+
+            # Select the top N above the threshold
+            top = select_top_n(scores, top_n, min_threshold)
 
-        # Sort by score
-        papers.sort(key=lambda x: x["similarity_score"], reverse=True)
+        above = int(np.count_nonzero(scores >= min_threshold))
+        logger.info(f"{above} papers above threshold {min_threshold}")
+        metrics.increment(
+            "papers_dropped_total", len(papers) - above, reason="threshold"
+        )
+        metrics.increment("papers_dropped_total", above - len(top), reason="top_n")
 
-        # Return top N
-        top_papers = papers[:top_n]
+        top_papers = []
+        for i in top.tolist():
+            paper = papers[i]
+            paper["similarity_score"] = float(scores[i])
+            if keyword_matches is not None:
+                paper["keyword_matches"] = int(keyword_matches[i])
+            paper["recency_score"] = float(recency_scores[i])
+            top_papers.append(paper)
         logger.info(f"Returning top {len(top_papers)} papers")
 
         return top_papers
 
+    def rank_papers_for_profiles(
+        self,
+        papers: List[Dict[str, Any]],
+        keywords: List[str] = None,
+        min_threshold: float = 0.3,
+        top_n: int = 10,
+        keyword_bonus: float = 0.05,
+        recency_weight: float = 0.1,
+        read_papers_files: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Rank papers for every profile in a single pass.
+
+        Papers are encoded once and scored against all profiles with one
+        matrix multiply; keyword and recency bonuses are shared. Each
+        profile gets copies of its top papers carrying its own scores.
+
+        Args:
+            papers: List of paper dictionaries
+            keywords: Important keywords for bonus scoring
+            min_threshold: Minimum similarity threshold
+            top_n: Number of top papers to return per profile
+            keyword_bonus: Bonus score per keyword match
+            recency_weight: Weight for recency scoring
+            read_papers_files: Optional mapping of profile name to the log
+                tracking that profile's read papers
+
+        Returns:
+            Dictionary mapping profile names to ranked lists of top papers
+        """
+        if self.profile_embeddings is None:
+            raise ValueError("Profiles not set. Call set_profiles() first.")
+
+        if not papers:
+            logger.warning("No papers to rank")
+            return {name: [] for name in self.profile_names}
+
+        logger.info(
+            f"Ranking {len(papers)} papers for {len(self.profile_names)} profiles"
+        )
+
+        # Cosine similarity of every paper against every profile
+        similarities = self.score_embeddings(
+            self.encode_papers_quantized(papers), self.profile_embeddings
+        )
+
+        # Profile-independent bonuses
+        columns = PaperColumns(papers)
+        keyword_matches = (
+            self.count_keyword_matches(papers, keywords, columns)
+            if keywords
+            else np.zeros(len(papers), dtype=np.int64)
+        )
+        recency_scores = (
+            self.compute_recency_factors(papers, columns=columns) * recency_weight
+        )
+        scores = (
+            similarities + (keyword_bonus * keyword_matches + recency_scores)[:, None]
+        )
+
+        results = {}
+        for j, name in enumerate(self.profile_names):
+            read_history = None
+            if read_papers_files and name in read_papers_files:
+                read_history = ReadHistory.open(read_papers_files[name])
+
+            unread = None
+            if read_history is not None:
+                unread = np.fromiter(
+                    (not self.is_read(read_history, paper) for paper in papers),
+                    dtype=bool,
+                    count=len(papers),
+                )
+            candidates = select_top_n(scores[:, j], top_n, min_threshold, unread)
+
+            eligible = scores[:, j] >= min_threshold
+            read = 0
+            if unread is not None:
+                read = len(papers) - int(np.count_nonzero(unread))
+                eligible &= unread
+            eligible_count = int(np.count_nonzero(eligible))
+            for reason, count in (
+                ("read", read),
+                ("threshold", len(papers) - read - eligible_count),
+                ("top_n", eligible_count - len(candidates)),
+            ):
+                metrics.increment(
+                    "papers_dropped_total", count, reason=reason, profile=name
+                )
+
+            results[name] = [
+                {
+                    **papers[i],
+                    "similarity_score": float(scores[i, j]),
+                    "keyword_matches": int(keyword_matches[i]),
+                    "recency_score": float(recency_scores[i]),
+                }
+                for i in candidates.tolist()
+            ]
+            logger.info(f"Profile {name}: returning top {len(results[name])} papers")
+
+        return results
+
+    def rank_paper_stream(
+        self,
+        papers: Iterable[Dict[str, Any]],
+        recency_window: Tuple[datetime, datetime],
+        keywords: List[str] = None,
+        min_threshold: float = 0.3,
+        top_n: int = 10,
+        keyword_bonus: float = 0.05,
+        recency_weight: float = 0.1,
+        filter_read: bool = True,
+        read_papers_file: str = "data/read_papers.jsonl",
+        batch_size: int = 256,
+        update_index: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank a stream of papers in micro-batches with a bounded top-N heap.
+
+        Memory stays proportional to batch_size and top_n rather than to the
+        number of papers (plus one float32 embedding per unread paper with
+        update_index). Because the full set of dates is unknown while
+        streaming, recency is scaled against a fixed window.
+
+        Args:
+            papers: Iterable of paper dictionaries (e.g. a fetch generator)
+            recency_window: (oldest, newest) dates used to scale recency
+            keywords: Important keywords for bonus scoring
+            min_threshold: Minimum similarity threshold
+            top_n: Number of top papers to return
+            keyword_bonus: Bonus score per keyword match
+            recency_weight: Weight for recency scoring
+            filter_read: Whether to filter out previously read papers
+            read_papers_file: Path to log tracking read papers
+            batch_size: Number of papers encoded and scored together
+            update_index: Add the encoded (unread) papers to the
+                nearest-neighbour index once the stream ends
+
+        Returns:
+            Ranked list of top papers
+        """
+        if self.interest_embedding is None:
+            raise ValueError(
+                "Research interests not set. Call set_research_interests() first."
+            )
+
+        read_history = ReadHistory.open(read_papers_file) if filter_read else None
+        interest = self.interest_embedding
+
+        # Min-heap of (score, -arrival index, paper); ties keep arrival order
+        heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        counts = {"seen": 0, "read": 0, "above_threshold": 0}
+        index_ids: List[str] = []
+        index_embeddings: List[np.ndarray] = []
+
+        def score_batch(batch: List[Dict[str, Any]], first_index: int):
+            embeddings = self.encode_papers_quantized(batch, save_cache=False)
+            if update_index:
+                index_ids.extend(p["id"] for p in batch)
+                index_embeddings.append(embeddings.to_float())
+            similarities = self.score_embeddings(embeddings, interest)
+            columns = PaperColumns(batch)
+            matches = (
+                self.count_keyword_matches(batch, keywords, columns)
+                if keywords
+                else np.zeros(len(batch), dtype=np.int64)
+            )
+            recency = (
+                self.compute_recency_factors(
+                    batch, window=recency_window, columns=columns
+                )
+                * recency_weight
+            )
+            scores = similarities + keyword_bonus * matches + recency
+
+            for offset, paper in enumerate(batch):
+                score = float(scores[offset])
+                if score < min_threshold:
+                    continue
+                counts["above_threshold"] += 1
+
+                item = (score, -(first_index + offset), paper)
+                if len(heap) < top_n:
+                    heapq.heappush(heap, item)
+                elif item[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, item)
+                else:
+                    continue
+                paper["similarity_score"] = score
+                paper["keyword_matches"] = int(matches[offset])
+                paper["recency_score"] = float(recency[offset])
+
+        batch: List[Dict[str, Any]] = []
+        next_index = 0
+        for paper in papers:
+            counts["seen"] += 1
+            if read_history is not None and self.is_read(read_history, paper):
+                counts["read"] += 1
+                continue
+            batch.append(paper)
+            if len(batch) >= batch_size:
+                score_batch(batch, next_index)
+                next_index += len(batch)
+                batch = []
+        if batch:
+            score_batch(batch, next_index)
+
+        if self.embedding_cache is not None:
+            self.embedding_cache.save()
+        if index_ids:
+            self.add_to_index(index_ids, np.vstack(index_embeddings))
+
+        top_papers = [
+            item[2] for item in sorted(heap, key=lambda x: x[:2], reverse=True)
+        ]
+        metrics.increment("papers_dropped_total", counts["read"], reason="read")
+        metrics.increment(
+            "papers_dropped_total",
+            counts["seen"] - counts["read"] - counts["above_threshold"],
+            reason="threshold",
+        )
+        metrics.increment(
+            "papers_dropped_total",
+            counts["above_threshold"] - len(top_papers),
+            reason="top_n",
+        )
+        logger.info(
+            f"Streamed {counts['seen']} papers: {counts['read']} previously read, "
+            f"{counts['above_threshold']} above threshold {min_threshold}, "
+            f"returning top {len(top_papers)}"
+        )
+        return top_papers
+
 
 def main():
     """Example usage of the PaperRanker."""
@@ -0,0 +1,97 @@
+"""
+Thread-safe rate limiting for arXiv API requests.
+
+The request rate adapts to the server: a throttling response (429/503) halves
+it and pauses all fetch threads, and each successful request then restores a
+tenth of the configured rate until it is reached again.
+"""
+
+import logging
+import threading
+import time
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter shared between fetch threads."""
+
+    def __init__(self, rate: float = 3.0, capacity: float = 1.0, min_rate: float = 0.1):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate: Number of tokens (requests) added per second, and the
+                highest rate reached again after throttling
+            capacity: Maximum number of tokens that can accumulate (burst size)
+            min_rate: Lowest rate throttling can reduce the limiter to
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.resume_at = 0.0
+        self.last_throttle = float("-inf")
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        """Add the tokens accumulated since the last refill."""
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.last_refill = now
+
+    def acquire(self, tokens: float = 1.0):
+        """
+        Block until `tokens` tokens are available and consume them.
+
+        Args:
+            tokens: Number of tokens to consume
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.resume_at:
+                    wait_time = self.resume_at - now
+                else:
+                    self._refill()
+                    if self.tokens >= tokens:
+                        self.tokens -= tokens
+                        return
+                    wait_time = (tokens - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+    def throttle(self, delay: float):
+        """
+        React to a throttling response: pause all requests and slow down.
+
+        Args:
+            delay: Seconds before the next request (e.g. from Retry-After)
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.resume_at = max(self.resume_at, now + delay)
+            # Concurrent requests throttled together slow down only once
+            if now - self.last_throttle >= 1.0 / self.rate:
+                self._refill()
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.last_throttle = now
+                logger.warning(
+                    f"Throttled by server, pausing {delay:.1f}s and lowering "
+                    f"rate to {self.rate:.2f} requests/s"
+                )
+
+    def succeed(self):
+        """Record a successful request, recovering the configured rate."""
+        if self.rate >= self.max_rate:
+            return
+        with self.lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
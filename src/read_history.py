@@ -0,0 +1,329 @@
+"""
+Append-only log of papers that have already appeared in a digest.
+
+Each line of the log is a JSON history entry ({"date", "paper_ids", "count"},
+plus optional "abstract_hashes" mapping base IDs to abstract hashes).
+Papers are tracked by base arXiv ID, so a new version of a read paper counts
+as read. Appends are flushed and fsynced, a torn trailing line from a crash is
+ignored on load, and compaction rewrites the log atomically. Appends,
+compaction and migration hold an exclusive flock on a `.lock` file next to
+the log, so other processes never append to a log that is being replaced.
+"""
+
+import argparse
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from arxiv_ids import base_id
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class ReadHistory:
+    """Set of read paper IDs backed by an append-only JSON lines log."""
+
+    _instances: Dict[str, "ReadHistory"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self, log_file: str = "data/read_papers.jsonl", legacy_file: str = None
+    ):
+        """
+        Initialize the history, migrating a legacy JSON file if needed.
+
+        Args:
+            log_file: Path to the JSON lines log
+            legacy_file: Path to a read_papers.json file to import when the
+                log does not exist yet (defaults to the log path with a
+                '.json' suffix)
+        """
+        if legacy_file is None and log_file.endswith(".jsonl"):
+            legacy_file = os.path.splitext(log_file)[0] + ".json"
+        self.log_file = log_file
+        self.lock_file = log_file + ".lock"
+        self.legacy_file = legacy_file
+        self.lock = threading.RLock()
+        self.paper_ids: Set[str] = set()  # base IDs
+        self.abstract_hashes: Dict[str, str] = {}  # base ID -> latest hash
+        self.entries: List[Dict[str, Any]] = []
+        self.offset = 0
+        self.inode = None
+
+        if not os.path.exists(log_file) and legacy_file and os.path.exists(legacy_file):
+            with self._locked():
+                # Another process may have migrated it meanwhile
+                if not os.path.exists(log_file):
+                    self._migrate_legacy()
+        self.refresh()
+
+    @classmethod
+    def open(cls, path: str) -> "ReadHistory":
+        """
+        Get the shared history for a path, refreshed with any new log entries.
+
+        Args:
+            path: Path to the log file
+
+        Returns:
+            ReadHistory instance
+        """
+        key = os.path.abspath(path)
+        with cls._instances_lock:
+            history = cls._instances.get(key)
+            if history is None:
+                history = cls(path)
+                cls._instances[key] = history
+                return history
+        history.refresh()
+        return history
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the thread lock and an exclusive lock shared with other processes."""
+        with self.lock:
+            os.makedirs(os.path.dirname(self.lock_file) or ".", exist_ok=True)
+            # A separate file, since compaction replaces the log's inode
+            with open(self.lock_file, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _migrate_legacy(self):
+        """Import entries from a legacy read_papers.json file."""
+        try:
+            with open(self.legacy_file, "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Error loading legacy read papers file: {e}")
+            return
+
+        entries = list(data.get("history", []))
+        recorded = {pid for entry in entries for pid in entry.get("paper_ids", [])}
+        unrecorded = [pid for pid in data.get("paper_ids", []) if pid not in recorded]
+        if unrecorded:
+            entries.insert(
+                0,
+                {
+                    "date": datetime.now().isoformat(),
+                    "paper_ids": unrecorded,
+                    "count": len(unrecorded),
+                },
+            )
+
+        self._write_atomic(entries)
+        logger.info(
+            f"Migrated {len(entries)} history entries from {self.legacy_file} "
+            f"to {self.log_file}"
+        )
+
+    def refresh(self):
+        """Read entries appended to the log since the last load."""
+        with self.lock:
+            if not os.path.exists(self.log_file):
+                return
+
+            with open(self.log_file, "rb") as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self.inode:
+                    # New, or compacted by another process; reload it fully
+                    self.paper_ids = set()
+                    self.abstract_hashes = {}
+                    self.entries = []
+                    self.offset = 0
+                    self.inode = inode
+                f.seek(self.offset)
+                data = f.read()
+
+            # Only consume complete lines; a torn last line is left for later
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning("Skipping corrupt read history entry")
+                    continue
+                self._apply(entry)
+            self.offset += end
+
+    def _apply(self, entry: Dict[str, Any]):
+        """Add an entry's papers to the in-memory state."""
+        self.entries.append(entry)
+        self.paper_ids.update(base_id(pid) for pid in entry.get("paper_ids", []))
+        self.abstract_hashes.update(entry.get("abstract_hashes", {}))
+
+    def __contains__(self, paper_id: str) -> bool:
+        return base_id(paper_id) in self.paper_ids
+
+    def __len__(self) -> int:
+        return len(self.paper_ids)
+
+    def is_read(self, paper_id: str, abstract_hash: Optional[str] = None) -> bool:
+        """
+        Check whether a paper (any version of it) has been read.
+
+        Args:
+            paper_id: arXiv ID with or without version
+            abstract_hash: Hash of the paper's current abstract; if given and
+                a different hash was recorded, the paper counts as unread
+
+        Returns:
+            True if the paper was read (and its abstract has not changed)
+        """
+        paper_base = base_id(paper_id)
+        if paper_base not in self.paper_ids:
+            return False
+        recorded = self.abstract_hashes.get(paper_base)
+        return abstract_hash is None or recorded is None or recorded == abstract_hash
+
+    def add(
+        self,
+        paper_ids: Iterable[str],
+        abstract_hashes: Optional[Dict[str, str]] = None,
+    ) -> List[str]:
+        """
+        Append papers that are not in the history yet.
+
+        Args:
+            paper_ids: Paper IDs to mark as read
+            abstract_hashes: Optional mapping of paper ID to abstract hash;
+                a read paper whose hash changed is recorded again
+
+        Returns:
+            List of IDs that were newly added
+        """
+        abstract_hashes = abstract_hashes or {}
+        with self._locked():
+            # Entries appended by other processes count as read
+            self.refresh()
+            new_ids = []
+            new_bases = set()
+            for pid in paper_ids:
+                paper_base = base_id(pid)
+                if paper_base in new_bases or self.is_read(
+                    pid, abstract_hashes.get(pid)
+                ):
+                    continue
+                new_bases.add(paper_base)
+                new_ids.append(pid)
+            if not new_ids:
+                return []
+
+            entry = {
+                "date": datetime.now().isoformat(),
+                "paper_ids": new_ids,
+                "count": len(new_ids),
+            }
+            hashes = {
+                base_id(pid): abstract_hashes[pid]
+                for pid in new_ids
+                if pid in abstract_hashes
+            }
+            if hashes:
+                entry["abstract_hashes"] = hashes
+            line = json.dumps(entry) + "\n"
+
+            os.makedirs(os.path.dirname(self.log_file) or ".", exist_ok=True)
+            with open(self.log_file, "ab") as f:
+                # Terminate a torn line left by an interrupted write
+                if f.tell() > self.offset:
+                    f.write(b"\n")
+                f.write(line.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                self.offset = f.tell()
+                self.inode = os.fstat(f.fileno()).st_ino
+
+            self._apply(entry)
+            return new_ids
+
+    def _write_atomic(self, entries: List[Dict[str, Any]]) -> int:
+        """Write entries to a temporary file and atomically replace the log."""
+        os.makedirs(os.path.dirname(self.log_file) or ".", exist_ok=True)
+        tmp_file = self.log_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        os.replace(tmp_file, self.log_file)
+        return size
+
+    def compact(self):
+        """Rewrite the log without duplicate papers, empty or corrupt entries."""
+        with self._locked():
+            self.refresh()
+            # A paper is kept again only when its abstract hash changed
+            hashes: Dict[str, Optional[str]] = {}
+            entries = []
+            for entry in self.entries:
+                entry_hashes = entry.get("abstract_hashes", {})
+                ids = []
+                for pid in entry.get("paper_ids", []):
+                    paper_base = base_id(pid)
+                    new_hash = entry_hashes.get(paper_base)
+                    if paper_base in hashes and (
+                        new_hash is None or new_hash == hashes[paper_base]
+                    ):
+                        continue
+                    hashes[paper_base] = new_hash or hashes.get(paper_base)
+                    ids.append(pid)
+                if ids:
+                    compacted = {**entry, "paper_ids": ids, "count": len(ids)}
+                    kept_hashes = {
+                        base_id(pid): entry_hashes[base_id(pid)]
+                        for pid in ids
+                        if base_id(pid) in entry_hashes
+                    }
+                    compacted.pop("abstract_hashes", None)
+                    if kept_hashes:
+                        compacted["abstract_hashes"] = kept_hashes
+                    entries.append(compacted)
+
+            before = len(self.entries)
+            self.offset = self._write_atomic(entries)
+            self.inode = os.stat(self.log_file).st_ino
+            self.entries = []
+            self.paper_ids = set()
+            self.abstract_hashes = {}
+            for entry in entries:
+                self._apply(entry)
+            seen = self.paper_ids
+
+        logger.info(
+            f"Compacted read history from {before} to {len(entries)} entries "
+            f"({len(seen)} papers)"
+        )
+
+
+def main():
+    """Command line maintenance for the read history."""
+    parser = argparse.ArgumentParser(description="Maintain the read papers history")
+    parser.add_argument("command", choices=["compact", "stats"])
+    parser.add_argument(
+        "--file", default="data/read_papers.jsonl", help="Path to the history log"
+    )
+    args = parser.parse_args()
+
+    history = ReadHistory.open(args.file)
+    if args.command == "compact":
+        history.compact()
+    else:
+        print(f"{len(history)} papers in {len(history.entries)} history entries")
+
+
+if __name__ == "__main__":
+    main()
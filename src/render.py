@@ -0,0 +1,620 @@
+"""
+Digest renderers.
+
+Templates are compiled once at import. Each format is rendered exactly once,
+straight into a buffered temporary file that atomically replaces the target,
+and the "latest" files are hardlinks (or copies) of the dated files instead of
+second renders.
+
+render_digests() renders a batch of digests (e.g. one per profile) in every
+format on a thread pool. The display fragments of a paper (authors, truncated
+abstract, dates) are computed once per run and shared by every format and
+profile the paper appears in.
+"""
+
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from string import Template
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, TextIO
+
+import metrics
+from utils import format_authors
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Write buffer of the output files
+BUFFER_SIZE = 1 << 16
+
+# Characters of the abstract shown in a digest
+ABSTRACT_CHARS = 300
+
+MARKDOWN_HEADER = Template(
+    "# arXiv Paper Digest - $date\n"
+    "\n"
+    "*Generated on $generated*\n"
+    "\n"
+    "Found $count relevant papers.\n"
+    "\n"
+    "---\n"
+)
+
+MARKDOWN_PAPER = Template(
+    "\n"
+    "## $rank. [$title]($url)\n"
+    "\n"
+    "**Authors:** $authors\n"
+    "\n"
+    "**Published:** $published\n"
+    "\n"
+    "**Categories:** $categories\n"
+    "\n"
+    "**Relevance Score:** $score\n"
+    "$keyword_matches\n"
+    "$topic"
+    "**Abstract:** $abstract\n"
+    "\n"
+    "[PDF]($pdf_url) | [arXiv]($url)\n"
+    "\n"
+    "---\n"
+)
+
+HTML_HEADER = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>arXiv Paper Digest - $date</title>
+    <style>
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
+            max-width: 900px;
+            margin: 0 auto;
+            padding: 20px;
+            line-height: 1.6;
+            color: #333;
+            background-color: #f5f5f5;
+        }
+        .container {
+            background-color: white;
+            padding: 30px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+        h1 {
+            color: #2c3e50;
+            border-bottom: 3px solid #3498db;
+            padding-bottom: 10px;
+        }
+        .meta {
+            color: #7f8c8d;
+            font-size: 0.9em;
+            margin-bottom: 30px;
+        }
+        .paper {
+            margin-bottom: 30px;
+            padding: 20px;
+            background-color: #fafafa;
+            border-left: 4px solid #3498db;
+            border-radius: 4px;
+        }
+        .paper h2 {
+            color: #2c3e50;
+            margin-top: 0;
+            font-size: 1.3em;
+        }
+        .paper h2 a {
+            color: #2c3e50;
+            text-decoration: none;
+        }
+        .paper h2 a:hover {
+            color: #3498db;
+        }
+        .paper-meta {
+            color: #7f8c8d;
+            font-size: 0.9em;
+            margin: 10px 0;
+        }
+        .paper-meta strong {
+            color: #555;
+        }
+        .abstract {
+            margin: 15px 0;
+            color: #555;
+        }
+        .links {
+            margin-top: 15px;
+        }
+        .links a {
+            display: inline-block;
+            padding: 6px 12px;
+            margin-right: 10px;
+            background-color: #3498db;
+            color: white;
+            text-decoration: none;
+            border-radius: 4px;
+            font-size: 0.9em;
+        }
+        .links a:hover {
+            background-color: #2980b9;
+        }
+        .score {
+            display: inline-block;
+            padding: 4px 8px;
+            background-color: #2ecc71;
+            color: white;
+            border-radius: 3px;
+            font-size: 0.85em;
+            font-weight: bold;
+        }
+        .topic-tag {
+            display: inline-block;
+            padding: 4px 8px;
+            background-color: #9b59b6;
+            color: white;
+            border-radius: 3px;
+            font-size: 0.85em;
+            margin-left: 10px;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>arXiv Paper Digest - $date</h1>
+        <p class="meta">Generated on $generated</p>
+        <p class="meta">Found $count relevant papers.</p>
+        <hr>
+""")
+
+HTML_PAPER = Template("""
+        <div class="paper">
+            <h2>$rank. <a href="$url" target="_blank">$title</a></h2>
+
+            <div class="paper-meta">
+                <strong>Authors:</strong> $authors
+            </div>
+
+            <div class="paper-meta">
+                <strong>Published:</strong> $published |
+                <strong>Categories:</strong> $categories
+            </div>
+
+            <div class="paper-meta">
+                <span class="score">Relevance: $score</span>
+                $topic
+$keyword_matches
+            </div>
+
+            <div class="abstract">
+                <strong>Abstract:</strong> $abstract
+            </div>
+
+            <div class="links">
+                <a href="$pdf_url" target="_blank">PDF</a>
+                <a href="$url" target="_blank">arXiv Page</a>
+            </div>
+        </div>
+""")
+
+HTML_FOOTER = """
+    </div>
+</body>
+</html>
+"""
+
+TEXT_HEADER = Template(
+    "arXiv Paper Digest - $date\n"
+    "Generated on $generated\n"
+    "\n"
+    "Found $count relevant papers.\n"
+)
+
+TEXT_PAPER = Template(
+    "\n"
+    "$rank. $title\n"
+    "   Authors: $authors\n"
+    "   Published: $published | Categories: $categories\n"
+    "   Relevance: $score$keyword_matches\n"
+    "$topic"
+    "   Abstract: $abstract\n"
+    "   PDF: $pdf_url\n"
+    "   arXiv: $url\n"
+)
+
+# Paper ID -> display fragment
+Fragments = Dict[str, Dict[str, str]]
+
+
+def paper_fragment(paper: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Compute the display fields of a paper that do not depend on its ranking.
+
+    Args:
+        paper: Paper dictionary
+
+    Returns:
+        Dictionary of formatted fields
+    """
+    abstract = paper["abstract"][:ABSTRACT_CHARS]
+    if len(paper["abstract"]) > ABSTRACT_CHARS:
+        abstract += "..."
+    return {
+        "title": paper["title"],
+        "url": paper["url"],
+        "pdf_url": paper["pdf_url"],
+        "authors": format_authors(paper["authors"], max_authors=5),
+        "published": datetime.fromisoformat(paper["published"]).strftime("%Y-%m-%d"),
+        "categories": ", ".join(paper["categories"][:3]),
+        "abstract": abstract,
+    }
+
+
+def build_fragments(paper_lists: List[List[Dict[str, Any]]]) -> Fragments:
+    """
+    Compute the fragment of every distinct paper of several digests.
+
+    Args:
+        paper_lists: Ranked papers of each digest
+
+    Returns:
+        Dictionary mapping paper ID to its fragment
+    """
+    fragments = {}
+    for papers in paper_lists:
+        for paper in papers:
+            if paper["id"] not in fragments:
+                fragments[paper["id"]] = paper_fragment(paper)
+    metrics.increment("render_fragments_total", len(fragments))
+    return fragments
+
+
+def paper_fields(
+    paper: Dict[str, Any], fragments: Optional[Fragments] = None
+) -> Dict[str, str]:
+    """
+    Compute the display fields of a ranked paper shared by all formats.
+
+    Args:
+        paper: Ranked paper dictionary
+        fragments: Precomputed fragments (computed on the fly if None or
+            missing the paper)
+
+    Returns:
+        Dictionary of formatted fields
+    """
+    fragment = fragments.get(paper["id"]) if fragments else None
+    return {
+        **(fragment or paper_fragment(paper)),
+        "score": f"{paper['similarity_score']:.3f}",
+    }
+
+
+def render_markdown(
+    papers: List[Dict[str, Any]],
+    out: TextIO,
+    generated: Optional[datetime] = None,
+    fragments: Optional[Fragments] = None,
+):
+    """
+    Write a Markdown digest.
+
+    Args:
+        papers: Ranked papers
+        out: Text stream to write to
+        generated: Generation time shown in the digest (defaults to now)
+        fragments: Precomputed paper fragments (see build_fragments)
+    """
+    generated = generated or datetime.now()
+    out.write(
+        MARKDOWN_HEADER.substitute(
+            date=generated.strftime("%Y-%m-%d"),
+            generated=generated.strftime("%Y-%m-%d %H:%M:%S"),
+            count=len(papers),
+        )
+    )
+    for rank, paper in enumerate(papers, 1):
+        keyword_matches = paper.get("keyword_matches", 0)
+        out.write(
+            MARKDOWN_PAPER.substitute(
+                paper_fields(paper, fragments),
+                rank=rank,
+                keyword_matches=(
+                    f" (Keyword matches: {keyword_matches})\n"
+                    if keyword_matches > 0
+                    else ""
+                ),
+                topic=(
+                    f"**Topic:** {paper['matched_topic']}\n\n"
+                    if "matched_topic" in paper
+                    else ""
+                ),
+            )
+        )
+
+
+def render_html(
+    papers: List[Dict[str, Any]],
+    out: TextIO,
+    generated: Optional[datetime] = None,
+    fragments: Optional[Fragments] = None,
+):
+    """
+    Write an HTML digest.
+
+    Args:
+        papers: Ranked papers
+        out: Text stream to write to
+        generated: Generation time shown in the digest (defaults to now)
+        fragments: Precomputed paper fragments (see build_fragments)
+    """
+    generated = generated or datetime.now()
+    out.write(
+        HTML_HEADER.substitute(
+            date=generated.strftime("%Y-%m-%d"),
+            generated=generated.strftime("%Y-%m-%d %H:%M:%S"),
+            count=len(papers),
+        )
+    )
+    for rank, paper in enumerate(papers, 1):
+        keyword_matches = paper.get("keyword_matches", 0)
+        matched_topic = paper.get("matched_topic", "")
+        out.write(
+            HTML_PAPER.substitute(
+                paper_fields(paper, fragments),
+                rank=rank,
+                keyword_matches=(
+                    f" <em>(Keyword matches: {keyword_matches})</em>"
+                    if keyword_matches > 0
+                    else ""
+                ),
+                topic=(
+                    f'<span class="topic-tag">{matched_topic}</span>'
+                    if matched_topic
+                    else ""
+                ),
+            )
+        )
+    out.write(HTML_FOOTER)
+
+
+def render_text(
+    papers: List[Dict[str, Any]],
+    out: TextIO,
+    generated: Optional[datetime] = None,
+    fragments: Optional[Fragments] = None,
+):
+    """
+    Write a plain text digest (e.g. for email bodies).
+
+    Args:
+        papers: Ranked papers
+        out: Text stream to write to
+        generated: Generation time shown in the digest (defaults to now)
+        fragments: Precomputed paper fragments (see build_fragments)
+    """
+    generated = generated or datetime.now()
+    out.write(
+        TEXT_HEADER.substitute(
+            date=generated.strftime("%Y-%m-%d"),
+            generated=generated.strftime("%Y-%m-%d %H:%M:%S"),
+            count=len(papers),
+        )
+    )
+    for rank, paper in enumerate(papers, 1):
+        keyword_matches = paper.get("keyword_matches", 0)
+        out.write(
+            TEXT_PAPER.substitute(
+                paper_fields(paper, fragments),
+                rank=rank,
+                keyword_matches=(
+                    f" (Keyword matches: {keyword_matches})"
+                    if keyword_matches > 0
+                    else ""
+                ),
+                topic=(
+                    f"   Topic: {paper['matched_topic']}\n"
+                    if "matched_topic" in paper
+                    else ""
+                ),
+            )
+        )
+
+
+def render_json(
+    papers: List[Dict[str, Any]],
+    out: TextIO,
+    generated: Optional[datetime] = None,
+    fragments: Optional[Fragments] = None,
+):
+    """
+    Write a JSON digest for other tools.
+
+    Papers keep their full author list, categories and abstract; the
+    publication date is taken from the fragment.
+
+    Args:
+        papers: Ranked papers
+        out: Text stream to write to
+        generated: Generation time shown in the digest (defaults to now)
+        fragments: Precomputed paper fragments (see build_fragments)
+    """
+    generated = generated or datetime.now()
+    entries = []
+    for rank, paper in enumerate(papers, 1):
+        fragment = fragments.get(paper["id"]) if fragments else None
+        entries.append(
+            {
+                "rank": rank,
+                "id": paper["id"],
+                "title": paper["title"],
+                "url": paper["url"],
+                "pdf_url": paper["pdf_url"],
+                "authors": paper["authors"],
+                "published": (fragment or paper_fragment(paper))["published"],
+                "categories": paper["categories"],
+                "score": paper["similarity_score"],
+                "keyword_matches": paper.get("keyword_matches", 0),
+                "matched_topic": paper.get("matched_topic"),
+                "abstract": paper["abstract"],
+            }
+        )
+    json.dump(
+        {
+            "date": generated.strftime("%Y-%m-%d"),
+            "generated": generated.isoformat(timespec="seconds"),
+            "count": len(papers),
+            "papers": entries,
+        },
+        out,
+        indent=2,
+    )
+    out.write("\n")
+
+
+# File extension -> renderer
+RENDERERS: Dict[str, Callable[..., None]] = {
+    "md": render_markdown,
+    "html": render_html,
+    "txt": render_text,
+    "json": render_json,
+}
+
+# File extension -> display name
+FORMAT_NAMES = {"md": "Markdown", "html": "HTML", "txt": "Text", "json": "JSON"}
+
+
+@contextmanager
+def atomic_writer(path: str) -> Iterator[TextIO]:
+    """
+    Open a buffered text stream that replaces `path` when closed.
+
+    Readers see either the old or the complete new file, never a partial
+    one; on error the target is left untouched.
+
+    Args:
+        path: File to write
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def link_or_copy(source: str, target: str):
+    """
+    Atomically make `target` a hardlink of `source`, or a copy if the
+    filesystem does not support hardlinks.
+
+    Args:
+        source: Existing file
+        target: File to create or replace
+    """
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+class DigestJob(NamedTuple):
+    """A digest to render: its papers and where to write them."""
+
+    papers: List[Dict[str, Any]]
+    output_dir: str
+    name: str
+    latest_name: Optional[str] = None
+
+
+def check_formats(formats: List[str]):
+    """Raise ValueError for formats without a renderer."""
+    unknown = [fmt for fmt in formats if fmt not in RENDERERS]
+    if unknown:
+        raise ValueError(
+            f"Unknown digest formats: {unknown} (expected some of {list(RENDERERS)})"
+        )
+
+
+def write_digest_file(
+    job: DigestJob,
+    fmt: str,
+    generated: datetime,
+    fragments: Optional[Fragments] = None,
+) -> str:
+    """
+    Render one format of a digest and publish its "latest" file.
+
+    Args:
+        job: Digest to render
+        fmt: File extension of the format (see RENDERERS)
+        generated: Generation time shown in the digest
+        fragments: Precomputed paper fragments (see build_fragments)
+
+    Returns:
+        Path of the dated file
+    """
+    path = os.path.join(job.output_dir, f"{job.name}.{fmt}")
+    with metrics.timer("render_seconds", format=fmt), atomic_writer(path) as f:
+        RENDERERS[fmt](job.papers, f, generated, fragments)
+    if job.latest_name:
+        link_or_copy(path, os.path.join(job.output_dir, f"{job.latest_name}.{fmt}"))
+    logger.info(f"Saved {fmt} digest to {path}")
+    return path
+
+
+def render_digests(
+    jobs: List[DigestJob],
+    formats: List[str] = ("md", "html"),
+    workers: int = 4,
+    generated: Optional[datetime] = None,
+) -> List[Dict[str, str]]:
+    """
+    Render a batch of digests in several formats concurrently.
+
+    Paper fragments are computed once for the whole batch, then every
+    (digest, format) pair is rendered as a task on a thread pool, so file
+    writes and linking overlap with rendering.
+
+    Args:
+        jobs: Digests to render
+        formats: File extensions of the formats to render (see RENDERERS)
+        workers: Worker threads (1 renders serially)
+        generated: Generation time shown in the digests (defaults to now)
+
+    Returns:
+        For each job, a dictionary mapping each format to its dated file
+    """
+    check_formats(formats)
+    generated = generated or datetime.now()
+    fragments = build_fragments([job.papers for job in jobs])
+    tasks = [(i, fmt) for i in range(len(jobs)) for fmt in formats]
+
+    def render(task):
+        i, fmt = task
+        return write_digest_file(jobs[i], fmt, generated, fragments)
+
+    if workers <= 1 or len(tasks) <= 1:
+        paths = [render(task) for task in tasks]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            paths = list(executor.map(render, tasks))
+
+    results = [{} for _ in jobs]
+    for (i, fmt), path in zip(tasks, paths):
+        results[i][fmt] = path
+    return results
@@ -0,0 +1,186 @@
+"""
+Vectorized scoring helpers for ranking.
+
+A candidate set is converted once into columns (lowercased titles and int64
+timestamps), keyword matches are counted with a single compiled regex and
+recency factors are computed as one NumPy expression.
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+def to_timestamp(value: Union[str, datetime]) -> int:
+    """
+    Convert an ISO date string or datetime to microseconds since the epoch.
+
+    Naive datetimes are taken as UTC, so differences between them match
+    plain datetime subtraction.
+
+    Args:
+        value: ISO 8601 string or datetime
+
+    Returns:
+        Timestamp in microseconds
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return round(value.timestamp() * 1_000_000)
+
+
+class PaperColumns:
+    """Columnar view of the fields used for scoring a list of papers."""
+
+    def __init__(self, papers: List[Dict[str, Any]]):
+        """
+        Extract the scoring columns.
+
+        Args:
+            papers: List of paper dictionaries
+        """
+        self.titles = [paper["title"].lower() for paper in papers]
+        self.timestamps = np.fromiter(
+            (to_timestamp(paper["published"]) for paper in papers),
+            dtype=np.int64,
+            count=len(papers),
+        )
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+
+class KeywordMatcher:
+    """Count how many keywords occur in a text with one regex scan."""
+
+    def __init__(self, keywords: Sequence[str]):
+        """
+        Compile the matcher.
+
+        Keywords are matched case-insensitively as substrings; a keyword
+        listed several times counts several times.
+
+        Args:
+            keywords: List of keywords
+        """
+        self.keywords = tuple(keywords)
+
+        weights: Dict[str, int] = {}
+        for keyword in self.keywords:
+            keyword = keyword.lower()
+            weights[keyword] = weights.get(keyword, 0) + 1
+        # The empty string is contained in every text
+        self.base_count = weights.pop("", 0)
+
+        # The lookahead reports, at every position, the longest keyword
+        # starting there. Every other keyword starting at that position is a
+        # prefix of it, so a match implies all keywords it contains.
+        unique = sorted(weights, key=len, reverse=True)
+        self.pattern = None
+        if unique:
+            alternatives = "|".join(re.escape(keyword) for keyword in unique)
+            self.pattern = re.compile(f"(?=({alternatives}))")
+        self.contained = {
+            keyword: frozenset(other for other in unique if other in keyword)
+            for keyword in unique
+        }
+        self.weights = weights
+
+    def count(self, text: str) -> int:
+        """
+        Count the keywords contained in a lowercased text.
+
+        Args:
+            text: Lowercased text
+
+        Returns:
+            Number of matching keywords
+        """
+        if self.pattern is None:
+            return self.base_count
+
+        found = set(self.pattern.findall(text))
+        if not found:
+            return self.base_count
+        found = frozenset().union(*(self.contained[keyword] for keyword in found))
+        return self.base_count + sum(self.weights[keyword] for keyword in found)
+
+    def count_many(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Count keyword matches for many lowercased texts.
+
+        Args:
+            texts: Lowercased texts
+
+        Returns:
+            Array with the number of matching keywords per text
+        """
+        return np.fromiter(
+            (self.count(text) for text in texts), dtype=np.int64, count=len(texts)
+        )
+
+
+def recency_factors(
+    timestamps: np.ndarray, window: Optional[Tuple[datetime, datetime]] = None
+) -> np.ndarray:
+    """
+    Scale timestamps to [0, 1], from oldest to newest.
+
+    Args:
+        timestamps: Non-empty array of timestamps from to_timestamp()
+        window: Fixed (oldest, newest) bounds to scale against instead of the
+            given timestamps; values outside are clipped
+
+    Returns:
+        Recency factor per timestamp
+    """
+    if window is not None:
+        start, end = to_timestamp(window[0]), to_timestamp(window[1])
+    else:
+        start, end = int(timestamps.min()), int(timestamps.max())
+
+    # Avoid division by zero
+    date_range = (end - start) or 1_000_000
+    return np.clip((timestamps - start) / date_range, 0.0, 1.0)
+
+
+def select_top_n(
+    scores: np.ndarray,
+    top_n: int,
+    min_threshold: float = -np.inf,
+    mask: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Select the indices of the highest scores without sorting everything.
+
+    Ties are broken by index, matching a stable descending sort.
+
+    Args:
+        scores: Score per candidate
+        top_n: Maximum number of indices to return
+        min_threshold: Minimum score to be selected
+        mask: Optional boolean array of selectable candidates
+
+    Returns:
+        Indices of the selected candidates, best first
+    """
+    selectable = scores >= min_threshold
+    if mask is not None:
+        selectable &= mask
+    candidates = np.flatnonzero(selectable)
+    if top_n <= 0 or not len(candidates):
+        return candidates[:0]
+
+    if top_n < len(candidates):
+        # Keep everything scoring at least the n-th best score, so ties at the
+        # boundary are resolved by index below rather than arbitrarily
+        candidate_scores = scores[candidates]
+        kth = -np.partition(-candidate_scores, top_n - 1)[top_n - 1]
+        candidates = candidates[candidate_scores >= kth]
+
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:top_n]]
@@ -0,0 +1,181 @@
+"""
+Tests for the Atom parser and paging of the arXiv API client.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from arxiv_api import (  # noqa: E402
+    ArxivApiError,
+    ArxivClient,
+    IncompletePageError,
+    parse_feed,
+)
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"
+      xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/"
+      xmlns:arxiv="http://arxiv.org/schemas/atom">
+  <title type="html">ArXiv Query: search_query=cat:cs.LG</title>
+  <opensearch:totalResults>{total}</opensearch:totalResults>
+  <opensearch:startIndex>0</opensearch:startIndex>
+  {entries}
+</feed>
+"""
+
+ENTRY = """<entry>
+    <id>http://arxiv.org/abs/2401.01234v3</id>
+    <updated>2024-01-05T10:00:00Z</updated>
+    <published>2024-01-02T18:59:59Z</published>
+    <title>Sparse Attention
+      for Long Documents</title>
+    <summary>  We propose a method.
+Results improve.
+</summary>
+    <author><name>Ada Lovelace</name></author>
+    <author><name>Alan Turing</name></author>
+    <link href="http://arxiv.org/abs/2401.01234v3" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/2401.01234v3" rel="related"/>
+    <arxiv:primary_category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.CL" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="stat.ML" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>"""
+
+MINIMAL_ENTRY = """<entry>
+    <id>http://arxiv.org/abs/hep-th/9901001v2</id>
+    <published>1999-01-04T00:00:00Z</published>
+    <title>Old Style</title>
+  </entry>"""
+
+ERROR_ENTRY = """<entry>
+    <id>http://arxiv.org/api/errors#incorrect_id_format_for_1234</id>
+    <title>Error</title>
+    <summary>incorrect id format for 1234</summary>
+  </entry>"""
+
+
+def feed(*entries, total=None):
+    total = len(entries) if total is None else total
+    return FEED.format(total=total, entries="".join(entries)).encode("utf-8")
+
+
+def test_parse_entry_fields():
+    papers, total = parse_feed(feed(ENTRY, total=250))
+
+    assert total == 250
+    assert papers == [
+        {
+            "id": "2401.01234v3",
+            "base_id": "2401.01234",
+            "version": 3,
+            "title": "Sparse Attention for Long Documents",
+            "authors": ["Ada Lovelace", "Alan Turing"],
+            "abstract": "We propose a method. Results improve.",
+            "url": "http://arxiv.org/abs/2401.01234v3",
+            "pdf_url": "http://arxiv.org/pdf/2401.01234v3",
+            "published": "2024-01-02T18:59:59+00:00",
+            "categories": ["cs.LG", "cs.CL", "stat.ML"],
+            "primary_category": "cs.LG",
+        }
+    ]
+
+
+def test_parse_entry_with_missing_fields():
+    (paper,), _ = parse_feed(feed(MINIMAL_ENTRY))
+
+    assert paper["id"] == "hep-th/9901001v2"
+    assert (paper["base_id"], paper["version"]) == ("hep-th/9901001", 2)
+    assert paper["authors"] == []
+    assert paper["abstract"] == ""
+    assert paper["pdf_url"] is None
+    assert paper["categories"] == []
+    assert paper["primary_category"] is None
+
+
+def test_parse_entry_without_version():
+    entry = ENTRY.replace("2401.01234v3", "2401.01234")
+
+    (paper,), _ = parse_feed(feed(entry))
+
+    assert (paper["id"], paper["base_id"], paper["version"]) == (
+        "2401.01234",
+        "2401.01234",
+        None,
+    )
+
+
+def test_parse_feed_without_results():
+    assert parse_feed(feed()) == ([], 0)
+
+
+def test_parse_feed_raises_api_errors():
+    with pytest.raises(ArxivApiError, match="incorrect id format"):
+        parse_feed(feed(ERROR_ENTRY))
+
+
+class FakeHttp:
+    """Serves prepared feed bodies in order, like HttpClient.get."""
+
+    def __init__(self, bodies):
+        self.bodies = list(bodies)
+        self.requests = []
+
+    def get(self, url, params=None, parse=None):
+        self.requests.append(params["start"])
+        return parse(self.bodies.pop(0))
+
+
+def entries(start, count):
+    ids = range(start, start + count)
+    return [ENTRY.replace("2401.01234", f"2401.{i:05d}") for i in ids]
+
+
+def test_search_ends_at_short_final_page():
+    http = FakeHttp([feed(*entries(0, 2), total=3), feed(*entries(2, 1), total=3)])
+    client = ArxivClient(http, page_size=2)
+
+    papers = list(client.search("cat:cs.LG", max_results=10))
+
+    assert [p["base_id"] for p in papers] == ["2401.00000", "2401.00001", "2401.00002"]
+    assert http.requests == [0, 2]
+
+
+def test_search_retries_short_page_mid_listing():
+    http = FakeHttp(
+        [
+            feed(*entries(0, 2), total=4),
+            feed(*entries(2, 1), total=4),
+            feed(total=4),
+            feed(*entries(2, 2), total=4),
+        ]
+    )
+    client = ArxivClient(http, page_size=2, max_retries=2)
+
+    papers = list(client.search("cat:cs.LG", max_results=10))
+
+    assert len(papers) == 4
+    assert http.requests == [0, 2, 2, 2]
+
+
+def test_search_raises_when_page_stays_short():
+    http = FakeHttp([feed(*entries(0, 2), total=4)] + [feed(total=4)] * 2)
+    client = ArxivClient(http, page_size=2, max_retries=1)
+
+    with pytest.raises(IncompletePageError):
+        list(client.search("cat:cs.LG", max_results=10))
+    assert http.requests == [0, 2, 2]
+
+
+def test_search_stops_at_max_results():
+    http = FakeHttp([feed(*entries(0, 2), total=100), feed(*entries(2, 1), total=100)])
+    client = ArxivClient(http, page_size=2)
+
+    papers = list(client.search("cat:cs.LG", max_results=3))
+
+    assert len(papers) == 3
+    assert http.requests == [0, 2]
@@ -0,0 +1,113 @@
+"""
+Tests for the memory-mapped embedding cache.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from embedding_cache import EmbeddingCache  # noqa: E402
+from quantization import normalize  # noqa: E402
+
+
+def vectors(count, dim=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+
+def cache(tmp_path, **kwargs):
+    return EmbeddingCache(str(tmp_path), model_name="test-model", **kwargs)
+
+
+def test_put_get_and_reload(tmp_path):
+    embeddings = vectors(3)
+    keys = [EmbeddingCache.make_key(f"2401.0000{i}", "text") for i in range(3)]
+    store = cache(tmp_path)
+    store.put_many(keys, embeddings)
+    store.save()
+
+    reloaded = cache(tmp_path)
+    found = reloaded.get_many(keys + ["missing"])
+
+    assert np.allclose(np.stack(found[:3]), normalize(embeddings), atol=1e-6)
+    assert found[3] is None
+    assert reloaded.stats() == {"hits": 3, "misses": 1, "evictions": 0, "entries": 3}
+
+
+def test_make_key_depends_on_text():
+    assert EmbeddingCache.make_key("2401.00001", "a") == EmbeddingCache.make_key(
+        "2401.00001", "a"
+    )
+    assert EmbeddingCache.make_key("2401.00001", "a") != EmbeddingCache.make_key(
+        "2401.00001", "b"
+    )
+
+
+def test_evicts_least_recently_used(tmp_path):
+    store = cache(tmp_path, max_entries=3)
+    store.put_many(["a", "b", "c"], vectors(3))
+    store.entries["a"][1] = store.entries["b"][1] = 0.0
+    store.get_many(["a"])
+
+    store.put_many(["d"], vectors(1, seed=1))
+
+    assert sorted(store.entries) == ["a", "c", "d"]
+    assert store.evictions == 1
+
+
+def test_evicted_rows_are_reused_only_after_save(tmp_path):
+    store = cache(tmp_path, max_entries=2)
+    store.put_many(["a", "b"], vectors(2))
+    store.save()
+    saved_rows = {key: entry[0] for key, entry in store.entries.items()}
+    saved = store.get_many(["a", "b"])
+
+    store.entries["a"][1] = 0.0
+    store.put_many(["c"], vectors(1, seed=1))
+
+    # The index on disk still maps "a" to its row, which must stay intact
+    assert store.released_rows == [saved_rows["a"]]
+    assert store.entries["c"][0] not in saved_rows.values()
+    on_disk = cache(tmp_path, read_only=True)
+    assert np.allclose(on_disk.get_many(["a"])[0], saved[0])
+
+    store.save()
+    assert store.released_rows == []
+    assert saved_rows["a"] in store.free_rows
+    store.entries["b"][1] = 0.0
+    store.put_many(["d"], vectors(1, seed=2))
+    assert store.entries["d"][0] != store.entries["c"][0]
+    assert len(store.entries) == 2
+
+
+def test_oversized_batch_keeps_newest_entries(tmp_path):
+    store = cache(tmp_path, max_entries=2)
+
+    store.put_many(["a", "b", "c"], vectors(3))
+
+    assert sorted(store.entries) == ["b", "c"]
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_compact_dtypes_round_trip(tmp_path, dtype):
+    embeddings = vectors(4)
+    store = cache(tmp_path, dtype=dtype)
+    store.put_many(list("abcd"), embeddings)
+    store.save()
+
+    found = cache(tmp_path, dtype=dtype).get_many(list("abcd"))
+
+    assert np.abs(np.stack(found) - normalize(embeddings)).max() < 1e-2
+
+
+def test_dtype_change_clears_cache(tmp_path):
+    store = cache(tmp_path)
+    store.put_many(["a"], vectors(1))
+    store.save()
+
+    assert cache(tmp_path, dtype="int8", read_only=True).get_many(["a"]) == [None]
+    assert cache(tmp_path, dtype="int8").entries == {}
+    assert cache(tmp_path).entries == {}
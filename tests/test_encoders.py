@@ -0,0 +1,43 @@
+"""
+Tests for the encoder backend interface.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from encoders import Encoder, create_encoder, embedding_options  # noqa: E402
+
+
+def test_incomplete_backend_fails_on_creation():
+    class EncodeOnly(Encoder):
+        def encode(self, sentences, **kwargs):
+            return []
+
+    with pytest.raises(TypeError):
+        EncodeOnly()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown encoder backend"):
+        create_encoder("tensorflow")
+
+
+def test_embedding_options_ignore_threads_and_paths():
+    options = embedding_options(
+        backend="sentence-transformers",
+        model_name="all-MiniLM-L6-v2",
+        onnx_dir="data/models/x",
+        onnx_quantized=True,
+        threads=4,
+    )
+
+    assert options == {
+        "backend": "sentence-transformers",
+        "model_name": "all-MiniLM-L6-v2",
+        "onnx_quantized": False,
+        "max_seq_length": None,
+    }
@@ -0,0 +1,163 @@
+"""
+Tests for incremental fetching against the local arXiv API stand-in.
+"""
+
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from corpus import synthetic_papers  # noqa: E402
+from fetch_papers import LISTING_MAX_RESULTS, ArxivFetcher  # noqa: E402
+from mock_arxiv import MockArxivServer, atom_feed  # noqa: E402
+
+QUERY = "cat:cs.LG"
+TOPICS = [{"name": "Machine Learning", "query": QUERY, "categories": ["cs.LG"]}]
+
+
+class EmptyPageServer(MockArxivServer):
+    """Mock API that answers the first request for one page with no results."""
+
+    def __init__(self, papers, empty_start: int):
+        super().__init__(papers)
+        self.empty_start = empty_start
+        self.empty_served = False
+
+    def handle(self, request):
+        if f"start={self.empty_start}&" in request.path and not self.empty_served:
+            self.empty_served = True
+            body = atom_feed([], len(self.papers), self.empty_start)
+            request.send_response(200)
+            request.send_header("Content-Length", str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+            return
+        super().handle(request)
+
+
+@pytest.fixture
+def papers():
+    return synthetic_papers(250, TOPICS, days=3)
+
+
+@pytest.fixture
+def server(papers):
+    server = EmptyPageServer(papers, empty_start=100).start()
+    yield server
+    server.stop()
+
+
+def make_fetcher(server, tmp_path, max_retries, max_results=1000):
+    return ArxivFetcher(
+        days_back=7,
+        max_results=max_results,
+        requests_per_second=1000,
+        incremental=True,
+        state_file=str(tmp_path / "fetch_state.json"),
+        api_url=server.url,
+        http_cache_dir=None,
+        max_retries=max_retries,
+    )
+
+
+def test_empty_page_is_retried(server, papers, tmp_path):
+    fetcher = make_fetcher(server, tmp_path, max_retries=1)
+
+    fetched = fetcher.fetch_papers(QUERY)
+
+    assert server.empty_served
+    assert [p["id"] for p in fetched] == [p["id"] for p in papers]
+    assert fetcher.marks.get(QUERY) is not None
+
+
+def test_incomplete_fetch_keeps_high_water_mark(server, papers, tmp_path):
+    fetcher = make_fetcher(server, tmp_path, max_retries=0)
+
+    partial = fetcher.fetch_papers(QUERY)
+
+    assert server.empty_served
+    assert len(partial) == 100
+    assert fetcher.marks.get(QUERY) is None
+
+    # The next run fetches the papers behind the empty page
+    fetched = fetcher.fetch_papers(QUERY)
+    assert [p["id"] for p in fetched] == [p["id"] for p in papers]
+
+
+def test_truncated_fetch_keeps_high_water_mark(server, papers, tmp_path):
+    fetcher = make_fetcher(server, tmp_path, max_retries=1, max_results=100)
+
+    truncated = fetcher.fetch_papers(QUERY)
+
+    assert [p["id"] for p in truncated] == [p["id"] for p in papers[:100]]
+    assert fetcher.marks.get(QUERY) is None
+
+    # A later run with a higher limit still reaches back to the cutoff
+    fetched = fetcher.fetch_papers(QUERY, max_results=1000)
+    assert len(fetched) == len(papers)
+    assert fetcher.marks.get(QUERY) is not None
+
+
+def test_consolidated_listing_is_capped(papers, tmp_path, caplog):
+    server = MockArxivServer(papers).start()
+    try:
+        fetcher = ArxivFetcher(
+            days_back=7,
+            requests_per_second=1000,
+            consolidate_queries=True,
+            listing_max_results=120,
+            api_url=server.url,
+            http_cache_dir=None,
+        )
+        default = ArxivFetcher(http_cache_dir=None)
+        assert default.listing_max_results == LISTING_MAX_RESULTS
+
+        with caplog.at_level(logging.WARNING):
+            results = fetcher.fetch_multiple_topics(TOPICS)
+    finally:
+        server.stop()
+
+    assert len(results["Machine Learning"]) == 100
+    assert server.stats()["requests"] == 2
+    assert "Reached the limit of 120 results for cat:cs.LG" in caplog.text
+
+
+def test_concurrent_fetch_matches_sequential_fetch(tmp_path):
+    topics = [
+        {"name": "Robotics", "query": "cat:cs.RO", "categories": ["cs.RO"]},
+        {"name": "Vision", "query": "cat:cs.CV", "categories": ["cs.CV"]},
+        {"name": "Learning", "query": "cat:cs.LG", "categories": ["cs.LG"]},
+    ]
+    server = MockArxivServer(
+        synthetic_papers(300, topics, days=3), error_rate=0.3
+    ).start()
+    try:
+        results = {}
+        for concurrency in (1, 3):
+            fetcher = ArxivFetcher(
+                days_back=7,
+                concurrency=concurrency,
+                requests_per_second=1000,
+                api_url=server.url,
+                http_cache_dir=None,
+                max_retries=10,
+            )
+            results[concurrency] = fetcher.fetch_multiple_topics(topics)
+            streamed = {}
+            for name, paper in fetcher.iter_multiple_topics(topics):
+                streamed.setdefault(name, []).append(paper["id"])
+            assert streamed == {
+                name: [p["id"] for p in papers]
+                for name, papers in results[concurrency].items()
+            }
+    finally:
+        server.stop()
+
+    assert server.stats()["errors"] > 0
+    assert list(results[3]) == [topic["name"] for topic in topics]
+    assert results[3] == results[1]
+    assert all(results[3].values())
@@ -0,0 +1,107 @@
+"""
+Tests for the on-disk HTTP response cache and the caching client.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from arxiv_api import parse_feed  # noqa: E402
+from corpus import synthetic_papers  # noqa: E402
+from http_cache import HttpCache, HttpClient  # noqa: E402
+from mock_arxiv import MockArxivServer  # noqa: E402
+
+TOPICS = [{"name": "Machine Learning", "query": "cat:cs.LG", "categories": ["cs.LG"]}]
+PARAMS = {"search_query": "cat:cs.LG", "start": 0, "max_results": 10}
+
+
+@pytest.fixture
+def server():
+    server = MockArxivServer(synthetic_papers(50, TOPICS)).start()
+    yield server
+    server.stop()
+
+
+def store(cache, name, size, age):
+    key = HttpCache.key("http://example.org", {"page": name})
+    cache.put(key, b"x" * size, {"ETag": f'"{name}"'})
+    stored_at = time.time() - age
+    for path in cache._paths(key):
+        os.utime(path, (stored_at, stored_at))
+    return key
+
+
+def test_fresh_response_is_served_from_cache(server, tmp_path):
+    client = HttpClient(cache=HttpCache(str(tmp_path), ttl=3600))
+
+    first = client.get(server.url, PARAMS, parse=parse_feed)
+    second = client.get(server.url, PARAMS, parse=parse_feed)
+
+    assert first == second
+    assert client.stats()["downloads"] == 1
+    assert client.stats()["hits"] == 1
+    assert server.stats()["requests"] == 1
+
+
+def test_stale_response_is_revalidated(server, tmp_path):
+    client = HttpClient(cache=HttpCache(str(tmp_path), ttl=0))
+
+    first = client.get(server.url, PARAMS, parse=parse_feed)
+    second = client.get(server.url, PARAMS, parse=parse_feed)
+
+    assert first == second
+    assert client.stats()["downloads"] == 1
+    assert client.stats()["revalidated"] == 1
+    assert server.stats()["not_modified"] == 1
+
+
+def test_unparseable_response_is_not_cached(server, tmp_path):
+    cache = HttpCache(str(tmp_path))
+    client = HttpClient(cache=cache)
+
+    def reject(body):
+        raise ValueError("not a feed")
+
+    with pytest.raises(ValueError):
+        client.get(server.url, PARAMS, parse=reject)
+
+    assert cache.get(HttpCache.key(server.url, PARAMS)) is None
+
+
+def test_prune_deletes_expired_responses(tmp_path):
+    cache = HttpCache(str(tmp_path), max_age=86400, max_bytes=None)
+    old = store(cache, "old", 10, age=2 * 86400)
+    recent = store(cache, "recent", 10, age=3600)
+
+    assert cache.prune() == 1
+    assert cache.get(old) is None
+    assert cache.get(recent) is not None
+    assert not any(os.path.exists(path) for path in cache._paths(old))
+
+
+def test_prune_trims_oldest_responses_to_max_bytes(tmp_path):
+    cache = HttpCache(str(tmp_path), max_age=None, max_bytes=2500)
+    keys = [store(cache, str(i), 1000, age=100 - i) for i in range(4)]
+
+    assert cache.prune() == 2
+    assert [cache.get(key) is not None for key in keys] == [False, False, True, True]
+
+
+def test_revalidation_keeps_response_from_pruning(server, tmp_path):
+    cache = HttpCache(str(tmp_path), ttl=0, max_age=86400, max_bytes=None)
+    client = HttpClient(cache=cache)
+    key = HttpCache.key(server.url, PARAMS)
+    client.get(server.url, PARAMS, parse=parse_feed)
+    stored_at = time.time() - 2 * 86400
+    for path in cache._paths(key):
+        os.utime(path, (stored_at, stored_at))
+
+    client.get(server.url, PARAMS, parse=parse_feed)
+
+    assert cache.prune() == 0
+    assert cache.get(key) is not None
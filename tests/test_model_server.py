@@ -0,0 +1,87 @@
+"""
+Tests for the warm model server and the ranker's choice to use it.
+"""
+
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import encoders  # noqa: E402
+import rank_papers  # noqa: E402
+from corpus import HashingEncoder  # noqa: E402
+from model_server import ModelServer, RemoteEncoder  # noqa: E402
+from rank_papers import PaperRanker  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def offline_encoder(monkeypatch):
+    monkeypatch.setattr(encoders, "create_encoder", lambda **kw: HashingEncoder())
+    monkeypatch.setattr(rank_papers, "create_encoder", lambda **kw: HashingEncoder())
+
+
+@pytest.fixture
+def start_server(tmp_path):
+    servers = []
+
+    def start(**options):
+        server = ModelServer(str(tmp_path / "model.sock"), **options)
+        threading.Thread(target=server.serve, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def test_ping_reports_embedding_options(start_server):
+    server = start_server(max_seq_length=128, threads=2)
+
+    options = RemoteEncoder(server.server_address).encoder_options()
+
+    assert options == {
+        "backend": "sentence-transformers",
+        "model_name": "all-MiniLM-L6-v2",
+        "onnx_quantized": False,
+        "max_seq_length": 128,
+    }
+
+
+def test_remote_encode_matches_local(start_server):
+    server = start_server()
+
+    texts = ["graph neural networks", "protein folding"]
+    remote = RemoteEncoder(server.server_address).encode(texts)
+
+    assert np.allclose(remote, HashingEncoder().encode(texts))
+
+
+def test_ranker_uses_matching_server(start_server):
+    server = start_server(max_seq_length=128)
+
+    ranker = PaperRanker(model_server=server.server_address, max_seq_length=128)
+
+    assert isinstance(ranker.model, RemoteEncoder)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"model_name": "all-mpnet-base-v2"},
+        {"max_seq_length": 64},
+        {"encoder_backend": "onnx", "onnx_quantized": True},
+    ],
+)
+def test_ranker_ignores_differently_configured_server(start_server, options):
+    server = start_server(max_seq_length=128)
+    options.setdefault("max_seq_length", 128)
+
+    ranker = PaperRanker(model_server=server.server_address, **options)
+
+    assert not isinstance(ranker.model, RemoteEncoder)
@@ -0,0 +1,131 @@
+"""
+Tests for the SQLite paper store.
+"""
+
+import os
+import sqlite3
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from paper_store import PaperStore  # noqa: E402
+
+
+def paper(paper_id, published, categories=("cs.RO",), title="A paper"):
+    return {
+        "id": paper_id,
+        "title": title,
+        "abstract": "An abstract.",
+        "authors": ["Ada Lovelace", "Alan Turing"],
+        "url": f"http://arxiv.org/abs/{paper_id}",
+        "pdf_url": f"http://arxiv.org/pdf/{paper_id}",
+        "published": published,
+        "categories": list(categories),
+        "primary_category": categories[0],
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PaperStore(str(tmp_path / "papers.db"))
+    yield store
+    store.close()
+
+
+def test_upsert_and_lookup(store):
+    store.upsert_topic_results(
+        {
+            "Robotics": [paper("2401.00001v1", "2026-01-05T00:00:00+00:00")],
+            "Vision": [
+                paper("2401.00001v1", "2026-01-05T00:00:00+00:00"),
+                paper("2401.00002v1", "2026-01-04T00:00:00+00:00", ("cs.CV",)),
+            ],
+        }
+    )
+
+    stored = store.get_paper("2401.00001v1")
+
+    assert store.count() == 2
+    assert stored["authors"] == ["Ada Lovelace", "Alan Turing"]
+    assert (stored["base_id"], stored["version"]) == ("2401.00001", 1)
+    assert stored["topics"] == ["Robotics", "Vision"]
+    assert store.get_paper("2401.99999v1") is None
+
+
+def test_upsert_updates_existing_paper(store):
+    store.upsert_papers([paper("2401.00001v1", "2026-01-05T00:00:00+00:00")])
+
+    store.upsert_papers(
+        [paper("2401.00001v1", "2026-01-05T00:00:00+00:00", title="Renamed")]
+    )
+
+    assert store.count() == 1
+    assert store.get_paper("2401.00001v1")["title"] == "Renamed"
+
+
+def test_lookup_by_base_id_returns_latest_version(store):
+    store.upsert_papers(
+        [
+            paper("2401.00001v2", "2026-01-06T00:00:00+00:00", title="Second"),
+            paper("2401.00001v1", "2026-01-05T00:00:00+00:00", title="First"),
+            paper("2401.00002v1", "2026-01-04T00:00:00+00:00"),
+        ]
+    )
+
+    found = store.get_papers_by_ids(["2401.00002", "2401.00001"], by_base_id=True)
+
+    assert [p["id"] for p in found] == ["2401.00002v1", "2401.00001v2"]
+    assert [p["id"] for p in store.get_papers()] == ["2401.00001v2", "2401.00002v1"]
+    assert len(store.get_papers(latest_only=False)) == 3
+
+
+def test_iter_papers_filters_and_pages(store):
+    papers = [
+        paper(f"2401.{i:05d}v1", f"2026-01-{i:02d}T00:00:00+00:00", ("cs.RO",))
+        for i in range(1, 11)
+    ]
+    papers += [paper("2401.00011v1", "2026-01-05T00:00:00+00:00", ("cs.CV",))]
+    store.upsert_papers(papers, topic="Robotics")
+
+    since = datetime(2026, 1, 5, tzinfo=timezone.utc)
+    until = datetime(2026, 1, 9, tzinfo=timezone.utc)
+    in_window = store.get_papers(since=since, until=until, batch_size=2)
+
+    # Same-date papers are ordered by ID across batch boundaries
+    assert [p["id"] for p in in_window] == [
+        "2401.00008v1",
+        "2401.00007v1",
+        "2401.00006v1",
+        "2401.00005v1",
+        "2401.00011v1",
+    ]
+    assert len(store.get_papers(categories=["cs.CV"])) == 1
+    assert len(store.get_papers(topics=["Robotics"], limit=3, batch_size=2)) == 3
+    assert store.get_papers(topics=["Vision"]) == []
+
+
+def test_migrates_databases_without_version_columns(tmp_path):
+    db_file = str(tmp_path / "papers.db")
+    conn = sqlite3.connect(db_file)
+    conn.execute(
+        "CREATE TABLE papers (id TEXT PRIMARY KEY, title TEXT NOT NULL, "
+        "abstract TEXT NOT NULL, authors TEXT NOT NULL, url TEXT, pdf_url TEXT, "
+        "published TEXT NOT NULL, primary_category TEXT, fetched_at TEXT NOT NULL)"
+    )
+    conn.execute(
+        "INSERT INTO papers VALUES ('2401.00001v3', 'Old', 'Abstract', '[]', "
+        "NULL, NULL, '2026-01-05', 'cs.RO', '2026-01-05')"
+    )
+    conn.commit()
+    conn.close()
+
+    store = PaperStore(db_file)
+    try:
+        stored = store.get_paper("2401.00001v3")
+    finally:
+        store.close()
+
+    assert (stored["base_id"], stored["version"]) == ("2401.00001", 3)
@@ -0,0 +1,88 @@
+"""
+Tests for the compact embedding storage formats.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from quantization import QuantizedMatrix, normalize  # noqa: E402
+
+# Maximum deviation of a stored unit vector component from float32
+TOLERANCE = {"float32": 1e-7, "float16": 1e-3, "int8": 1e-2}
+
+
+@pytest.fixture
+def embeddings():
+    return np.random.default_rng(0).normal(size=(50, 384)).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_from_float_round_trip(embeddings, dtype):
+    matrix = QuantizedMatrix.from_float(embeddings, dtype)
+
+    assert matrix.dtype == dtype
+    assert len(matrix) == len(embeddings)
+    assert np.abs(matrix.to_float() - normalize(embeddings)).max() < TOLERANCE[dtype]
+
+
+def test_compact_formats_are_smaller(embeddings):
+    sizes = {
+        dtype: QuantizedMatrix.from_float(embeddings, dtype).nbytes
+        for dtype in ("float32", "float16", "int8")
+    }
+
+    assert sizes["float16"] == sizes["float32"] // 2
+    assert sizes["int8"] < sizes["float32"] // 3
+
+
+def test_zero_vectors_stay_zero():
+    matrix = QuantizedMatrix.from_float(np.zeros((2, 8)), "int8")
+
+    assert not matrix.to_float().any()
+
+
+def test_rows_and_assign(embeddings):
+    matrix = QuantizedMatrix.from_float(embeddings, "int8")
+    target = QuantizedMatrix.empty(3, embeddings.shape[1], "int8")
+
+    target.assign([2, 0], matrix.rows([5, 7]))
+
+    assert np.array_equal(target.to_float([2, 0]), matrix.to_float([5, 7]))
+    assert not target.to_float(1).any()
+    with pytest.raises(ValueError):
+        target.assign([1], QuantizedMatrix.from_float(embeddings[:1], "float16"))
+
+
+def test_int8_needs_scales():
+    with pytest.raises(ValueError):
+        QuantizedMatrix(np.zeros((1, 4), dtype=np.int8))
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_cosine_matches_float32(embeddings, dtype):
+    matrix = QuantizedMatrix.from_float(embeddings, dtype)
+    queries = np.random.default_rng(1).normal(size=(3, embeddings.shape[1]))
+    expected = normalize(embeddings) @ normalize(queries).T
+
+    # A small buffer exercises block boundaries (50 rows in blocks of 16)
+    buffer = np.empty((16, embeddings.shape[1]), dtype=np.float32)
+    scores = matrix.cosine(queries, buffer=buffer)
+    single = matrix.cosine(queries[0])
+
+    assert scores.shape == (50, 3)
+    assert single.shape == (50,)
+    assert np.abs(scores - expected).max() < 10 * TOLERANCE[dtype]
+    assert np.allclose(single, scores[:, 0], atol=1e-6)
+
+
+def test_cosine_normalizes_queries(embeddings):
+    matrix = QuantizedMatrix.from_float(embeddings)
+
+    scores = matrix.cosine(embeddings[:2] * 10)
+
+    assert np.allclose(np.diag(scores[:2]), 1.0, atol=1e-5)
@@ -0,0 +1,175 @@
+"""
+Tests for the query planner that consolidates topics into category listings.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from query_planner import (  # noqa: E402
+    QueryParseError,
+    assign_papers,
+    parse_query,
+    plan_queries,
+)
+from utils import load_config  # noqa: E402
+
+CONFIG = os.path.join(os.path.dirname(__file__), "..", "config", "topics.yaml")
+
+
+@pytest.fixture
+def topics():
+    return load_config(CONFIG)["topics"]
+
+
+def paper(paper_id, categories, title="", abstract="", published="2026-01-05"):
+    return {
+        "id": paper_id,
+        "title": title,
+        "abstract": abstract,
+        "authors": ["Ada Lovelace"],
+        "categories": categories,
+        "published": published,
+    }
+
+
+def test_config_topics_parse_to_expected_trees(topics):
+    queries = {topic["name"]: parse_query(topic["query"]) for topic in topics}
+
+    robotics = queries["Robotics Manipulation"]
+    assert robotics.op == "and"
+    assert (robotics.children[0].field, robotics.children[0].text) == ("cat", "cs.RO")
+    assert [c.text for c in robotics.children[1].children] == [
+        "manipulation",
+        "grasping",
+        "dexterous",
+    ]
+
+    # Adjacent bare words are matched as a phrase
+    learning = queries["Machine Learning"].children[1]
+    assert learning.op == "or"
+    assert [c.text for c in learning.children] == [
+        "reinforcement learning",
+        "deep learning",
+        "neural networks",
+    ]
+
+
+def test_config_topics_require_their_category(topics):
+    categories = {
+        topic["name"]: parse_query(topic["query"]).required_categories()
+        for topic in topics
+    }
+
+    assert categories == {
+        "Robotics Manipulation": {"cs.RO"},
+        "Computer Vision": {"cs.CV"},
+        "Machine Learning": {"cs.LG"},
+    }
+
+
+@pytest.mark.parametrize(
+    "query, categories",
+    [
+        ("cat:cs.RO OR cat:cs.CV", {"cs.RO", "cs.CV"}),
+        ("(cat:cs.RO OR cat:cs.CV) AND cat:cs.RO", {"cs.RO"}),
+        ("cat:cs.LG ANDNOT ti:survey", {"cs.LG"}),
+        ("cat:cs.* AND robot", None),
+        ("cat:cs.RO OR ti:robot", None),
+        ("abs:grasping", None),
+    ],
+)
+def test_required_categories(query, categories):
+    assert parse_query(query).required_categories() == categories
+
+
+@pytest.mark.parametrize("query", ["cat:cs.RO AND", "(grasping", "OR grasping", '""'])
+def test_invalid_queries_raise(query):
+    with pytest.raises(QueryParseError):
+        parse_query(query)
+
+
+def test_plan_groups_config_topics_by_category(topics):
+    plan = plan_queries(topics)
+
+    assert plan.listings == {
+        "cs.RO": ["Robotics Manipulation"],
+        "cs.CV": ["Computer Vision"],
+        "cs.LG": ["Machine Learning"],
+    }
+    assert plan.direct_topics == []
+    assert plan.num_requests == 3
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "cat:cs.RO AND co:accepted",
+        "cat:cs.RO AND jr:Robotics",
+        "cat:cs.RO AND rn:MIT-CSAIL",
+        "cat:cs.RO AND id:2401.01234",
+        "cat:cs.* AND robot",
+        "cat:cs.RO AND (",
+    ],
+)
+def test_plan_queries_unsupported_topics_directly(query):
+    topic = {"name": "Direct", "query": query}
+
+    plan = plan_queries([topic])
+
+    assert plan.direct_topics == [topic]
+    assert plan.listings == {}
+
+
+def test_assign_papers_matches_config_queries(topics):
+    plan = plan_queries(topics)
+    listings = {
+        "cs.RO": [
+            paper("1", ["cs.RO"], title="Dexterous in-hand manipulation"),
+            paper("2", ["cs.RO"], abstract="We study legged locomotion."),
+            paper("3", ["cs.RO", "cs.CV"], abstract="A grasp planner for clutter."),
+        ],
+        "cs.CV": [
+            paper("3", ["cs.RO", "cs.CV"], abstract="A grasp planner for clutter."),
+            paper("4", ["cs.CV"], title="Monocular SLAM at scale"),
+            paper("5", ["cs.CV"], abstract="3D-aware image editing"),
+        ],
+        "cs.LG": [
+            paper("6", ["cs.LG"], abstract="Offline reinforcement learning."),
+            paper("7", ["cs.LG"], abstract="Learning with reinforcement signals."),
+            paper("8", ["cs.LG"], title="Deep Learning for tabular data"),
+            paper("9", ["stat.ML", "cs.LG"], abstract="Graph neural networks."),
+        ],
+    }
+
+    results = assign_papers(plan, topics, listings, max_results=100)
+
+    ids = {name: [p["id"] for p in papers] for name, papers in results.items()}
+    # "grasp" does not match the word prefix "grasping"
+    assert ids["Robotics Manipulation"] == ["1"]
+    assert ids["Computer Vision"] == ["4", "5"]
+    # Phrases must appear as such; stat.ML/cs.LG passes the cs.LG category filter
+    assert ids["Machine Learning"] == ["6", "8", "9"]
+
+
+def test_assign_papers_orders_newest_first_and_caps_results():
+    topic = {
+        "name": "Robots",
+        "query": "(cat:cs.RO OR cat:cs.AI) AND robot",
+        "categories": ["cs.RO", "cs.AI"],
+    }
+    plan = plan_queries([topic])
+    listings = {
+        "cs.RO": [paper("1", ["cs.RO"], title="Robot arms", published="2026-01-01")],
+        "cs.AI": [
+            paper("2", ["cs.AI"], title="Robotic agents", published="2026-01-03"),
+            paper("3", ["cs.AI"], title="Robots that plan", published="2026-01-02"),
+        ],
+    }
+
+    results = assign_papers(plan, [topic], listings, max_results=2)
+
+    assert [p["id"] for p in results["Robots"]] == ["2", "3"]
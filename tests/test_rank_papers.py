@@ -0,0 +1,81 @@
+"""
+Tests for ranking papers against several profiles at once.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from corpus import HashingEncoder, synthetic_papers  # noqa: E402
+from rank_papers import PaperRanker  # noqa: E402
+from read_history import ReadHistory  # noqa: E402
+
+TOPICS = [
+    {"name": "Robotics", "query": "grasping manipulation", "keywords": ["grasping"]},
+    {"name": "Vision", "query": "segmentation detection", "keywords": ["detection"]},
+]
+PROFILES = {
+    "robotics": "robot grasping and dexterous manipulation",
+    "vision": "object detection and image segmentation",
+}
+OPTIONS = {"keywords": ["grasping"], "min_threshold": 0.1, "top_n": 5}
+
+
+@pytest.fixture
+def papers():
+    return synthetic_papers(60, TOPICS, days=3)
+
+
+@pytest.fixture
+def ranker():
+    ranker = PaperRanker()
+    ranker.model = HashingEncoder()
+    ranker.set_profiles(PROFILES)
+    return ranker
+
+
+def test_profiles_match_separate_rankings(ranker, papers):
+    results = ranker.rank_papers_for_profiles(papers, **OPTIONS)
+
+    assert list(results) == list(PROFILES)
+    assert all(len(ranked) == 5 for ranked in results.values())
+    for name, interests in PROFILES.items():
+        ranker.set_research_interests(interests)
+        expected = ranker.rank_papers(
+            [dict(p) for p in papers], filter_read=False, **OPTIONS
+        )
+
+        assert [p["id"] for p in results[name]] == [p["id"] for p in expected]
+        for ranked, single in zip(results[name], expected):
+            assert ranked["similarity_score"] == pytest.approx(
+                single["similarity_score"], abs=1e-5
+            )
+    # Each profile gets its own copies; the input papers are not modified
+    assert all("similarity_score" not in p for p in papers)
+
+
+def test_profiles_filter_their_own_read_papers(ranker, papers, tmp_path):
+    unfiltered = ranker.rank_papers_for_profiles(papers, **OPTIONS)
+    read_file = str(tmp_path / "robotics.jsonl")
+    read_ids = [p["id"] for p in unfiltered["robotics"][:2]]
+    ReadHistory(read_file).add(read_ids)
+
+    results = ranker.rank_papers_for_profiles(
+        papers, read_papers_files={"robotics": read_file}, **OPTIONS
+    )
+
+    assert not set(read_ids) & {p["id"] for p in results["robotics"]}
+    assert results["vision"] == unfiltered["vision"]
+
+
+def test_profiles_must_be_set(papers):
+    with pytest.raises(ValueError):
+        PaperRanker().rank_papers_for_profiles(papers)
+
+
+def test_no_papers_gives_empty_results(ranker):
+    assert ranker.rank_papers_for_profiles([]) == {"robotics": [], "vision": []}
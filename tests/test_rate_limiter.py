@@ -0,0 +1,73 @@
+"""
+Tests for the token-bucket rate limiter shared by fetch threads.
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rate_limiter import TokenBucket  # noqa: E402
+
+
+def test_acquire_spaces_requests_at_the_rate():
+    bucket = TokenBucket(rate=50)
+
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+
+    # The first token is available immediately, the other five take 1/50 s each
+    assert time.monotonic() - start >= 5 / 50 * 0.9
+
+
+def test_rate_is_shared_between_threads():
+    bucket = TokenBucket(rate=50)
+
+    def worker():
+        for _ in range(3):
+            bucket.acquire()
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.monotonic() - start >= 11 / 50 * 0.9
+
+
+def test_throttle_pauses_and_halves_rate_once():
+    bucket = TokenBucket(rate=4, min_rate=1)
+
+    bucket.throttle(0.2)
+    # A second throttled response from the same burst does not slow down again
+    bucket.throttle(0.1)
+    start = time.monotonic()
+    bucket.acquire()
+
+    assert bucket.rate == 2
+    assert time.monotonic() - start >= 0.15
+
+
+def test_throttle_stops_at_min_rate_and_success_recovers():
+    bucket = TokenBucket(rate=4, min_rate=1)
+    for _ in range(4):
+        bucket.last_throttle = float("-inf")
+        bucket.throttle(0)
+    assert bucket.rate == 1
+
+    for _ in range(20):
+        bucket.succeed()
+
+    assert bucket.rate == 4
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
@@ -0,0 +1,103 @@
+"""
+Tests for the append-only read history log.
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from read_history import ReadHistory  # noqa: E402
+
+
+def append_papers(log_file, worker, count):
+    history = ReadHistory(log_file)
+    for i in range(count):
+        history.add([f"2401.{worker}{i:04d}v1"])
+
+
+def test_compaction_keeps_appends_from_other_processes(tmp_path):
+    log_file = str(tmp_path / "read_papers.jsonl")
+    history = ReadHistory(log_file)
+    history.add(["2401.00001v1"])
+
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=append_papers, args=(log_file, worker, 200))
+        for worker in range(1, 4)
+    ]
+    for process in workers:
+        process.start()
+    while any(process.is_alive() for process in workers):
+        history.compact()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    history.refresh()
+    assert len(history) == 1 + 3 * 200
+    assert len(ReadHistory(log_file)) == 1 + 3 * 200
+
+
+def test_refresh_reloads_log_compacted_by_another_instance(tmp_path):
+    log_file = str(tmp_path / "read_papers.jsonl")
+    reader = ReadHistory(log_file)
+    writer = ReadHistory(log_file)
+    writer.add(["2401.00001v1", "2401.00002v1"])
+    writer.add(["2401.00001v2"])
+    reader.refresh()
+
+    writer.compact()
+    writer.add(["2401.00003v1"])
+    reader.refresh()
+
+    assert len(reader.entries) == 2
+    assert all(pid in reader for pid in ["2401.00001", "2401.00002", "2401.00003"])
+
+
+def test_legacy_json_is_migrated_next_to_the_log(tmp_path):
+    legacy = {
+        "paper_ids": ["2401.00001v1", "2401.00002v1", "2401.00003v2"],
+        "history": [
+            {"date": "2026-01-05", "paper_ids": ["2401.00001v1", "2401.00002v1"]}
+        ],
+    }
+    (tmp_path / "read_papers.json").write_text(json.dumps(legacy))
+
+    history = ReadHistory(str(tmp_path / "read_papers.jsonl"))
+
+    assert len(history) == 3
+    assert "2401.00003v1" in history
+    assert [len(entry["paper_ids"]) for entry in history.entries] == [1, 2]
+    assert (tmp_path / "read_papers.jsonl").exists()
+    # Later loads read the log, not the legacy file
+    (tmp_path / "read_papers.json").write_text(json.dumps({"paper_ids": []}))
+    assert len(ReadHistory(str(tmp_path / "read_papers.jsonl"))) == 3
+
+
+def test_open_shares_and_refreshes_instances(tmp_path):
+    log_file = str(tmp_path / "read_papers.jsonl")
+    shared = ReadHistory.open(log_file)
+    ReadHistory(log_file).add(["2401.00001v1"])
+
+    assert ReadHistory.open(log_file) is shared
+    assert "2401.00001" in shared
+
+
+def test_add_skips_read_papers_and_versions(tmp_path):
+    history = ReadHistory(str(tmp_path / "read_papers.jsonl"))
+
+    assert history.add(["2401.00001v1", "2401.00001v2"]) == ["2401.00001v1"]
+    assert history.add(["2401.00001v3", "2401.00002v1"]) == ["2401.00002v1"]
+
+
+def test_changed_abstract_is_recorded_again(tmp_path):
+    history = ReadHistory(str(tmp_path / "read_papers.jsonl"))
+    history.add(["2401.00001v1"], {"2401.00001v1": "old"})
+
+    assert history.add(["2401.00001v2"], {"2401.00001v2": "old"}) == []
+    assert not history.is_read("2401.00001v2", "new")
+    assert history.add(["2401.00001v2"], {"2401.00001v2": "new"}) == ["2401.00001v2"]
+    assert history.is_read("2401.00001v3", "new")
@@ -0,0 +1,136 @@
+"""
+Tests for the vectorized scoring helpers.
+"""
+
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from scoring import (  # noqa: E402
+    KeywordMatcher,
+    PaperColumns,
+    recency_factors,
+    select_top_n,
+    to_timestamp,
+)
+
+
+def naive_count(keywords, text):
+    return sum(1 for keyword in keywords if keyword.lower() in text)
+
+
+@pytest.mark.parametrize(
+    "keywords, text, expected",
+    [
+        (["SLAM", "3D"], "monocular slam in 3d scenes", 2),
+        (["learning", "reinforcement learning"], "deep reinforcement learning", 2),
+        (["learning", "deep learning"], "reinforcement learning", 1),
+        (["grasp", "grasping"], "robust grasping", 2),
+        (["grasping", "grasp"], "grasp planning", 1),
+        (["robot", "Robot"], "a robot arm", 2),
+        (["", "robot"], "no match here", 1),
+        (["pick and place"], "pick and place of objects", 1),
+        (["pick and place"], "pick, then place", 0),
+        ([], "anything", 0),
+    ],
+)
+def test_keyword_matcher_counts(keywords, text, expected):
+    assert KeywordMatcher(keywords).count(text) == expected
+
+
+def test_keyword_matcher_matches_naive_count():
+    rng = random.Random(0)
+    vocabulary = ["ab", "abc", "bc", "c", "abcd", "d", "cd", "bcd", "x y", "y"]
+    for _ in range(200):
+        keywords = rng.sample(vocabulary, rng.randint(1, len(vocabulary)))
+        text = "".join(rng.choice("abcdxy ") for _ in range(rng.randint(0, 20)))
+
+        assert KeywordMatcher(keywords).count(text) == naive_count(keywords, text)
+
+
+def test_keyword_matcher_count_many():
+    matcher = KeywordMatcher(["slam", "3d"])
+
+    counts = matcher.count_many(["slam", "3d slam", "none"])
+
+    assert counts.tolist() == [1, 2, 0]
+    assert counts.dtype == np.int64
+
+
+def test_recency_factors_scale_oldest_to_newest():
+    now = datetime(2026, 1, 10, tzinfo=timezone.utc)
+    papers = [
+        {"title": "A", "published": (now - timedelta(days=days)).isoformat()}
+        for days in (4, 0, 2)
+    ]
+
+    factors = recency_factors(PaperColumns(papers).timestamps)
+
+    assert np.allclose(factors, [0.0, 1.0, 0.5])
+
+
+def test_recency_factors_clip_to_window():
+    now = datetime(2026, 1, 10, tzinfo=timezone.utc)
+    window = (now - timedelta(days=4), now)
+    timestamps = np.array(
+        [to_timestamp(now - timedelta(days=days)) for days in (8, 3, -1)]
+    )
+
+    assert np.allclose(recency_factors(timestamps, window), [0.0, 0.25, 1.0])
+
+
+def test_recency_factors_of_identical_dates():
+    timestamps = np.array([to_timestamp("2026-01-10T00:00:00+00:00")] * 3)
+
+    assert recency_factors(timestamps).tolist() == [0.0, 0.0, 0.0]
+
+
+def test_naive_datetimes_are_utc():
+    naive = datetime(2026, 1, 10, 12)
+
+    assert to_timestamp(naive) == to_timestamp("2026-01-10T12:00:00+00:00")
+
+
+def stable_top_n(scores, top_n, min_threshold=-np.inf, mask=None):
+    order = sorted(range(len(scores)), key=lambda i: -scores[i])
+    selectable = [
+        i for i in order if scores[i] >= min_threshold and (mask is None or mask[i])
+    ]
+    return selectable[: max(top_n, 0)]
+
+
+def test_select_top_n_breaks_ties_by_index():
+    scores = np.array([0.5, 0.9, 0.5, 0.9, 0.5, 0.1])
+
+    assert select_top_n(scores, 3).tolist() == [1, 3, 0]
+    assert select_top_n(scores, 4).tolist() == [1, 3, 0, 2]
+
+
+def test_select_top_n_threshold_and_mask():
+    scores = np.array([0.2, 0.8, 0.6, 0.4])
+    mask = np.array([True, False, True, True])
+
+    assert select_top_n(scores, 10, min_threshold=0.4).tolist() == [1, 2, 3]
+    assert select_top_n(scores, 10, mask=mask).tolist() == [2, 3, 0]
+    assert select_top_n(scores, 0).tolist() == []
+    assert select_top_n(np.array([]), 5).tolist() == []
+
+
+def test_select_top_n_matches_stable_sort():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        size = int(rng.integers(0, 30))
+        # Few distinct values, so ties at the cut-off are common
+        scores = rng.integers(0, 5, size).astype(np.float64) / 4
+        mask = rng.random(size) < 0.8
+        top_n = int(rng.integers(0, 12))
+
+        assert select_top_n(scores, top_n, 0.25, mask).tolist() == stable_top_n(
+            scores, top_n, 0.25, mask
+        )